@@ -0,0 +1,134 @@
+import argparse
+import logging
+import sys
+
+from src.bench.runner import ENGINES, find_regressions, run_benchmarks, write_report
+from src.bench.startup import find_startup_regressions, run_startup_benchmarks
+from src.context.precision import PRECISIONS
+from src.utils.logger import get_logger, init_logging
+from src.utils.synthetic import LEAKAGE_MODELS
+
+
+def parse_bench_args():
+    parser = argparse.ArgumentParser(
+        description="Time the guessers on seeded synthetic trace sets"
+    )
+
+    parser.add_argument(
+        "--traces", type=int, nargs="+", default=[1000, 10000], help="Trace counts"
+    )
+    parser.add_argument(
+        "--samples", type=int, nargs="+", default=[1000, 5000], help="Sample counts"
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=list(ENGINES),
+        default=list(ENGINES),
+        help="Engines to time",
+    )
+    parser.add_argument("--model", choices=LEAKAGE_MODELS, default="hw")
+    parser.add_argument("--noise", type=float, default=2.0, help="Noise std-dev")
+    parser.add_argument(
+        "--jitter", type=int, default=0, help="Max leak shift in samples"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--precision", choices=PRECISIONS, default="float64")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case")
+    parser.add_argument(
+        "--max-dataset-mb",
+        type=float,
+        default=4096,
+        help="Skip grid cells whose synthetic dataset is larger than this",
+    )
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="Time the CLI and worker cold-start imports instead of the engines",
+    )
+    parser.add_argument(
+        "--output",
+        default="benchmark_report",
+        help="Report path prefix (.json and .csv are written)",
+    )
+    parser.add_argument(
+        "--baseline", default=None, help="Previous JSON report to compare against"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative throughput drop (or startup slowdown) against the "
+        "baseline",
+    )
+    parser.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+    )
+
+    return parser.parse_args()
+
+
+def startup_benchmark(args, logger):
+    startup = run_startup_benchmarks(repeat=max(args.repeat, 5))
+    for r in startup:
+        logger.info(
+            "%-8s imports %7.1f ms  cold start %7.1f ms",
+            r["target"],
+            r["import_ms"],
+            r["wall_ms"],
+        )
+
+    json_path, _ = write_report([], args.output, startup=startup)
+    logger.info("Report written to %s", json_path)
+
+    regressions = find_startup_regressions(startup, args.baseline, args.tolerance)
+    for r in regressions:
+        logger.error("Startup regression: %s %s", r["target"], r["reason"])
+    if regressions:
+        sys.exit(1)
+
+
+def main():
+    args = parse_bench_args()
+    init_logging(level=getattr(logging, args.log_level))
+    logger = get_logger(__name__)
+
+    if args.startup:
+        startup_benchmark(args, logger)
+        return
+
+    results = run_benchmarks(
+        args.traces,
+        args.samples,
+        args.engines,
+        repeat=args.repeat,
+        precision=args.precision,
+        max_dataset_mb=args.max_dataset_mb,
+        model=args.model,
+        noise=args.noise,
+        jitter=args.jitter,
+        seed=args.seed,
+    )
+
+    json_path, csv_path = write_report(results, args.output)
+    logger.info("Report written to %s and %s", json_path, csv_path)
+
+    if args.baseline:
+        regressions = find_regressions(results, args.baseline, args.tolerance)
+        for r in regressions:
+            logger.error(
+                "Regression: %s %d x %d: %.0f traces/s (baseline %.0f)",
+                r["engine"],
+                r["n_traces"],
+                r["n_samples"],
+                r["traces_per_s"],
+                r["baseline_traces_per_s"],
+            )
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import logging
+
+from src.aes.contants import KEY
+from src.context.container import convert_npy_pair
+from src.utils.logger import get_logger, init_logging
+
+
+def parse_convert_args():
+    parser = argparse.ArgumentParser(
+        description="Convert a traces/plaintexts .npy pair into a trace container"
+    )
+
+    parser.add_argument("--traces", default="data/traces.npy", help="Traces .npy")
+    parser.add_argument("--textin", default="data/textin.npy", help="Plaintexts .npy")
+    parser.add_argument("--textout", default=None, help="Optional ciphertexts .npy")
+    parser.add_argument(
+        "--output", default="data/capture", help="Container directory to create"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=10000, help="Traces per appended chunk"
+    )
+    parser.add_argument(
+        "--sample-rate", type=float, default=None, help="Sample rate in Hz"
+    )
+    parser.add_argument(
+        "--key",
+        default=None,
+        help="Key used for the capture, in hex (default: the bundled dataset key)",
+    )
+    parser.add_argument(
+        "--sample-major",
+        action="store_true",
+        help="Also write a sample-major (transposed) copy of the traces",
+    )
+    parser.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_convert_args()
+    init_logging(level=getattr(logging, args.log_level))
+    logger = get_logger(__name__)
+
+    header = convert_npy_pair(
+        args.traces,
+        args.textin,
+        args.output,
+        textout_path=args.textout,
+        chunk_size=args.chunk_size,
+        sample_major=args.sample_major,
+        sample_rate=args.sample_rate,
+        key=KEY if args.key is None else bytes.fromhex(args.key),
+    )
+
+    logger.info(
+        "Wrote %s: %d traces x %d samples (%s) in %d chunks",
+        args.output,
+        header["n_traces"],
+        header["n_samples"],
+        header["dtype"],
+        len(header["chunks"]),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import logging
+import time
+
+from src.aes.contants import KEY
+from src.config.loader import parse_sample_range
+from src.context.container import is_container, read_header
+from src.context.pool import create_worker_pool
+from src.context.precision import PRECISIONS
+from src.context.shared import store_columns, store_rows, store_samples
+from src.guesser.adaptive import adaptive_checkpoints
+from src.guesser.evaluation import (
+    evaluate_attack,
+    plot_evaluation,
+    print_evaluation,
+    save_evaluation,
+)
+from src.utils.data_loader import open_textin_store, open_traces_store
+from src.utils.logger import get_logger, init_logging
+from src.utils.profiling import drain_profile, format_profile
+
+
+def parse_evaluate_args():
+    parser = argparse.ArgumentParser(
+        description="Success rate and guessing entropy over resampled trace subsets"
+    )
+
+    parser.add_argument(
+        "--traces",
+        default="data/traces.npy",
+        help="Traces .npy or trace container directory",
+    )
+    parser.add_argument(
+        "--textin", default=None, help="Plaintexts .npy (default: data/textin.npy)"
+    )
+    parser.add_argument(
+        "--attacks", nargs="+", choices=["dpa", "cpa"], default=["dpa", "cpa"]
+    )
+    parser.add_argument(
+        "--experiments", type=int, default=200, help="Random subsets per trace count"
+    )
+    parser.add_argument("--initial", type=int, default=10, help="Smallest trace count")
+    parser.add_argument(
+        "--growth", type=float, default=1.25, help="Trace count growth factor"
+    )
+    parser.add_argument(
+        "--max-traces", type=int, default=None, help="Largest trace count"
+    )
+    parser.add_argument(
+        "--sample-range",
+        default=None,
+        help="Restrict the attacks to samples START:END (e.g. 450:800)",
+    )
+    parser.add_argument("--precision", choices=PRECISIONS, default="float64")
+    parser.add_argument(
+        "--rank-bins",
+        type=int,
+        default=256,
+        help="Histogram bins of the full-key rank estimation",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: all)"
+    )
+    parser.add_argument(
+        "--output",
+        default="evaluation",
+        help="Directory for the <attack>.npz results",
+    )
+    parser.add_argument("--no-plot", action="store_true", help="Skip the curves")
+    parser.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_evaluate_args()
+    init_logging(level=getattr(logging, args.log_level))
+    logger = get_logger(__name__)
+
+    key = KEY
+    if is_container(args.traces):
+        traces_store = open_traces_store(args.traces)
+        textin_store = open_textin_store(args.traces)
+        header = read_header(args.traces)
+        if header["key"] is not None:
+            key = bytes.fromhex(header["key"])
+    else:
+        traces_store = open_traces_store(args.traces)
+        textin_store = open_textin_store(args.textin or "data/textin.npy")
+
+    if args.sample_range is not None:
+        start, end = parse_sample_range(args.sample_range)
+        n_samples = traces_store["shape"][1]
+        end = n_samples if end is None else min(end, n_samples)
+        if start >= end:
+            raise ValueError(
+                f"Sample range {start}:{end} selects no sample "
+                f"(the traces have {n_samples})"
+            )
+        traces_store = store_columns(traces_store, range(start, end))
+
+    n_traces = store_rows(traces_store)
+    if args.max_traces is not None:
+        n_traces = min(n_traces, args.max_traces)
+    checkpoints = adaptive_checkpoints(n_traces, args.initial, args.growth)
+
+    logger.info(
+        "%d experiments, %d trace counts from %d to %d, %d samples",
+        args.experiments,
+        len(checkpoints),
+        checkpoints[0],
+        checkpoints[-1],
+        store_samples(traces_store),
+    )
+
+    with create_worker_pool(max_workers=args.workers) as pool:
+        for attack in args.attacks:
+            start_time = time.perf_counter()
+            summary = evaluate_attack(
+                traces_store,
+                textin_store,
+                checkpoints,
+                key,
+                attack=attack,
+                n_experiments=args.experiments,
+                seed=args.seed,
+                precision=args.precision,
+                rank_bins=args.rank_bins,
+                executor=pool,
+            )
+            elapsed = time.perf_counter() - start_time
+
+            path = f"{args.output}/{attack}.npz"
+            save_evaluation(
+                path,
+                attack,
+                summary,
+                seed=args.seed,
+                precision=args.precision,
+                key=list(key),
+            )
+
+            print_evaluation(attack, summary)
+            logger.info(
+                "%s: %d experiments in %.2fs, written to %s",
+                attack.upper(),
+                args.experiments,
+                elapsed,
+                path,
+            )
+
+            if not args.no_plot:
+                for plot in plot_evaluation(attack, summary):
+                    logger.info("Curve written to %s", plot)
+
+    for line in format_profile(drain_profile()):
+        logger.debug(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,102 +1,67 @@
+from contextlib import contextmanager
 import logging
+import os
+import shutil
+import tempfile
 from src.guesser.plots import save_trace_plot
 from src.utils.logger import get_logger, init_logging
 from src.config.cli import parse_cli_args
 from src.config.loader import load_config_file, merge_config
-from src.utils.data_loader import load_traces, load_textin
-from src.context.shared import save_array_to_mmap
+from src.utils.data_loader import (
+    open_textin_store,
+    open_textout_store,
+    open_traces_store,
+)
+from src.context.shared import (
+    load_store,
+    store_columns,
+    store_rows,
+    store_slice,
+)
+from src.context.pool import create_worker_pool
+from src.context.renderer import plot_renderer
+from src.context.container import read_header
+from src.context.cache import clear_cache, score_cache
+from src.context.class_stats import CLASS_STATS_DIR, build_class_stats
+from src.context.preprocess import preprocess_dataset
 from src.guesser.dpa import (
     dpa_guesser,
 )
 from src.guesser.cpa import (
     cpa_guesser,
 )
+from src.guesser.cpa_stream import cpa_models_guesser, cpa_stream_guesser
+from src.guesser.scores import key_rank
+from src.guesser.cpa2 import cpa2_guesser, print_top_pairs
+from src.guesser.live import live_attack
+from src.guesser.adaptive import adaptive_guesser, print_disclosure
+from src.guesser.template import (
+    build_templates,
+    check_provenance,
+    load_templates,
+    print_template_disclosure,
+    save_templates,
+    template_guesser,
+    template_provenance,
+)
+from src.guesser.enumeration import estimate_key_rank, scores_to_log_probs, search_key
+from src.aes.cipher import aes128_encrypt
+from src.guesser.poi import compute_nicv, select_poi
 from src.guesser.convergence import (
     plot_all_bytes_parallel,
     plot_all_bytes_parallel_cpa,
 )
 from src.utils.colors import RED, GREEN, BOLD, RESET, conf_color
+from src.aes.contants import KEY
+from src.utils.profiling import drain_profile, format_profile, timer, write_profile
 
-KEY = [
-    0x2B,  # Byte 0
-    0x7E,  # Byte 1
-    0x15,  # ...
-    0x16,
-    0x28,
-    0xAE,
-    0xD2,
-    0xA6,
-    0xAB,
-    0xF7,  # Byte 9
-    0x15,
-    0x88,
-    0x09,
-    0xCF,
-    0x4F,
-    0x3C,
-]
-
-
-def main():
-    cli_args = parse_cli_args()
-    cfg_file = load_config_file(cli_args.config_file)
-
-    settings = merge_config(cli_args, cfg_file)
-
-    init_logging(
-        level=settings.log_level,
-        fmt=settings.log_format,
-        datefmt=settings.log_datefmt,
-    )
-
-    logger = get_logger(__name__)
-    logger.info(
-        "Program started, log level: %s", logging.getLevelName(settings.log_level)
-    )
-
-    traces = load_traces("data/traces.npy")
-    textin = load_textin("data/textin.npy")
-
-    logger.info("Traces shape: %s", traces.shape)
-    logger.info("Textin shape: %s", textin.shape)
-
-    logger.debug("Trace[0]: %s", traces[0])
-    logger.debug("Textin[0]: %s", textin[0])
-
-    traces_file, traces_shape, traces_dtype = save_array_to_mmap(
-        traces, "data/traces.bin"
-    )
-    textin_file, textin_shape, textin_dtype = save_array_to_mmap(
-        textin, "data/textin.bin"
-    )
-
-    logger.info("Starting guessing process")
-    if settings.plot:
-        logger.info("[+] Plotting enabled")
-
-    if settings.plot:
-        save_trace_plot(traces[:5])
-
-    guesses: list[dict] = dpa_guesser(
-        traces_file,
-        traces_shape,
-        traces_dtype,
-        textin_file,
-        textin_shape,
-        textin_dtype,
-        {
-            "level": settings.log_level,
-            "fmt": settings.log_format,
-            "datefmt": settings.log_datefmt,
-        },
-        plotting=settings.plot,
-    )
 
+def print_summary(logger, title, guesses, key=KEY):
     #  pylint: disable=E1136
     logger.info("Key guessed: %s", [r["guess"] for r in guesses])
 
     logger.raw("")
-    logger.raw("=== DPA BYTE SUMMARY ===")
+    logger.raw(f"=== {title} BYTE SUMMARY ===")
     logger.raw("Byte | Guess  | Correct | Status | Confidence | Second Best")
     logger.raw(
         "-----+--------+---------+--------+------------+------------------------"
@@ -104,7 +69,7 @@ def main():
 
     for i, result in enumerate(guesses):
         guess_hex = f"0x{int(result['guess'], 16):02x}"
-        correct_hex = f"0x{KEY[i]:02x}"
+        correct_hex = f"0x{key[i]:02x}"
 
         ok = guess_hex == correct_hex
         status = f"{GREEN}OK {RESET}" if ok else f"{BOLD}{RED}NOK{RESET}"
@@ -125,83 +90,421 @@ def main():
                 f"{conf_str:>10} |"
             )
 
-    traces_cpa = traces[: settings.nb_cpa_traces]
-    textin_cpa = textin[: settings.nb_cpa_traces]
 
-    traces_cpa_file, traces_cpa_shape, traces_cpa_dtype = save_array_to_mmap(
-        traces_cpa, "data/traces_cpa.bin"
-    )
-    textin_cpa_file, textin_cpa_shape, textin_cpa_dtype = save_array_to_mmap(
-        textin_cpa, "data/textin_cpa.bin"
-    )
+def print_model_comparison(logger, results, key=KEY):
+    logger.raw("")
+    logger.raw("=== LEAKAGE MODEL COMPARISON ===")
+    logger.raw("Model            | Recovered | Mean key rank | Mean peak corr")
+    logger.raw("-----------------+-----------+---------------+---------------")
+    for model, guesses in results.items():
+        recovered = sum(int(r["guess"], 16) == key[b] for b, r in enumerate(guesses))
+        rank = sum(key_rank(r["scores"], key[b]) for b, r in enumerate(guesses))
+        peak = sum(r["best"] for r in guesses)
+        logger.raw(
+            f"{model:<16} | {recovered:>6}/{len(guesses):<2} | "
+            f"{rank / len(guesses):>13.1f} | {peak / len(guesses):>14.4f}"
+        )
+
+
+def print_profile(logger, settings):
+    if not settings.profile:
+        return
+
+    profile = drain_profile()
+    logger.raw("")
+    logger.raw("=== PROFILE (seconds summed over all processes) ===")
+    for line in format_profile(profile):
+        logger.raw(line)
+
+    write_profile(profile, settings.profile_output)
+    logger.info("Profile written to %s", settings.profile_output)
 
-    guesses: list[dict] = cpa_guesser(
-        traces_cpa_file,
-        traces_cpa_shape,
-        traces_cpa_dtype,
-        textin_cpa_file,
-        textin_cpa_shape,
-        textin_cpa_dtype,
-        plotting=settings.plot,
+
+@contextmanager
+def class_stats_dir(settings):
+    # Kept and reused across runs along with the score cache, otherwise
+    # removed at the end of the run
+    if settings.clear_cache:
+        shutil.rmtree(CLASS_STATS_DIR, ignore_errors=True)
+    if settings.cache:
+        yield CLASS_STATS_DIR
+        return
+
+    os.makedirs(".cache", exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="class_stats_", dir=".cache") as path:
+        yield path
+
+
+def run_enumeration(logger, settings, guesses, textin, key, executor):
+    plaintext = textin[0]
+    if settings.dataset is not None and read_header(settings.dataset)["textout"]:
+        ciphertext = load_store(open_textout_store(settings.dataset))[0]
+    else:
+        # The bundled dataset has no ciphertexts: derive the reference pair
+        # from the known key.
+        ciphertext = aes128_encrypt(plaintext, list(key))[0]
+
+    log_probs = scores_to_log_probs([r["scores"] for r in guesses])
+    rank = estimate_key_rank(log_probs, key)
+    result = search_key(
+        log_probs, plaintext, ciphertext, settings.max_candidates, executor=executor
     )
-    logger.info("Key guessed: %s", [r["guess"] for r in guesses])
+
     logger.raw("")
-    logger.raw("=== CPA BYTE SUMMARY ===")
-    logger.raw("Byte | Guess  | Correct | Status | Confidence | Second Best")
+    logger.raw("=== KEY ENUMERATION ===")
     logger.raw(
-        "-----+--------+---------+--------+------------+------------------------"
+        f"Known key rank: 2^{rank['log2_rank']:.1f} "
+        f"(between 2^{rank['log2_lower']:.1f} and 2^{rank['log2_upper']:.1f})"
+    )
+    if result["key"] is not None:
+        logger.raw(
+            f"Key found after {result['tested']} candidates: {result['key'].hex()}"
+        )
+    else:
+        logger.raw(f"Key not found in the first {result['tested']} candidates")
+    logger.raw(
+        f"Tested {result['tested']} keys in {result['elapsed']:.2f}s "
+        f"({result['keys_per_s']:.0f} keys/s)"
     )
-    for i, result in enumerate(guesses):
-        guess_hex = f"0x{int(result['guess'], 16):02x}"
-        correct_hex = f"0x{KEY[i]:02x}"
 
-        ok = guess_hex == correct_hex
-        status = f"{GREEN}OK {RESET}" if ok else f"{BOLD}{RED}NOK{RESET}"
 
-        pct = result["confidence"] * 100
-        color = conf_color(pct)
-        conf_str = f"{color}{pct:6.2f}%{RESET}"
+def run_template(logger, settings, traces_store, textin_store, key):
+    n_traces = store_rows(traces_store)
+    n_profile = settings.template_profile_traces
+    n_profile = n_traces // 2 if n_profile is None else min(n_profile, n_traces)
+    if n_profile == n_traces:
+        raise ValueError(
+            f"All {n_traces} traces would be used for profiling: lower "
+            "--template-profile-traces to leave some to attack"
+        )
 
-        if not ok:
-            second_hex = f"0x{result['second_guess']:02x}"
-            logger.raw(
-                f"{i:>4} | {guess_hex:>6} | {correct_hex:>7} |    {status:>6} |    "
-                f"{conf_str:>10} | {second_hex} ({round(result['second'], 5)} vs {round(result['best'], 5)})"
-            )
-        else:
-            logger.raw(
-                f"{i:>4} | {guess_hex:>6} | {correct_hex:>7} |    {status:>6} |    "
-                f"{conf_str:>10} |"
+    if os.path.exists(settings.template):
+        templates = load_templates(settings.template)
+        logger.info("Templates loaded from %s", settings.template)
+        check_provenance(templates, traces_store)
+    else:
+        if n_profile == 0:
+            raise FileNotFoundError(f"Templates not found: {settings.template}")
+
+        with timer("phase.template_profile"):
+            templates = build_templates(
+                load_store(store_slice(traces_store, 0, n_profile)),
+                load_store(textin_store)[:n_profile],
+                key,
+                model=settings.template_model,
+                n_poi=settings.template_poi,
+                chunk_size=settings.chunk_size,
             )
+        templates.update(template_provenance(traces_store))
+        save_templates(settings.template, templates)
+        logger.info("Templates written to %s", settings.template)
 
-    if settings.plot_correlations:
-        logger.raw("=========================")
-        logger.raw("Plotting all guesses convergence for each byte...")
-        plot_all_bytes_parallel(
-            traces,
-            textin,
-            {
-                "level": settings.log_level,
-                "fmt": settings.log_format,
-                "datefmt": settings.log_datefmt,
-            },
+    # Traces used for profiling are never attacked
+    with timer("phase.template_attack"):
+        guesses, report = template_guesser(
+            store_slice(traces_store, n_profile, n_traces),
+            store_slice(textin_store, n_profile, n_traces),
+            templates,
+            key,
         )
 
-        logger.raw("Done.")
-        logger.raw("=========================")
-        logger.raw("Plotting all guesses convergence for each byte... (CPA)")
-        plot_all_bytes_parallel_cpa(
-            traces_cpa,
-            textin_cpa,
-            {
-                "level": settings.log_level,
-                "fmt": settings.log_format,
-                "datefmt": settings.log_datefmt,
-            },
+    print_summary(logger, "TEMPLATE", guesses, key)
+    print_template_disclosure(guesses, report)
+
+
+def run_adaptive(logger, settings, traces_store, textin_store, key):
+    for attack in ("dpa", "cpa"):
+        with timer(f"phase.{attack}"):
+            guesses, report = adaptive_guesser(
+                traces_store,
+                textin_store,
+                attack,
+                initial=settings.adaptive_initial,
+                growth=settings.adaptive_growth,
+                patience=settings.adaptive_patience,
+                min_confidence=settings.adaptive_min_confidence,
+                precision=settings.precision,
+                model=settings.dpa_model if attack == "dpa" else settings.leakage_model,
+            )
+
+        print_summary(logger, attack.upper(), guesses, key)
+        print_disclosure(guesses, report)
+
+
+def main():
+    cli_args = parse_cli_args()
+    cfg_file = load_config_file(cli_args.config_file)
+
+    settings = merge_config(cli_args, cfg_file)
+
+    init_logging(
+        level=settings.log_level,
+        fmt=settings.log_format,
+        datefmt=settings.log_datefmt,
+    )
+
+    logger = get_logger(__name__)
+    logger.info(
+        "Program started, log level: %s", logging.getLevelName(settings.log_level)
+    )
+
+    if settings.live is not None:
+        live_attack(
+            settings.live,
+            settings.live_interval,
+            max_batch=settings.chunk_size,
+            precision=settings.precision,
+            key=KEY,
         )
+        return
+
+    key = KEY
+    if settings.dataset is not None:
+        traces_store = open_traces_store(settings.dataset)
+        textin_store = open_textin_store(settings.dataset)
+
+        header = read_header(settings.dataset)
+        if header["key"] is not None:
+            key = bytes.fromhex(header["key"])
+        logger.info("Dataset: %s (%d chunks)", settings.dataset, len(header["chunks"]))
+    else:
+        traces_store = open_traces_store("data/traces.npy")
+        textin_store = open_textin_store("data/textin.npy")
+
+    logging_settings = {
+        "level": settings.log_level,
+        "fmt": settings.log_format,
+        "datefmt": settings.log_datefmt,
+    }
+
+    # One pool for the whole run, preprocessing included
+    with create_worker_pool(logging_settings) as pool:
+        if settings.preprocess is not None:
+            with timer("phase.preprocess"):
+                stores = preprocess_dataset(
+                    traces_store,
+                    textin_store,
+                    settings.preprocess,
+                    output=settings.preprocess_output,
+                    chunk_size=settings.chunk_size,
+                    key=key,
+                    logging_settings=logging_settings,
+                    executor=pool,
+                )
+            traces_store, textin_store = stores["traces"], stores["textin"]
+
+        traces = load_store(traces_store)
+        textin = load_store(textin_store)
+
+        logger.info("Traces shape: %s", traces.shape)
+        logger.info("Textin shape: %s", textin.shape)
+
+        logger.debug("Trace[0]: %s", traces[0])
+        logger.debug("Textin[0]: %s", textin[0])
+
+        if settings.sample_range is not None:
+            start, end = settings.sample_range
+            end = traces.shape[1] if end is None else min(end, traces.shape[1])
+            if start >= end:
+                raise ValueError(
+                    f"Sample range {start}:{end} selects no sample "
+                    f"(the traces have {traces.shape[1]})"
+                )
+            traces_store = store_columns(traces_store, range(start, end))
+            logger.info("[+] Restricting attacks to samples %d:%d", start, end)
+
+        if settings.poi_top_k is not None or settings.poi_threshold is not None:
+            with timer("phase.poi"):
+                nicv = compute_nicv(load_store(traces_store), textin)
+                poi = select_poi(nicv, settings.poi_top_k, settings.poi_threshold)
+            if poi.size == 0:
+                raise ValueError(
+                    f"No sample reaches the POI threshold {settings.poi_threshold} "
+                    f"(highest NICV: {nicv.max():.4f})"
+                )
+            traces_store = store_columns(traces_store, poi)
+
+        cache = score_cache(settings.cache_dir, settings.cache_max_mb)
+        if settings.clear_cache:
+            clear_cache(cache)
+        if not settings.cache:
+            cache = None
+
+        logger.info("Starting guessing process")
+        if settings.adaptive:
+            logger.info("[+] Adaptive early stopping")
+            run_adaptive(logger, settings, traces_store, textin_store, key)
+            print_profile(logger, settings)
+            return
+
+        if settings.plot:
+            logger.info("[+] Plotting enabled")
+
+        with (
+            plot_renderer(settings.plot, logging_settings) as renderer,
+            class_stats_dir(settings) as stats_dir,
+        ):
+            if renderer is not None:
+                renderer.submit(save_trace_plot, traces[:5])
+
+            with timer("phase.dpa"):
+                class_stats = None
+                if settings.class_stats:
+                    logger.info("[+] Using plaintext-class statistics")
+                    class_stats = build_class_stats(
+                        traces_store,
+                        textin_store,
+                        stats_dir,
+                        settings.precision,
+                    )
+
+                guesses: list[dict] = dpa_guesser(
+                    traces_store,
+                    textin_store,
+                    logging_settings,
+                    plotting=settings.plot,
+                    class_stats=class_stats,
+                    precision=settings.precision,
+                    executor=pool,
+                    profile_byte=settings.profile_byte,
+                    renderer=renderer,
+                    cache=cache,
+                    model=settings.dpa_model,
+                )
+
+            print_summary(logger, "DPA", guesses, key)
+
+            traces_cpa_store = store_slice(traces_store, 0, settings.nb_cpa_traces)
+            textin_cpa_store = store_slice(textin_store, 0, settings.nb_cpa_traces)
+
+            # Compared models are scored in the main CPA pass, next to the
+            # attack model whose guesses are kept
+            models = None
+            if settings.compare_models:
+                models = [settings.leakage_model] + [
+                    model
+                    for model in settings.compare_models
+                    if model != settings.leakage_model
+                ]
+
+            with timer("phase.cpa"):
+                if settings.second_order:
+                    logger.info("[+] Second-order CPA on sample pairs")
+                    guesses: list[dict] = cpa2_guesser(
+                        traces_cpa_store,
+                        textin_cpa_store,
+                        logging_settings,
+                        combine=settings.second_order_combine,
+                        top_k=settings.second_order_top_k,
+                        max_mb=settings.second_order_max_mb,
+                        precision=settings.precision,
+                        executor=pool,
+                        model=settings.leakage_model,
+                    )
+                elif models is not None:
+                    logger.info("[+] Comparing leakage models: %s", ", ".join(models))
+                    results = cpa_models_guesser(
+                        traces_cpa_store,
+                        textin_cpa_store,
+                        models,
+                        chunk_size=settings.chunk_size,
+                        precision=settings.precision,
+                        plotting=settings.plot,
+                        renderer=renderer,
+                        cache=cache,
+                    )
+                    guesses: list[dict] = results[settings.leakage_model]
+                elif settings.stream_cpa:
+                    guesses: list[dict] = cpa_stream_guesser(
+                        traces_cpa_store,
+                        textin_cpa_store,
+                        chunk_size=settings.chunk_size,
+                        plotting=settings.plot,
+                        precision=settings.precision,
+                        renderer=renderer,
+                        cache=cache,
+                        model=settings.leakage_model,
+                    )
+                else:
+                    class_stats_cpa = None
+                    if settings.class_stats:
+                        class_stats_cpa = build_class_stats(
+                            traces_cpa_store,
+                            textin_cpa_store,
+                            stats_dir,
+                            settings.precision,
+                        )
+
+                    guesses: list[dict] = cpa_guesser(
+                        traces_cpa_store,
+                        textin_cpa_store,
+                        logging_settings,
+                        plotting=settings.plot,
+                        class_stats=class_stats_cpa,
+                        precision=settings.precision,
+                        executor=pool,
+                        profile_byte=settings.profile_byte,
+                        renderer=renderer,
+                        cache=cache,
+                        model=settings.leakage_model,
+                    )
+
+            print_summary(logger, "CPA", guesses, key)
+            if settings.second_order:
+                print_top_pairs(guesses)
+
+            if models is not None:
+                if settings.second_order:
+                    # The second-order pass has no first-order scores to reuse
+                    with timer("phase.models"):
+                        results = cpa_models_guesser(
+                            traces_cpa_store,
+                            textin_cpa_store,
+                            models,
+                            chunk_size=settings.chunk_size,
+                            precision=settings.precision,
+                            cache=cache,
+                        )
+                print_model_comparison(logger, results, key)
+
+            if settings.template is not None:
+                logger.info("[+] Template attack")
+                run_template(logger, settings, traces_store, textin_store, key)
+
+            if settings.enumerate:
+                with timer("phase.enumeration"):
+                    run_enumeration(logger, settings, guesses, textin, key, pool)
+
+            if settings.plot_correlations:
+                logger.raw("=========================")
+                logger.raw("Plotting all guesses convergence for each byte...")
+                with timer("phase.convergence"):
+                    plot_all_bytes_parallel(
+                        traces_store,
+                        textin_store,
+                        logging_settings,
+                        precision=settings.precision,
+                        executor=pool,
+                        model=settings.dpa_model,
+                    )
+
+                logger.raw("Done.")
+                logger.raw("=========================")
+                logger.raw("Plotting all guesses convergence for each byte... (CPA)")
+                with timer("phase.convergence_cpa"):
+                    plot_all_bytes_parallel_cpa(
+                        traces_cpa_store,
+                        textin_cpa_store,
+                        logging_settings,
+                        precision=settings.precision,
+                        executor=pool,
+                        model=settings.leakage_model,
+                    )
+
+                logger.raw("Done.")
+                logger.raw("=========================")
 
-        logger.raw("Done.")
-        logger.raw("=========================")
+    print_profile(logger, settings)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+import argparse
+import logging
+import time
+
+from src.context.framing import open_sink, pack_records, pack_stream_header
+from src.utils.data_loader import open_textin_store, open_traces_store
+from src.context.shared import load_store
+from src.utils.logger import get_logger, init_logging
+
+
+def parse_replay_args():
+    parser = argparse.ArgumentParser(
+        description="Stream a recorded dataset to a live attack (main.py --live)"
+    )
+
+    parser.add_argument("--traces", default="data/traces.npy", help="Traces .npy")
+    parser.add_argument("--textin", default="data/textin.npy", help="Plaintexts .npy")
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="'-' for stdout, unix:PATH for a Unix socket, or a named pipe / file",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="Traces per second (0: as fast as the reader consumes them)",
+    )
+    parser.add_argument(
+        "--count", type=int, default=None, help="Number of traces to send"
+    )
+    parser.add_argument(
+        "--batch", type=int, default=16, help="Traces written per frame group"
+    )
+    parser.add_argument(
+        "--log-level",
+        default="INFO",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+    )
+
+    args = parser.parse_args()
+    if args.count is not None and args.count < 0:
+        parser.error("--count must not be negative")
+    if args.batch < 1:
+        parser.error("--batch must be at least 1")
+
+    return args
+
+
+def main():
+    args = parse_replay_args()
+    init_logging(level=getattr(logging, args.log_level))
+    logger = get_logger(__name__)
+
+    traces = load_store(open_traces_store(args.traces))
+    textin = load_store(open_textin_store(args.textin))
+    n_traces = traces.shape[0]
+    if args.count is not None and args.count > n_traces:
+        logger.warning("Only %d traces to replay, not %d", n_traces, args.count)
+    elif args.count is not None:
+        n_traces = args.count
+
+    sink = open_sink(args.output)
+    sink.write(pack_stream_header(traces.shape[1], traces.dtype, textin.shape[1]))
+
+    start_time = time.perf_counter()
+    for start in range(0, n_traces, args.batch):
+        stop = min(start + args.batch, n_traces)
+        sink.write(pack_records(traces[start:stop], textin[start:stop], traces.dtype))
+        sink.flush()
+
+        if args.rate > 0:
+            delay = start_time + stop / args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    sink.close()
+    logger.info(
+        "Replayed %d traces in %.2fs", n_traces, time.perf_counter() - start_time
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import numpy as np
+
+from src.aes.tables import SBOX
+
+RCON = [0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40, 0x80, 0x1B, 0x36]
+
+# Classic 32-bit T-tables: one round of SubBytes + ShiftRows + MixColumns is
+# four lookups and four xors per column, for every key at once.
+_S = SBOX.astype(np.uint32)
+_S2 = ((_S << 1) ^ np.where(_S & 0x80, 0x1B, 0).astype(np.uint32)) & 0xFF
+T0 = (_S2 << 24) | (_S << 16) | (_S << 8) | (_S2 ^ _S)
+T1 = (T0 >> 8) | (T0 << 24)
+T2 = (T0 >> 16) | (T0 << 16)
+T3 = (T0 >> 24) | (T0 << 8)
+
+# Lookups go through take(): unlike fancy indexing it does not convert the
+# uint32 indices to intp first, which nearly halves the cost of a round.
+
+
+def _to_words(blocks) -> np.ndarray:
+    blocks = np.asarray(blocks, dtype=np.uint8).reshape(-1, 16)
+    return blocks.reshape(-1, 4, 4).astype(np.uint32) @ np.array(
+        [1 << 24, 1 << 16, 1 << 8, 1], dtype=np.uint32
+    )
+
+
+def _from_words(words) -> np.ndarray:
+    shifts = np.array([24, 16, 8, 0], dtype=np.uint32)
+    return (words[:, :, None] >> shifts).astype(np.uint8).reshape(-1, 16)
+
+
+def _sub_word(w):
+    return (
+        (_S.take(w >> 24) << 24)
+        | (_S.take((w >> 16) & 0xFF) << 16)
+        | (_S.take((w >> 8) & 0xFF) << 8)
+        | _S.take(w & 0xFF)
+    )
+
+
+def expand_keys(keys) -> np.ndarray:
+    w = list(_to_words(keys).T)
+    for i in range(4, 44):
+        temp = w[i - 1]
+        if i % 4 == 0:
+            temp = _sub_word((temp << 8) | (temp >> 24)) ^ np.uint32(
+                RCON[i // 4 - 1] << 24
+            )
+        w.append(w[i - 4] ^ temp)
+
+    # (11 rounds, 4 columns, n keys)
+    return np.stack(w).reshape(11, 4, -1)
+
+
+def aes128_encrypt(plaintexts, keys) -> np.ndarray:
+    # Vectorised over keys (and plaintexts): one row per (plaintext, key) pair
+    rk = expand_keys(keys)
+    s = list(_to_words(plaintexts).T ^ rk[0])
+
+    for r in range(1, 10):
+        s = [
+            T0.take(s[c] >> 24)
+            ^ T1.take((s[(c + 1) % 4] >> 16) & 0xFF)
+            ^ T2.take((s[(c + 2) % 4] >> 8) & 0xFF)
+            ^ T3.take(s[(c + 3) % 4] & 0xFF)
+            ^ rk[r, c]
+            for c in range(4)
+        ]
+
+    s = [
+        (
+            (_S.take(s[c] >> 24) << 24)
+            | (_S.take((s[(c + 1) % 4] >> 16) & 0xFF) << 16)
+            | (_S.take((s[(c + 2) % 4] >> 8) & 0xFF) << 8)
+            | _S.take(s[(c + 3) % 4] & 0xFF)
+        )
+        ^ rk[10, c]
+        for c in range(4)
+    ]
+
+    return _from_words(np.stack(s, axis=1))
+
+
+def matching_keys(keys, plaintext, ciphertext) -> np.ndarray:
+    ciphertext = np.asarray(ciphertext, dtype=np.uint8).reshape(16)
+    return np.nonzero(np.all(aes128_encrypt(plaintext, keys) == ciphertext, axis=1))[0]
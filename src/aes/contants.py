@@ -16,4 +16,24 @@ sbox = [
     0x70,0x3e,0xb5,0x66,0x48,0x03,0xf6,0x0e,0x61,0x35,0x57,0xb9,0x86,0xc1,0x1d,0x9e, # d
     0xe1,0xf8,0x98,0x11,0x69,0xd9,0x8e,0x94,0x9b,0x1e,0x87,0xe9,0xce,0x55,0x28,0xdf, # e
     0x8c,0xa1,0x89,0x0d,0xbf,0xe6,0x42,0x68,0x41,0x99,0x2d,0x0f,0xb0,0x54,0xbb,0x16  # f
-]
\ No newline at end of file
+]
+
+# Key used for every capture of the bundled dataset
+KEY = [
+    0x2B,  # Byte 0
+    0x7E,  # Byte 1
+    0x15,  # ...
+    0x16,
+    0x28,
+    0xAE,
+    0xD2,
+    0xA6,
+    0xAB,
+    0xF7,  # Byte 9
+    0x15,
+    0x88,
+    0x09,
+    0xCF,
+    0x4F,
+    0x3C,
+]
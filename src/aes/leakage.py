@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+from src.aes.tables import BITS_SBOX_OUT, HW, HW_SBOX_OUT, SBOX, SBOX_OUT
+
+_VALUES = np.arange(256, dtype=np.uint8)
+
+# Leakage of the first-round S-box output, indexed as [plaintext_byte, key_guess]
+LEAKAGE_TABLES = {
+    "hw": HW_SBOX_OUT,
+    "id": SBOX_OUT,
+    "hd": HW[SBOX_OUT ^ _VALUES[:, None]],
+    **{f"bit{bit}": BITS_SBOX_OUT[bit] for bit in range(8)},
+}
+
+for _table in LEAKAGE_TABLES.values():
+    _table.flags.writeable = False
+
+
+def _load_custom_table(path: str) -> np.ndarray:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Leakage table not found: {path}")
+
+    if path.endswith(".npy"):
+        values = np.load(path)
+    else:
+        with open(path, encoding="utf-8") as f:
+            values = np.array(f.read().replace(",", " ").split(), dtype=np.float64)
+
+    values = np.asarray(values).reshape(-1)
+    if values.size != 256:
+        raise ValueError(f"A leakage table needs 256 entries, {path} has {values.size}")
+
+    return values
+
+
+def leakage_table(name: str) -> np.ndarray:
+    # "table:PATH" maps the S-box output through a user-supplied 256-entry
+    # table (.npy, or whitespace / comma separated text).
+    if name.startswith("table:"):
+        return _load_custom_table(name[len("table:") :])[SBOX_OUT]
+
+    if name not in LEAKAGE_TABLES:
+        raise ValueError(
+            f"Unknown leakage model: {name} "
+            f"(expected one of {', '.join(LEAKAGE_TABLES)} or table:PATH)"
+        )
+
+    return LEAKAGE_TABLES[name]
+
+
+def leakage_hypotheses(textin, byte_index=0, model="hw"):
+    return leakage_table(model)[textin[:, byte_index]]
+
+
+def selection_table(model="bit0") -> np.ndarray:
+    # DPA splits the traces in two: its model must only take the values 0 and 1
+    table = leakage_table(model)
+    if not np.all((table == 0) | (table == 1)):
+        raise ValueError(
+            f"DPA needs a 0/1 selection model (bit0-bit7 or a 0/1 table), not {model}"
+        )
+
+    return table
+
+
+def output_leakage(model: str) -> np.ndarray:
+    # Leakage of each S-box output value, for the key guess 0x00
+    return leakage_table(model)[np.argsort(SBOX), 0]
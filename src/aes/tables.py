@@ -0,0 +1,28 @@
+import numpy as np
+
+from src.aes.contants import sbox
+
+SBOX = np.array(sbox, dtype=np.uint8)
+HW = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+_VALUES = np.arange(256, dtype=np.uint8)
+
+# Indexed as [plaintext_byte, key_guess]
+SBOX_OUT = SBOX[_VALUES[:, None] ^ _VALUES[None, :]]
+HW_SBOX_OUT = HW[SBOX_OUT]
+BITS_SBOX_OUT = (SBOX_OUT[None, :, :] >> _VALUES[:8, None, None]) & 1
+
+for _table in (SBOX_OUT, HW_SBOX_OUT, BITS_SBOX_OUT):
+    _table.flags.writeable = False
+
+
+def sbox_out_hypotheses(textin, byte_index=0):
+    return SBOX_OUT[textin[:, byte_index]]
+
+
+def hw_hypotheses(textin, byte_index=0):
+    return HW_SBOX_OUT[textin[:, byte_index]]
+
+
+def bit_hypotheses(textin, byte_index=0, bit=0):
+    return BITS_SBOX_OUT[bit][textin[:, byte_index]]
@@ -0,0 +1,302 @@
+import csv
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from src.aes.contants import KEY
+from src.context.class_stats import build_class_stats
+from src.context.shared import load_store, open_npy_store, store_rows, store_slice
+from src.guesser.convergence import cpa_convergence_scores, dpa_convergence_scores
+from src.guesser.cpa import cpa_guesser
+from src.guesser.cpa_stream import cpa_stream_guesser
+from src.guesser.dpa import dpa_guesser
+from src.guesser.template import build_templates, template_guesser
+from src.utils.logger import get_logger
+from src.utils.synthetic import write_synthetic_dataset
+
+logger = get_logger(__name__)
+
+
+def _key_bytes_ok(guesses):
+    return sum(int(r["guess"], 16) == k for r, k in zip(guesses, KEY))
+
+
+def _run_dpa(traces_store, textin_store, workdir, precision):
+    return _key_bytes_ok(dpa_guesser(traces_store, textin_store, precision=precision))
+
+
+def _run_dpa_stats(traces_store, textin_store, workdir, precision):
+    class_stats = build_class_stats(
+        traces_store, textin_store, os.path.join(workdir, "class_stats"), precision
+    )
+    return _key_bytes_ok(
+        dpa_guesser(traces_store, textin_store, class_stats=class_stats)
+    )
+
+
+def _run_cpa(traces_store, textin_store, workdir, precision):
+    return _key_bytes_ok(cpa_guesser(traces_store, textin_store, precision=precision))
+
+
+def _run_cpa_stats(traces_store, textin_store, workdir, precision):
+    class_stats = build_class_stats(
+        traces_store, textin_store, os.path.join(workdir, "class_stats"), precision
+    )
+    return _key_bytes_ok(
+        cpa_guesser(traces_store, textin_store, class_stats=class_stats)
+    )
+
+
+def _run_cpa_stream(traces_store, textin_store, workdir, precision):
+    return _key_bytes_ok(
+        cpa_stream_guesser(traces_store, textin_store, precision=precision)
+    )
+
+
+def _run_convergence(scores_fn, traces_store, textin_store, precision):
+    traces = load_store(traces_store)
+    textin = load_store(textin_store)
+
+    n_traces = traces.shape[0]
+    checkpoints = np.arange(10, n_traces, max(5, n_traces // 100))
+    dtype = np.dtype(precision)
+
+    ok = 0
+    for b in range(textin.shape[1]):
+        scores = scores_fn(traces, textin, b, checkpoints, dtype)
+        ok += int(np.argmax(scores[:, -1])) == KEY[b]
+
+    return ok
+
+
+def _run_dpa_convergence(traces_store, textin_store, workdir, precision):
+    return _run_convergence(
+        dpa_convergence_scores, traces_store, textin_store, precision
+    )
+
+
+def _run_cpa_convergence(traces_store, textin_store, workdir, precision):
+    return _run_convergence(
+        cpa_convergence_scores, traces_store, textin_store, precision
+    )
+
+
+def _run_template(traces_store, textin_store, workdir, precision):
+    # Profile on the first half with the known key, match the second half.
+    # Both phases are timed separately: profiling cost grows with the
+    # profiling set, matching cost with the attacked traces.
+    half = store_rows(traces_store) // 2
+
+    start = time.perf_counter()
+    templates = build_templates(
+        load_store(store_slice(traces_store, 0, half)),
+        load_store(textin_store)[:half],
+        KEY,
+    )
+    profile_s = time.perf_counter() - start
+
+    guesses, report = template_guesser(
+        store_slice(traces_store, half, store_rows(traces_store)),
+        store_slice(textin_store, half, store_rows(textin_store)),
+        templates,
+    )
+
+    return {
+        "key_bytes_ok": _key_bytes_ok(guesses),
+        "profile_s": profile_s,
+        "match_s": report["elapsed"],
+    }
+
+
+ENGINES = {
+    "dpa": _run_dpa,
+    "dpa-stats": _run_dpa_stats,
+    "cpa": _run_cpa,
+    "cpa-stats": _run_cpa_stats,
+    "cpa-stream": _run_cpa_stream,
+    "dpa-convergence": _run_dpa_convergence,
+    "cpa-convergence": _run_cpa_convergence,
+    "template": _run_template,
+}
+
+
+def _peak_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    return resource.getrusage(who).ru_maxrss / scale
+
+
+def _run_case(engine, traces_path, textin_path, workdir, precision):
+    traces_store = open_npy_store(traces_path)
+    textin_store = open_npy_store(textin_path)
+
+    start = time.perf_counter()
+    outcome = ENGINES[engine](traces_store, textin_store, workdir, precision)
+    wall = time.perf_counter() - start
+
+    # Engines return the recovered key bytes, or a dict with per-phase timings
+    if not isinstance(outcome, dict):
+        outcome = {"key_bytes_ok": outcome}
+
+    return {
+        "wall_s": wall,
+        **outcome,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_rss_workers_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def _run_isolated(*args):
+    # A fresh interpreter per case keeps peak RSS and warm caches independent
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as ex:
+        return ex.submit(_run_case, *args).result()
+
+
+def run_benchmarks(
+    traces_grid,
+    samples_grid,
+    engines,
+    repeat=1,
+    precision="float64",
+    max_dataset_mb=4096,
+    **generator_kwargs,
+) -> list[dict]:
+    results = []
+
+    for n_traces in traces_grid:
+        for n_samples in samples_grid:
+            dataset_mb = n_traces * n_samples * 4 / 2**20
+            if dataset_mb > max_dataset_mb:
+                logger.warning(
+                    "Skipping %d traces x %d samples (%.0f MB > %.0f MB)",
+                    n_traces,
+                    n_samples,
+                    dataset_mb,
+                    max_dataset_mb,
+                )
+                continue
+
+            workdir = tempfile.mkdtemp(prefix="ri3a_bench_")
+            try:
+                traces_path, textin_path = write_synthetic_dataset(
+                    os.path.join(workdir, "traces.npy"),
+                    os.path.join(workdir, "textin.npy"),
+                    n_traces,
+                    n_samples,
+                    **generator_kwargs,
+                )
+
+                for engine in engines:
+                    for run in range(repeat):
+                        case = _run_isolated(
+                            engine, traces_path, textin_path, workdir, precision
+                        )
+                        case.update(
+                            engine=engine,
+                            n_traces=n_traces,
+                            n_samples=n_samples,
+                            run=run,
+                            precision=precision,
+                            traces_per_s=n_traces / max(case["wall_s"], 1e-9),
+                        )
+                        results.append(case)
+                        if "profile_s" in case:
+                            logger.info(
+                                "%-16s %8d x %6d: profiling %.2fs, matching %.3fs",
+                                engine,
+                                n_traces,
+                                n_samples,
+                                case["profile_s"],
+                                case["match_s"],
+                            )
+                        logger.info(
+                            "%-16s %8d x %6d: %8.2fs  %10.0f traces/s  "
+                            "%7.0f MB  key %2d/16",
+                            engine,
+                            n_traces,
+                            n_samples,
+                            case["wall_s"],
+                            case["traces_per_s"],
+                            max(case["peak_rss_mb"], case["peak_rss_workers_mb"]),
+                            case["key_bytes_ok"],
+                        )
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+REPORT_FIELDS = [
+    "engine",
+    "n_traces",
+    "n_samples",
+    "run",
+    "precision",
+    "wall_s",
+    "traces_per_s",
+    "peak_rss_mb",
+    "peak_rss_workers_mb",
+    "key_bytes_ok",
+    "profile_s",
+    "match_s",
+]
+
+
+def write_report(results, output, startup=None):
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    if startup is not None:
+        report["startup"] = startup
+
+    with open(f"{output}.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    with open(f"{output}.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(results)
+
+    return f"{output}.json", f"{output}.csv"
+
+
+def find_regressions(results, baseline_path, tolerance=0.2) -> list[dict]:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f).get("results", [])
+
+    def best(rows):
+        table = {}
+        for r in rows:
+            key = (r["engine"], r["n_traces"], r["n_samples"])
+            table[key] = max(table.get(key, 0.0), r["traces_per_s"])
+        return table
+
+    reference = best(baseline)
+    regressions = []
+    for key, speed in best(results).items():
+        if key in reference and speed < reference[key] * (1 - tolerance):
+            regressions.append(
+                {
+                    "engine": key[0],
+                    "n_traces": key[1],
+                    "n_samples": key[2],
+                    "traces_per_s": speed,
+                    "baseline_traces_per_s": reference[key],
+                }
+            )
+
+    return regressions
@@ -0,0 +1,92 @@
+import json
+import subprocess
+import sys
+import time
+
+# What gets imported before any work starts: the CLI entry point, and what a
+# spawned pool worker imports to unpickle the guesser tasks.
+STARTUP_TARGETS = {
+    "cli": "import main",
+    "worker": "import src.context.pool, src.guesser.dpa, src.guesser.cpa",
+}
+
+# Only needed for plots, progress bars and colored log output
+HEAVY_MODULES = ("matplotlib", "tqdm", "colorama")
+
+
+def _parse_importtime(stderr, roots):
+    # "import time: self [us] | cumulative | imported package", nested
+    # imports are indented under their parent: only sum the top-level ones.
+    total_us = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        top_level = len(name) - len(name.lstrip()) == 1
+        if top_level and name.strip().split(".")[0] in roots:
+            total_us += int(cumulative)
+
+    return total_us / 1000
+
+
+def measure_startup(target, repeat=5) -> dict:
+    stmt = STARTUP_TARGETS[target]
+    roots = {m.strip().split(".")[0] for m in stmt[len("import ") :].split(",")}
+    probe = (
+        f"{stmt}; import json, sys; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+
+    import_ms = []
+    wall_ms = []
+    heavy = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", probe],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        wall_ms.append((time.perf_counter() - start) * 1000)
+        import_ms.append(_parse_importtime(proc.stderr, roots))
+        heavy = json.loads(proc.stdout.splitlines()[-1])
+
+    # The minimum is the least noisy estimate of a cold start
+    return {
+        "target": target,
+        "import_ms": min(import_ms),
+        "wall_ms": min(wall_ms),
+        "heavy_modules": heavy,
+    }
+
+
+def run_startup_benchmarks(repeat=5) -> list[dict]:
+    return [measure_startup(target, repeat) for target in STARTUP_TARGETS]
+
+
+def find_startup_regressions(results, baseline_path=None, tolerance=0.2):
+    regressions = [
+        {"target": r["target"], "reason": f"imports {', '.join(r['heavy_modules'])}"}
+        for r in results
+        if r["heavy_modules"]
+    ]
+
+    if baseline_path is None:
+        return regressions
+
+    with open(baseline_path, encoding="utf-8") as f:
+        reference = {r["target"]: r for r in json.load(f).get("startup", [])}
+
+    for r in results:
+        ref = reference.get(r["target"])
+        if ref is not None and r["import_ms"] > ref["import_ms"] * (1 + tolerance):
+            regressions.append(
+                {
+                    "target": r["target"],
+                    "reason": f"import {r['import_ms']:.1f} ms "
+                    f"(baseline {ref['import_ms']:.1f} ms)",
+                }
+            )
+
+    return regressions
@@ -1,5 +1,7 @@
 import argparse
 
+from src.context.precision import PRECISIONS
+
 
 def parse_cli_args():
     parser = argparse.ArgumentParser()
@@ -15,6 +17,41 @@ def parse_cli_args():
         help="Override log level",
     )
 
+    parser.add_argument(
+        "--dataset",
+        default=None,
+        help="Trace container directory (default: data/traces.npy and data/textin.npy)",
+    )
+
+    parser.add_argument(
+        "--preprocess",
+        default=None,
+        metavar="PIPELINE",
+        help="Preprocess the traces before attacking them, e.g. "
+        "align:450:800:50,lowpass:0.2,movavg:4,decimate:2",
+    )
+
+    parser.add_argument(
+        "--preprocess-output",
+        default=None,
+        help="Container directory of the preprocessed traces "
+        "(default: .cache/preprocessed/<hash>)",
+    )
+
+    parser.add_argument(
+        "--live",
+        default=None,
+        metavar="SOURCE",
+        help="Attack traces streamed from '-' (stdin), unix:PATH or a named pipe",
+    )
+
+    parser.add_argument(
+        "--live-interval",
+        type=int,
+        default=None,
+        help="Number of traces between two live reports",
+    )
+
     parser.add_argument(
         "--plot",
         action="store_true",
@@ -34,4 +71,224 @@ def parse_cli_args():
         help="Number of traces to use for CPA analysis",
     )
 
+    parser.add_argument(
+        "--class-stats",
+        action="store_true",
+        help="Reduce traces to per-plaintext-class statistics before guessing",
+    )
+
+    parser.add_argument(
+        "--stream-cpa",
+        action="store_true",
+        help="Run CPA out-of-core by streaming trace chunks from the mmap file",
+    )
+
+    parser.add_argument(
+        "--leakage-model",
+        default=None,
+        metavar="MODEL",
+        help="CPA leakage model of the S-box output: hw (default), id, hd, "
+        "bit0-bit7 or table:PATH",
+    )
+
+    parser.add_argument(
+        "--dpa-model",
+        default=None,
+        metavar="MODEL",
+        help="DPA selection bit of the S-box output: bit0 (default) to bit7, or "
+        "table:PATH with 0/1 entries",
+    )
+
+    parser.add_argument(
+        "--compare-models",
+        nargs="+",
+        default=None,
+        metavar="MODEL",
+        help="Score these CPA leakage models next to --leakage-model, in the same "
+        "pass as the main CPA: hw, id, hd, bit0-bit7 or table:PATH",
+    )
+
+    parser.add_argument(
+        "--second-order",
+        action="store_true",
+        help="Run CPA on combined sample pairs (masked implementations)",
+    )
+
+    parser.add_argument(
+        "--second-order-combine",
+        default=None,
+        choices=["product", "absdiff"],
+        help="Pair combination: centred product or absolute difference",
+    )
+
+    parser.add_argument(
+        "--second-order-top-k",
+        type=int,
+        default=None,
+        help="Number of best (pair, guess) entries listed per byte",
+    )
+
+    parser.add_argument(
+        "--second-order-max-mb",
+        type=float,
+        default=None,
+        help="Memory cap of one second-order worker, in MB",
+    )
+
+    parser.add_argument(
+        "--template",
+        default=None,
+        metavar="PATH",
+        help="Template attack: load the templates in PATH (.npz), or profile them "
+        "on the first traces with the known key and save them there",
+    )
+
+    parser.add_argument(
+        "--template-model",
+        default=None,
+        help="Template classes: hw (9 classes), id (256), hd or bit0-bit7",
+    )
+
+    parser.add_argument(
+        "--template-poi",
+        type=int,
+        default=None,
+        help="Points of interest per byte, ranked by NICV",
+    )
+
+    parser.add_argument(
+        "--template-profile-traces",
+        type=int,
+        default=None,
+        help="Traces used for profiling; the rest are attacked (default: half)",
+    )
+
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Number of traces per chunk in streaming mode",
+    )
+
+    parser.add_argument(
+        "--precision",
+        default=None,
+        choices=PRECISIONS,
+        help="Compute precision of the large matrix products",
+    )
+
+    parser.add_argument(
+        "--enumerate",
+        action="store_true",
+        help="Estimate the key rank and search full keys from the CPA score tables",
+    )
+
+    parser.add_argument(
+        "--max-candidates",
+        type=int,
+        default=None,
+        help="Maximum number of full keys tested by --enumerate",
+    )
+
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Grow the trace count batch by batch and stop each byte once stable",
+    )
+
+    parser.add_argument(
+        "--adaptive-initial",
+        type=int,
+        default=None,
+        help="Number of traces in the first adaptive batch",
+    )
+
+    parser.add_argument(
+        "--adaptive-growth",
+        type=float,
+        default=None,
+        help="Growth factor of the trace count between adaptive checkpoints",
+    )
+
+    parser.add_argument(
+        "--adaptive-patience",
+        type=int,
+        default=None,
+        help="Checkpoints a byte's best guess must stay unchanged to stop",
+    )
+
+    parser.add_argument(
+        "--adaptive-confidence",
+        type=float,
+        default=None,
+        help="Minimum confidence (0-1) for a byte to stop",
+    )
+
+    parser.add_argument(
+        "--sample-range",
+        default=None,
+        metavar="START:END",
+        help="Restrict all attacks to the samples in [START, END)",
+    )
+
+    parser.add_argument(
+        "--poi-top-k",
+        type=int,
+        default=None,
+        help="Keep the K samples with the highest NICV for each byte",
+    )
+
+    parser.add_argument(
+        "--poi-threshold",
+        type=float,
+        default=None,
+        help="Keep the samples whose NICV reaches this threshold for any byte",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-stage timing breakdown and write it as JSON",
+    )
+
+    parser.add_argument(
+        "--profile-output",
+        default=None,
+        help="Path of the JSON profile report",
+    )
+
+    parser.add_argument(
+        "--profile-byte",
+        type=int,
+        default=None,
+        help="Run the DPA/CPA worker of this byte under cProfile",
+    )
+
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Reuse the DPA/CPA score matrices of earlier runs, and store new ones "
+        "(default: on; --no-cache recomputes everything and writes nothing)",
+    )
+
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Delete every cached score matrix before running",
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory of the score matrix cache",
+    )
+
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=None,
+        help="Size cap of the score matrix cache in MB (default: 1024)",
+    )
+
     return parser.parse_args()
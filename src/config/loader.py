@@ -9,6 +9,24 @@ def load_config_file(path: str) -> dict:
         return tomllib.load(f)
 
 
+def parse_sample_range(value: str) -> tuple[int, int]:
+    start, sep, end = value.partition(":")
+    if not sep:
+        raise ValueError(f"Invalid sample range (expected START:END): {value}")
+
+    start = int(start) if start else 0
+    end = int(end) if end else None
+    if end is not None and end <= start:
+        raise ValueError(f"Empty sample range: {value}")
+
+    return start, end
+
+
+def _require_positive(value, name):
+    if value is not None and value < 1:
+        raise ValueError(f"{name} must be at least 1, got {value}")
+
+
 def merge_config(cli_args, cfg_file: dict) -> Settings:
     settings = Settings()
 
@@ -20,13 +38,113 @@ def merge_config(cli_args, cfg_file: dict) -> Settings:
         settings.log_format = log_cfg.get("format", settings.log_format)
         settings.log_datefmt = log_cfg.get("datefmt", settings.log_datefmt)
 
+    if "data" in cfg_file:
+        settings.dataset = cfg_file["data"].get("dataset", settings.dataset)
+
+    if "preprocess" in cfg_file:
+        pre_cfg = cfg_file["preprocess"]
+        settings.preprocess = pre_cfg.get("pipeline", settings.preprocess)
+        settings.preprocess_output = pre_cfg.get("output", settings.preprocess_output)
+
+    if "live" in cfg_file:
+        live_cfg = cfg_file["live"]
+        settings.live = live_cfg.get("source", settings.live)
+        settings.live_interval = live_cfg.get("interval", settings.live_interval)
+
     if "output" in cfg_file:
         out_cfg = cfg_file["output"]
         settings.plot = out_cfg.get("plot", settings.plot)
 
+    if "compute" in cfg_file:
+        compute_cfg = cfg_file["compute"]
+        settings.class_stats = compute_cfg.get("class_stats", settings.class_stats)
+        settings.stream_cpa = compute_cfg.get("stream_cpa", settings.stream_cpa)
+        settings.chunk_size = compute_cfg.get("chunk_size", settings.chunk_size)
+        settings.precision = compute_cfg.get("precision", settings.precision)
+
+    if "models" in cfg_file:
+        models_cfg = cfg_file["models"]
+        settings.leakage_model = models_cfg.get("model", settings.leakage_model)
+        settings.dpa_model = models_cfg.get("dpa_model", settings.dpa_model)
+        settings.compare_models = models_cfg.get("compare", settings.compare_models)
+
+    if "second_order" in cfg_file:
+        so_cfg = cfg_file["second_order"]
+        settings.second_order = so_cfg.get("enabled", settings.second_order)
+        settings.second_order_combine = so_cfg.get(
+            "combine", settings.second_order_combine
+        )
+        settings.second_order_top_k = so_cfg.get("top_k", settings.second_order_top_k)
+        settings.second_order_max_mb = so_cfg.get(
+            "max_mb", settings.second_order_max_mb
+        )
+
+    if "template" in cfg_file:
+        tpl_cfg = cfg_file["template"]
+        settings.template = tpl_cfg.get("file", settings.template)
+        settings.template_model = tpl_cfg.get("model", settings.template_model)
+        settings.template_poi = tpl_cfg.get("poi", settings.template_poi)
+        settings.template_profile_traces = tpl_cfg.get(
+            "profile_traces", settings.template_profile_traces
+        )
+
+    if "enumeration" in cfg_file:
+        enum_cfg = cfg_file["enumeration"]
+        settings.enumerate = enum_cfg.get("enabled", settings.enumerate)
+        settings.max_candidates = enum_cfg.get(
+            "max_candidates", settings.max_candidates
+        )
+
+    if "adaptive" in cfg_file:
+        adaptive_cfg = cfg_file["adaptive"]
+        settings.adaptive = adaptive_cfg.get("enabled", settings.adaptive)
+        settings.adaptive_initial = adaptive_cfg.get(
+            "initial", settings.adaptive_initial
+        )
+        settings.adaptive_growth = adaptive_cfg.get("growth", settings.adaptive_growth)
+        settings.adaptive_patience = adaptive_cfg.get(
+            "patience", settings.adaptive_patience
+        )
+        settings.adaptive_min_confidence = adaptive_cfg.get(
+            "min_confidence", settings.adaptive_min_confidence
+        )
+
+    if "poi" in cfg_file:
+        poi_cfg = cfg_file["poi"]
+        if "sample_range" in poi_cfg:
+            settings.sample_range = parse_sample_range(poi_cfg["sample_range"])
+        settings.poi_top_k = poi_cfg.get("top_k", settings.poi_top_k)
+        settings.poi_threshold = poi_cfg.get("threshold", settings.poi_threshold)
+
+    if "profile" in cfg_file:
+        profile_cfg = cfg_file["profile"]
+        settings.profile = profile_cfg.get("enabled", settings.profile)
+        settings.profile_output = profile_cfg.get("output", settings.profile_output)
+
+    if "cache" in cfg_file:
+        cache_cfg = cfg_file["cache"]
+        settings.cache = cache_cfg.get("enabled", settings.cache)
+        settings.cache_dir = cache_cfg.get("dir", settings.cache_dir)
+        settings.cache_max_mb = cache_cfg.get("max_mb", settings.cache_max_mb)
+
     if cli_args.log_level:
         settings.log_level = getattr(logging, cli_args.log_level.upper())
 
+    if cli_args.dataset is not None:
+        settings.dataset = cli_args.dataset
+
+    if cli_args.preprocess is not None:
+        settings.preprocess = cli_args.preprocess
+
+    if cli_args.preprocess_output is not None:
+        settings.preprocess_output = cli_args.preprocess_output
+
+    if cli_args.live is not None:
+        settings.live = cli_args.live
+
+    if cli_args.live_interval is not None:
+        settings.live_interval = cli_args.live_interval
+
     if cli_args.plot:
         settings.plot = True
 
@@ -36,4 +154,113 @@ def merge_config(cli_args, cfg_file: dict) -> Settings:
     if cli_args.nb_cpa_traces is not None:
         settings.nb_cpa_traces = cli_args.nb_cpa_traces
 
+    if cli_args.class_stats:
+        settings.class_stats = True
+
+    if cli_args.stream_cpa:
+        settings.stream_cpa = True
+
+    if cli_args.leakage_model is not None:
+        settings.leakage_model = cli_args.leakage_model
+
+    if cli_args.dpa_model is not None:
+        settings.dpa_model = cli_args.dpa_model
+
+    if cli_args.compare_models is not None:
+        settings.compare_models = cli_args.compare_models
+
+    if cli_args.second_order:
+        settings.second_order = True
+
+    if cli_args.second_order_combine is not None:
+        settings.second_order_combine = cli_args.second_order_combine
+
+    if cli_args.second_order_top_k is not None:
+        settings.second_order_top_k = cli_args.second_order_top_k
+
+    if cli_args.second_order_max_mb is not None:
+        settings.second_order_max_mb = cli_args.second_order_max_mb
+
+    if cli_args.template is not None:
+        settings.template = cli_args.template
+
+    if cli_args.template_model is not None:
+        settings.template_model = cli_args.template_model
+
+    if cli_args.template_poi is not None:
+        settings.template_poi = cli_args.template_poi
+
+    if cli_args.template_profile_traces is not None:
+        settings.template_profile_traces = cli_args.template_profile_traces
+
+    if cli_args.chunk_size is not None:
+        settings.chunk_size = cli_args.chunk_size
+
+    if cli_args.precision is not None:
+        settings.precision = cli_args.precision
+
+    if cli_args.enumerate:
+        settings.enumerate = True
+
+    if cli_args.max_candidates is not None:
+        settings.max_candidates = cli_args.max_candidates
+
+    if cli_args.adaptive:
+        settings.adaptive = True
+
+    if cli_args.adaptive_initial is not None:
+        settings.adaptive_initial = cli_args.adaptive_initial
+
+    if cli_args.adaptive_growth is not None:
+        settings.adaptive_growth = cli_args.adaptive_growth
+
+    if cli_args.adaptive_patience is not None:
+        settings.adaptive_patience = cli_args.adaptive_patience
+
+    if cli_args.adaptive_confidence is not None:
+        settings.adaptive_min_confidence = cli_args.adaptive_confidence
+
+    if cli_args.sample_range is not None:
+        settings.sample_range = parse_sample_range(cli_args.sample_range)
+
+    if cli_args.poi_top_k is not None:
+        settings.poi_top_k = cli_args.poi_top_k
+
+    if cli_args.poi_threshold is not None:
+        settings.poi_threshold = cli_args.poi_threshold
+
+    if cli_args.profile:
+        settings.profile = True
+
+    if cli_args.profile_output is not None:
+        settings.profile_output = cli_args.profile_output
+
+    if cli_args.profile_byte is not None:
+        settings.profile_byte = cli_args.profile_byte
+
+    if cli_args.cache is not None:
+        settings.cache = cli_args.cache
+
+    if cli_args.clear_cache:
+        settings.clear_cache = True
+
+    if cli_args.cache_dir is not None:
+        settings.cache_dir = cli_args.cache_dir
+
+    if cli_args.cache_max_mb is not None:
+        settings.cache_max_mb = cli_args.cache_max_mb
+
+    _require_positive(settings.poi_top_k, "poi_top_k")
+    _require_positive(settings.second_order_top_k, "second_order_top_k")
+    _require_positive(settings.live_interval, "live_interval")
+    _require_positive(settings.chunk_size, "chunk_size")
+    _require_positive(settings.adaptive_initial, "adaptive_initial")
+    _require_positive(settings.adaptive_patience, "adaptive_patience")
+    if settings.adaptive_growth <= 1:
+        raise ValueError(
+            f"adaptive_growth must be greater than 1, got {settings.adaptive_growth}"
+        )
+    if settings.cache_max_mb <= 0:
+        raise ValueError(f"cache_max_mb must be positive, got {settings.cache_max_mb}")
+
     return settings
@@ -6,6 +6,43 @@ class Settings:
         self.log_level = logging.INFO
         self.log_format = "[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s"
         self.log_datefmt = "%Y-%m-%d %H:%M:%S"
+        self.dataset = None
+        self.preprocess = None
+        self.preprocess_output = None
+        self.live = None
+        self.live_interval = 1000
+        self.enumerate = False
+        self.max_candidates = 1 << 24
+        self.adaptive = False
+        self.adaptive_initial = 50
+        self.adaptive_growth = 1.5
+        self.adaptive_patience = 3
+        self.adaptive_min_confidence = 0.2
         self.plot = False
         self.plot_correlations = False
         self.nb_cpa_traces = 100
+        self.class_stats = False
+        self.stream_cpa = False
+        self.leakage_model = "hw"
+        self.dpa_model = "bit0"
+        self.compare_models = None
+        self.second_order = False
+        self.second_order_combine = "product"
+        self.second_order_top_k = 10
+        self.second_order_max_mb = 256.0
+        self.template = None
+        self.template_model = "hw"
+        self.template_poi = 5
+        self.template_profile_traces = None
+        self.chunk_size = 1024
+        self.precision = "float64"
+        self.sample_range = None
+        self.poi_top_k = None
+        self.poi_threshold = None
+        self.profile = False
+        self.profile_output = "profile.json"
+        self.profile_byte = None
+        self.cache = True
+        self.cache_dir = ".cache/scores"
+        self.cache_max_mb = 1024.0
+        self.clear_cache = False
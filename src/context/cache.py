@@ -0,0 +1,141 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from src.utils.logger import get_logger
+from src.utils.profiling import count, timed
+
+logger = get_logger(__name__)
+
+
+def score_cache(directory=".cache/scores", max_mb=1024.0) -> dict:
+    return {"dir": directory, "max_bytes": int(max_mb * 2**20)}
+
+
+def store_fingerprint(store: dict) -> dict:
+    # mtime and size identify the file content without hashing gigabytes
+    st = os.stat(store["path"])
+    return {
+        "path": os.path.abspath(store["path"]),
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "offset": store["offset"],
+        "shape": list(store["shape"]),
+        "dtype": store["dtype"],
+        "start": store["start"],
+        "stop": store["stop"],
+        "columns": list(store.get("columns") or []),
+    }
+
+
+def _leakage_fingerprint(leakage: str):
+    # A custom table is identified by its file, like the trace stores
+    if leakage.startswith("table:"):
+        st = os.stat(leakage[len("table:") :])
+        return [os.path.abspath(leakage[len("table:") :]), st.st_mtime_ns, st.st_size]
+
+    return leakage
+
+
+def score_key(
+    attack, traces_store, textin_store, byte_index, precision, leakage="hw"
+) -> str:
+    payload = {
+        "attack": attack,
+        "leakage": _leakage_fingerprint(leakage),
+        "traces": store_fingerprint(traces_store),
+        "textin": store_fingerprint(textin_store),
+        "byte": int(byte_index),
+        "precision": precision,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _entry_path(cache: dict, key: str) -> str:
+    return os.path.join(cache["dir"], f"{key}.npy")
+
+
+@timed("cache.load")
+def cache_load(cache: dict, key: str):
+    path = _entry_path(cache, key)
+    try:
+        matrix = np.load(path)
+    except (FileNotFoundError, OSError, ValueError):
+        count("cache.miss")
+        return None
+
+    # The modification time doubles as the LRU timestamp
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+    count("cache.hit")
+    return matrix
+
+
+@timed("cache.save")
+def cache_save(cache: dict, key: str, matrix):
+    os.makedirs(cache["dir"], exist_ok=True)
+
+    path = _entry_path(cache, key)
+    # Score matrices are mostly noise and barely compress: store them raw,
+    # and publish atomically so concurrent workers never read a partial file.
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, matrix)
+    os.replace(tmp, path)
+
+    evict_cache(cache)
+
+
+def evict_cache(cache: dict):
+    entries = []
+    for path in glob.glob(os.path.join(cache["dir"], "*.npy")):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= cache["max_bytes"]:
+            break
+        try:
+            os.remove(path)
+            count("cache.evicted")
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def clear_cache(cache: dict):
+    shutil.rmtree(cache["dir"], ignore_errors=True)
+    logger.info("Cleared score cache %s", cache["dir"])
+
+
+def cached_matrix(
+    cache,
+    compute,
+    attack,
+    traces_store,
+    textin_store,
+    byte_index,
+    precision,
+    leakage="hw",
+):
+    if cache is None:
+        return compute()
+
+    key = score_key(attack, traces_store, textin_store, byte_index, precision, leakage)
+    matrix = cache_load(cache, key)
+    if matrix is None:
+        matrix = compute()
+        cache_save(cache, key, matrix)
+
+    return matrix
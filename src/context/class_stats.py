@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from src.context.cache import store_fingerprint
+from src.context.precision import compute_dtype
+from src.context.shared import load_store, raw_store, save_array_to_mmap, store_samples
+from src.utils.logger import get_logger
+from src.utils.profiling import timed
+
+logger = get_logger(__name__)
+
+CLASS_STATS_DIR = ".cache/class_stats"
+
+
+@timed("class_stats.compute")
+def compute_class_stats(traces, textin, chunk_size=1024, dtype=np.float64):
+    n_bytes = textin.shape[1]
+    n_samples = traces.shape[1]
+
+    counts = np.zeros((n_bytes, 256), dtype=dtype)
+    sums = np.zeros((n_bytes, 256, n_samples), dtype=dtype)
+    sumsq = np.zeros((n_bytes, 256, n_samples), dtype=dtype)
+
+    classes = np.arange(256, dtype=np.uint8)
+
+    for start in range(0, traces.shape[0], chunk_size):
+        chunk = np.asarray(traces[start : start + chunk_size], dtype=dtype)
+        chunk_sq = chunk**2
+        textin_chunk = textin[start : start + chunk_size]
+
+        for b in range(n_bytes):
+            onehot = (textin_chunk[:, b, None] == classes).astype(dtype)
+            counts[b] += onehot.sum(axis=0)
+            sums[b] += onehot.T @ chunk
+            sumsq[b] += onehot.T @ chunk_sq
+
+    return counts, sums, sumsq
+
+
+def class_stats_key(traces_store, textin_store, precision) -> str:
+    payload = {
+        "traces": store_fingerprint(traces_store),
+        "textin": store_fingerprint(textin_store),
+        "precision": precision,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _class_stats_stores(path, n_bytes, n_samples, dtype) -> dict:
+    shapes = {
+        "counts": (n_bytes, 256),
+        "sums": (n_bytes, 256, n_samples),
+        "sumsq": (n_bytes, 256, n_samples),
+    }
+    return {
+        name: raw_store(os.path.join(path, f"{name}.bin"), shape, dtype)
+        for name, shape in shapes.items()
+    }
+
+
+def _complete(store) -> bool:
+    size = np.dtype(store["dtype"]).itemsize * int(np.prod(store["shape"]))
+    return os.path.isfile(store["path"]) and os.path.getsize(store["path"]) == size
+
+
+@timed("class_stats.build")
+def build_class_stats(
+    traces_store: dict,
+    textin_store: dict,
+    directory=CLASS_STATS_DIR,
+    precision="float64",
+) -> dict:
+    # One subdirectory per source and precision: a later run on the same
+    # traces reuses the statistics, other sources never overwrite them.
+    path = os.path.join(
+        directory, class_stats_key(traces_store, textin_store, precision)[:16]
+    )
+    dtype = compute_dtype(precision)
+    n_bytes = textin_store["shape"][1]
+    stores = _class_stats_stores(path, n_bytes, store_samples(traces_store), dtype)
+    if all(_complete(store) for store in stores.values()):
+        logger.info("Reusing class statistics in %s", path)
+        return stores
+
+    traces = load_store(traces_store)
+    textin = load_store(textin_store)
+    counts, sums, sumsq = compute_class_stats(traces, textin, dtype=dtype)
+    logger.info(
+        "Class statistics built from %d traces (%d classes x %d samples per byte)",
+        traces.shape[0],
+        sums.shape[1],
+        sums.shape[2],
+    )
+
+    # Each file is renamed into place once complete, so concurrent runs on
+    # the same source never read a partial one
+    os.makedirs(path, exist_ok=True)
+    for name, arr in (("counts", counts), ("sums", sums), ("sumsq", sumsq)):
+        tmp = f"{stores[name]['path']}.{os.getpid()}.tmp"
+        save_array_to_mmap(arr, tmp)
+        os.replace(tmp, stores[name]["path"])
+
+    return stores
+
+
+def load_class_stats(class_stats: dict, byte_index=0):
+    counts = load_store(class_stats["counts"])
+    sums = load_store(class_stats["sums"])
+    sumsq = load_store(class_stats["sumsq"])
+
+    return counts[byte_index], sums[byte_index], sumsq[byte_index]
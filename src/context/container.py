@@ -0,0 +1,237 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from src.context.shared import load_store, raw_store
+from src.utils.logger import get_logger
+from src.utils.profiling import timed
+
+logger = get_logger(__name__)
+
+CONTAINER_VERSION = 1
+HEADER_FILE = "header.json"
+
+# A container is a directory holding one append-only raw file per stream
+# (trace-major traces, plaintexts, optional ciphertexts) and a header. Each
+# appended block is recorded as a chunk, but the blocks are contiguous so a
+# single memory map gives O(1) access to any trace range.
+STREAM_FILES = {
+    "traces": "traces.bin",
+    "textin": "textin.bin",
+    "textout": "textout.bin",
+    "sample_major": "traces_sample_major.bin",
+}
+
+
+def is_container(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, HEADER_FILE))
+
+
+def read_header(path: str) -> dict:
+    with open(os.path.join(path, HEADER_FILE), encoding="utf-8") as f:
+        header = json.load(f)
+
+    if header.get("version") != CONTAINER_VERSION:
+        raise ValueError(
+            f"Unsupported container version {header.get('version')}: {path}"
+        )
+
+    return header
+
+
+def _write_header(path: str, header: dict):
+    # Readers only ever see a complete header: the trace count is published
+    # after the data it describes has been written.
+    tmp = os.path.join(path, f"{HEADER_FILE}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(header, f, indent=2)
+    os.replace(tmp, os.path.join(path, HEADER_FILE))
+
+
+def create_container(
+    path: str,
+    n_samples: int,
+    dtype=np.float32,
+    text_bytes=16,
+    textout=False,
+    sample_rate=None,
+    key=None,
+    **metadata,
+) -> dict:
+    if os.path.exists(os.path.join(path, HEADER_FILE)):
+        raise FileExistsError(f"Container already exists: {path}")
+    os.makedirs(path, exist_ok=True)
+
+    header = {
+        "version": CONTAINER_VERSION,
+        "n_traces": 0,
+        "n_samples": int(n_samples),
+        "dtype": np.dtype(dtype).str,
+        "text_bytes": int(text_bytes),
+        "textout": bool(textout),
+        "sample_rate": sample_rate,
+        "key": None if key is None else bytes(key).hex(),
+        "metadata": metadata,
+        "chunks": [],
+        "sample_major": None,
+    }
+
+    for stream in ("traces", "textin", "textout"):
+        if stream != "textout" or textout:
+            open(os.path.join(path, STREAM_FILES[stream]), "wb").close()
+
+    _write_header(path, header)
+    return header
+
+
+@timed("container.append")
+def append_traces(path: str, traces, textin, textout=None) -> dict:
+    header = read_header(path)
+    n_traces = header["n_traces"]
+
+    traces = np.ascontiguousarray(traces, dtype=np.dtype(header["dtype"]))
+    textin = np.ascontiguousarray(textin, dtype=np.uint8)
+
+    if traces.ndim != 2 or traces.shape[1] != header["n_samples"]:
+        raise ValueError(
+            f"Expected traces of {header['n_samples']} samples, got {traces.shape}"
+        )
+    if textin.shape != (traces.shape[0], header["text_bytes"]):
+        raise ValueError(f"Plaintexts do not match the traces: {textin.shape}")
+    if header["textout"] != (textout is not None):
+        raise ValueError("Ciphertexts must be given iff the container stores them")
+
+    blocks = {"traces": traces, "textin": textin}
+    if textout is not None:
+        blocks["textout"] = np.ascontiguousarray(textout, dtype=np.uint8)
+        if blocks["textout"].shape != textin.shape:
+            raise ValueError(
+                f"Ciphertexts do not match the traces: {blocks['textout'].shape}"
+            )
+
+    for stream, block in blocks.items():
+        stream_path = os.path.join(path, STREAM_FILES[stream])
+        with open(stream_path, "r+b") as f:
+            # Drop any tail left by an interrupted append
+            row_bytes = block.itemsize * int(np.prod(block.shape[1:]))
+            f.truncate(n_traces * row_bytes)
+            f.seek(0, os.SEEK_END)
+            f.write(block.tobytes())
+
+    header["chunks"].append(
+        {"start": n_traces, "rows": int(traces.shape[0]), "created": time.time()}
+    )
+    header["n_traces"] = n_traces + int(traces.shape[0])
+    _write_header(path, header)
+
+    return header
+
+
+def container_stores(path: str) -> dict:
+    header = read_header(path)
+    n_traces = header["n_traces"]
+    text_shape = (n_traces, header["text_bytes"])
+
+    stores = {
+        "traces": raw_store(
+            os.path.join(path, STREAM_FILES["traces"]),
+            (n_traces, header["n_samples"]),
+            header["dtype"],
+        ),
+        "textin": raw_store(
+            os.path.join(path, STREAM_FILES["textin"]), text_shape, np.uint8
+        ),
+        "textout": None,
+        "sample_major": None,
+    }
+
+    if header["textout"]:
+        stores["textout"] = raw_store(
+            os.path.join(path, STREAM_FILES["textout"]), text_shape, np.uint8
+        )
+
+    # The transposed copy is only valid for the traces it was built from.
+    # load_store reads column selections of the traces from it.
+    sample_major = header["sample_major"]
+    if sample_major is not None and sample_major["n_traces"] == n_traces:
+        stores["sample_major"] = raw_store(
+            os.path.join(path, STREAM_FILES["sample_major"]),
+            (header["n_samples"], n_traces),
+            header["dtype"],
+        )
+        stores["traces"]["transposed"] = {
+            "path": stores["sample_major"]["path"],
+            "offset": 0,
+        }
+
+    return stores
+
+
+@timed("container.sample_major")
+def build_sample_major(path: str, block=256) -> dict:
+    header = read_header(path)
+    traces = load_store(container_stores(path)["traces"])
+    n_traces, n_samples = traces.shape
+    if n_traces == 0:
+        raise ValueError(f"Container is empty: {path}")
+
+    out_path = os.path.join(path, STREAM_FILES["sample_major"])
+    out = np.memmap(
+        out_path, dtype=traces.dtype, mode="w+", shape=(n_samples, n_traces)
+    )
+    for start in range(0, n_samples, block):
+        out[start : start + block] = traces[:, start : start + block].T
+    out.flush()
+    del out
+
+    header["sample_major"] = {"n_traces": n_traces}
+    _write_header(path, header)
+
+    return header
+
+
+@timed("container.convert")
+def convert_npy_pair(
+    traces_path: str,
+    textin_path: str,
+    path: str,
+    textout_path=None,
+    chunk_size=10000,
+    sample_major=False,
+    **kwargs,
+) -> dict:
+    traces = np.load(traces_path, mmap_mode="r")
+    textin = np.load(textin_path, mmap_mode="r")
+    textout = None if textout_path is None else np.load(textout_path, mmap_mode="r")
+
+    if traces.shape[0] != textin.shape[0]:
+        raise ValueError(
+            f"{traces_path} has {traces.shape[0]} traces but {textin_path} "
+            f"has {textin.shape[0]} plaintexts"
+        )
+
+    create_container(
+        path,
+        traces.shape[1],
+        dtype=traces.dtype,
+        text_bytes=textin.shape[1],
+        textout=textout is not None,
+        **kwargs,
+    )
+
+    for start in range(0, traces.shape[0], chunk_size):
+        stop = start + chunk_size
+        header = append_traces(
+            path,
+            traces[start:stop],
+            textin[start:stop],
+            None if textout is None else textout[start:stop],
+        )
+        logger.debug("Converted %d / %d traces", header["n_traces"], traces.shape[0])
+
+    if sample_major:
+        build_sample_major(path)
+
+    return read_header(path)
@@ -0,0 +1,121 @@
+import os
+import socket
+import struct
+import sys
+
+import numpy as np
+
+# Stream layout: one header, then fixed-size records of
+# (plaintext bytes, trace samples) until the writer closes the stream.
+#   header = magic "RI3A" | version u16 | text_bytes u16 | n_samples u32
+#            | dtype length u16 | numpy dtype string (ascii)
+MAGIC = b"RI3A"
+FRAMING_VERSION = 1
+_HEADER = struct.Struct("<4sHHIH")
+
+
+def pack_stream_header(n_samples, dtype, text_bytes=16) -> bytes:
+    dtype = np.dtype(dtype).str.encode("ascii")
+    return (
+        _HEADER.pack(MAGIC, FRAMING_VERSION, text_bytes, n_samples, len(dtype)) + dtype
+    )
+
+
+def pack_records(traces, textin, dtype) -> bytes:
+    traces = np.ascontiguousarray(traces, dtype=dtype)
+    textin = np.ascontiguousarray(textin, dtype=np.uint8)
+
+    records = np.empty(
+        traces.shape[0],
+        dtype=[
+            ("textin", np.uint8, textin.shape[1:]),
+            ("trace", dtype, traces.shape[1:]),
+        ],
+    )
+    records["textin"] = textin
+    records["trace"] = traces
+    return records.tobytes()
+
+
+def _read_exact(f, size) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = f.read(size - len(data))
+        if not chunk:
+            raise EOFError("Stream closed inside a header")
+        data += chunk
+    return bytes(data)
+
+
+def read_stream_header(f) -> dict:
+    magic, version, text_bytes, n_samples, dtype_len = _HEADER.unpack(
+        _read_exact(f, _HEADER.size)
+    )
+    if magic != MAGIC:
+        raise ValueError(f"Not a trace stream (magic {magic!r})")
+    if version != FRAMING_VERSION:
+        raise ValueError(f"Unsupported stream version {version}")
+
+    dtype = np.dtype(_read_exact(f, dtype_len).decode("ascii"))
+    return {
+        "text_bytes": text_bytes,
+        "n_samples": n_samples,
+        "dtype": dtype,
+        "record_dtype": np.dtype(
+            [("textin", np.uint8, (text_bytes,)), ("trace", dtype, (n_samples,))]
+        ),
+    }
+
+
+def read_records(f, header, max_records=1024):
+    # Every update touches the full 16 x 256 x S statistics, so records are
+    # consumed in batches: read() only returns early when the writer closes.
+    record_dtype = header["record_dtype"]
+    size = record_dtype.itemsize
+
+    while True:
+        data = f.read(max_records * size)
+        n = len(data) // size
+        if n:
+            records = np.frombuffer(data[: n * size], dtype=record_dtype)
+            yield records["trace"], records["textin"]
+
+        if len(data) < max_records * size:
+            if len(data) % size:
+                raise EOFError(
+                    f"Stream closed inside a record ({len(data) % size} bytes left)"
+                )
+            break
+
+
+def open_source(source: str):
+    # "-" is stdin, "unix:PATH" waits for one writer on a Unix socket, anything
+    # else is a named pipe or a file.
+    if source == "-":
+        return sys.stdin.buffer
+
+    if source.startswith("unix:"):
+        path = source[len("unix:") :]
+        if os.path.exists(path):
+            os.remove(path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+        conn, _ = server.accept()
+        server.close()
+        return conn.makefile("rb")
+
+    return open(source, "rb")
+
+
+def open_sink(sink: str):
+    if sink == "-":
+        return sys.stdout.buffer
+
+    if sink.startswith("unix:"):
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(sink[len("unix:") :])
+        return conn.makefile("wb")
+
+    return open(sink, "wb")
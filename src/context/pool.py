@@ -0,0 +1,36 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from src.utils.logger import worker_init_logger
+from src.utils.profiling import drain_profile, timed
+
+
+@timed("pool.worker_init")
+def _worker_init(logging_settings):
+    # Forked workers inherit the parent's timings: start from a clean slate
+    drain_profile()
+
+    if logging_settings is not None:
+        worker_init_logger(logging_settings)
+
+    # Build the lookup tables once per worker instead of once per task.
+    # pylint: disable=C0415,W0611
+    import src.aes.tables
+
+
+def create_worker_pool(logging_settings=None, max_workers=None):
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_worker_init,
+        initargs=(logging_settings,),
+    )
+
+
+@contextmanager
+def worker_pool(executor=None, logging_settings=None):
+    if executor is not None:
+        yield executor
+        return
+
+    with create_worker_pool(logging_settings) as pool:
+        yield pool
@@ -0,0 +1,12 @@
+import numpy as np
+
+PRECISIONS = ("float64", "float32")
+
+
+def compute_dtype(precision) -> np.dtype:
+    # Integer (ADC) traces are converted too: BLAS only runs the large
+    # products in floating point.
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+
+    return np.dtype(precision)
@@ -0,0 +1,273 @@
+from collections import deque
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from src.context.cache import store_fingerprint
+from src.context.container import (
+    append_traces,
+    container_stores,
+    create_container,
+    is_container,
+    read_header,
+)
+from src.context.pool import worker_pool
+from src.context.shared import load_store, store_rows
+from src.utils.logger import get_logger
+from src.utils.profiling import absorb_profile, profiled_worker, timed
+from src.utils.progress import progress_bar
+
+logger = get_logger(__name__)
+
+# name: (parameter names, number of required parameters)
+STAGES = {
+    "crop": (("start", "end"), 2),
+    "align": (("start", "end", "max_shift"), 2),
+    "lowpass": (("cutoff",), 1),
+    "bandpass": (("low", "high"), 2),
+    "movavg": (("width", "step"), 1),
+    "decimate": (("factor",), 1),
+}
+
+
+def parse_pipeline(spec: str) -> list[dict]:
+    # "align:450:800:50,lowpass:0.2,movavg:4,decimate:2". Frequencies are
+    # fractions of the Nyquist frequency.
+    stages = []
+    for item in spec.split(","):
+        name, *values = item.strip().split(":")
+        if name not in STAGES:
+            raise ValueError(
+                f"Unknown preprocessing stage: {name} "
+                f"(expected one of {', '.join(STAGES)})"
+            )
+
+        params, required = STAGES[name]
+        if not required <= len(values) <= len(params):
+            raise ValueError(f"Stage {name} takes {':'.join(params)}, got {item}")
+
+        stage = {"name": name}
+        for param, value in zip(params, values):
+            stage[param] = (
+                float(value) if name in ("lowpass", "bandpass") else int(value)
+            )
+        _check_stage(stage, item)
+        stages.append(stage)
+
+    return stages
+
+
+def _check_stage(stage, item):
+    name = stage["name"]
+    if name in ("crop", "align") and not 0 <= stage["start"] < stage["end"]:
+        raise ValueError(f"Stage {name} needs 0 <= start < end, got {item}")
+    if name == "align" and stage.get("max_shift", 0) < 0:
+        raise ValueError(f"Stage align needs max_shift >= 0, got {item}")
+    if name == "movavg" and min(stage["width"], stage.get("step", 1)) < 1:
+        raise ValueError(f"Stage movavg needs width and step >= 1, got {item}")
+    if name == "decimate" and stage["factor"] < 1:
+        raise ValueError(f"Stage decimate needs factor >= 1, got {item}")
+    if name == "lowpass" and not 0 < stage["cutoff"] <= 1:
+        raise ValueError(f"Stage lowpass needs 0 < cutoff <= 1, got {item}")
+    if name == "bandpass" and not 0 <= stage["low"] < stage["high"] <= 1:
+        raise ValueError(f"Stage bandpass needs 0 <= low < high <= 1, got {item}")
+
+
+def _shift_rows(x, shifts):
+    # Row r takes x[r, t + shifts[r]], repeating the edge samples
+    cols = np.clip(np.arange(x.shape[1]) + shifts[:, None], 0, x.shape[1] - 1)
+    return np.take_along_axis(x, cols, axis=1)
+
+
+def align_traces(x, reference, start, max_shift=50):
+    # FFT cross-correlation of each trace's window (widened by max_shift on
+    # both sides) with the reference window; the best lag realigns the trace.
+    length = reference.shape[0]
+    lo = max(start - max_shift, 0)
+    hi = min(start + length + max_shift, x.shape[1])
+
+    segment = x[:, lo:hi] - x[:, lo:hi].mean(axis=1, keepdims=True)
+    nfft = 1 << int(np.ceil(np.log2(segment.shape[1] + length)))
+    corr = np.fft.irfft(
+        np.fft.rfft(segment, nfft) * np.conj(np.fft.rfft(reference, nfft)), nfft
+    )[:, : hi - lo - length + 1]
+
+    shifts = corr.argmax(axis=1) + lo - start
+    return _shift_rows(x, shifts)
+
+
+def fft_filter(x, low=0.0, high=1.0):
+    spectrum = np.fft.rfft(x, axis=1)
+    freqs = np.linspace(0.0, 1.0, spectrum.shape[1])
+    spectrum[:, (freqs < low) | (freqs > high)] = 0
+    return np.fft.irfft(spectrum, x.shape[1], axis=1)
+
+
+def moving_average(x, width, step=None):
+    # Averages of `width` consecutive samples every `step` samples: with the
+    # default step the windows do not overlap and the trace shrinks width-fold.
+    step = width if step is None else step
+    sums = np.cumsum(x, axis=1)
+    sums = np.concatenate([np.zeros((x.shape[0], 1), dtype=sums.dtype), sums], axis=1)
+    starts = np.arange(0, x.shape[1] - width + 1, step)
+    return (sums[:, starts + width] - sums[:, starts]) / width
+
+
+def apply_stage(x, stage):
+    name = stage["name"]
+    if name == "crop":
+        return x[:, stage["start"] : stage["end"]]
+    if name == "align":
+        return align_traces(
+            x, stage["reference"], stage["start"], stage.get("max_shift", 50)
+        )
+    if name == "lowpass":
+        return fft_filter(x, high=stage["cutoff"])
+    if name == "bandpass":
+        return fft_filter(x, stage["low"], stage["high"])
+    if name == "movavg":
+        return moving_average(x, stage["width"], stage.get("step"))
+    if name == "decimate":
+        return x[:, :: stage["factor"]]
+
+    raise ValueError(f"Unknown preprocessing stage: {name}")
+
+
+def run_pipeline(x, stages, dtype=np.float32) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    for stage in stages:
+        x = apply_stage(x, stage)
+
+    return np.ascontiguousarray(x, dtype=dtype)
+
+
+def prepare_pipeline(stages, traces, n_reference=100) -> list[dict]:
+    # The alignment reference is the mean window of the first traces, as they
+    # look after the stages before it: averaging keeps the noise of a single
+    # trace from steering every shift.
+    x = np.asarray(traces[:n_reference], dtype=np.float64)
+    prepared = []
+    for stage in stages:
+        if stage["name"] == "align":
+            window = x[:, stage["start"] : stage["end"]]
+            if window.shape[1] == 0:
+                raise ValueError(
+                    f"Alignment window {stage['start']}:{stage['end']} is past "
+                    f"the {x.shape[1]} samples of the traces"
+                )
+            window = window.mean(axis=0)
+            stage = {**stage, "reference": window - window.mean()}
+        prepared.append(stage)
+        x = apply_stage(x, stage)
+
+    return prepared
+
+
+@profiled_worker("preprocess.worker")
+def preprocess_worker(traces_store, start, stop, stages):
+    traces = load_store(traces_store)
+    return {"traces": run_pipeline(traces[start:stop], stages)}
+
+
+def pipeline_key(traces_store, textin_store, spec) -> str:
+    payload = {
+        "traces": store_fingerprint(traces_store),
+        "textin": store_fingerprint(textin_store),
+        "pipeline": parse_pipeline(spec),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+@timed("preprocess.dataset")
+def preprocess_dataset(
+    traces_store,
+    textin_store,
+    spec,
+    output=None,
+    chunk_size=1024,
+    key=None,
+    logging_settings=None,
+    executor=None,
+) -> dict:
+    key_hash = pipeline_key(traces_store, textin_store, spec)
+    if output is None:
+        output = os.path.join(".cache", "preprocessed", key_hash[:16])
+
+    traces = load_store(traces_store)
+    textin = load_store(textin_store)
+    stages = prepare_pipeline(parse_pipeline(spec), traces)
+    n_samples = run_pipeline(traces[:1], stages).shape[1]
+    if n_samples == 0:
+        raise ValueError(
+            f"Pipeline {spec} leaves no sample of the {traces.shape[1]} in the traces"
+        )
+    n_traces = store_rows(traces_store)
+
+    done = 0
+    if is_container(output):
+        header = read_header(output)
+        if header["metadata"].get("pipeline_key") != key_hash:
+            raise FileExistsError(
+                f"{output} holds traces from another source or pipeline: remove it"
+            )
+
+        # Chunks are appended in order: an interrupted run resumes after the
+        # last complete one.
+        done = header["n_traces"]
+        if done == n_traces:
+            logger.info("Reusing preprocessed traces in %s", output)
+            return container_stores(output)
+        logger.info("Resuming preprocessing in %s at trace %d", output, done)
+    else:
+        create_container(
+            output,
+            n_samples,
+            dtype=np.float32,
+            text_bytes=textin.shape[1],
+            key=key,
+            pipeline=spec,
+            pipeline_key=key_hash,
+            source=os.path.abspath(traces_store["path"]),
+        )
+
+    # Chunks are processed in parallel but appended in order: a bounded
+    # window of them is in flight at once.
+    starts = range(done, n_traces, chunk_size)
+    window = deque()
+    depth = 2 * (os.cpu_count() or 1)
+    with worker_pool(executor, logging_settings) as executor:
+        for start in progress_bar(starts, total=len(starts), desc="Preprocessing"):
+            stop = min(start + chunk_size, n_traces)
+            window.append(
+                (
+                    start,
+                    stop,
+                    executor.submit(
+                        preprocess_worker, traces_store, start, stop, stages
+                    ),
+                )
+            )
+            while len(window) >= depth:
+                _append_chunk(output, textin, *window.popleft())
+
+        while window:
+            _append_chunk(output, textin, *window.popleft())
+
+    logger.info(
+        "Preprocessed %d traces: %d -> %d samples (%s), written to %s",
+        n_traces,
+        traces.shape[1],
+        n_samples,
+        spec,
+        output,
+    )
+
+    return container_stores(output)
+
+
+def _append_chunk(output, textin, start, stop, future):
+    result = future.result()
+    absorb_profile(result.pop("profile", None))
+    append_traces(output, result["traces"], textin[start:stop])
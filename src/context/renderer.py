@@ -0,0 +1,72 @@
+# Disable import-error due to incoherent module from python 2.7 to 3.x transition
+# pylint: disable=E0611
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+
+from src.utils.logger import get_logger, worker_init_logger
+from src.utils.profiling import absorb_profile, drain_profile, profiled_worker
+
+logger = get_logger(__name__)
+
+
+def _renderer_init(logging_settings):
+    drain_profile()
+
+    if logging_settings is not None:
+        worker_init_logger(logging_settings)
+
+    # Renderers only write files: use the headless backend
+    # pylint: disable=C0415
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+@profiled_worker("render.job")
+def _render(plot_fn, args):
+    plot_fn(*args)
+    return {}
+
+
+class PlotRenderer:
+    def __init__(self, logging_settings=None, max_workers=2):
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_renderer_init,
+            initargs=(logging_settings,),
+        )
+        self.futures = {}
+
+    def submit(self, plot_fn, *args):
+        future = self.executor.submit(_render, plot_fn, args)
+        self.futures[future] = plot_fn.__name__
+
+    def submit_all(self, jobs):
+        for plot_fn, args in jobs:
+            self.submit(plot_fn, *args)
+
+    def close(self):
+        for future in as_completed(self.futures):
+            try:
+                absorb_profile(future.result().pop("profile", None))
+            except Exception as e:  # pylint: disable=W0718
+                logger.error("Rendering %s failed: %s", self.futures[future], e)
+
+        self.futures.clear()
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextmanager
+def plot_renderer(enabled=True, logging_settings=None, renderer=None):
+    if renderer is not None or not enabled:
+        yield renderer
+        return
+
+    with PlotRenderer(logging_settings) as r:
+        yield r
@@ -2,14 +2,20 @@ import numpy as np
 import mmap
 import os
 
+from src.utils.profiling import timed
 
-def save_array_to_mmap(arr: np.ndarray, filename: str):
+_MAPPED = {}
+
+
+@timed("mmap.save")
+def save_array_to_mmap(arr: np.ndarray, filename: str) -> dict:
     with open(filename, "wb") as f:
         f.write(arr.tobytes())
 
-    return filename, arr.shape, arr.dtype
+    return raw_store(filename, arr.shape, arr.dtype)
 
 
+@timed("mmap.load")
 def load_array_from_mmap(filename: str, shape, dtype):
     size = np.prod(shape) * np.dtype(dtype).itemsize
 
@@ -19,3 +25,105 @@ def load_array_from_mmap(filename: str, shape, dtype):
     arr = np.ndarray(shape, dtype=dtype, buffer=mm)
 
     return arr
+
+
+def raw_store(filename: str, shape, dtype, offset=0) -> dict:
+    return {
+        "path": filename,
+        "offset": int(offset),
+        "shape": tuple(int(d) for d in shape),
+        "dtype": np.dtype(dtype).str,
+        "start": 0,
+        "stop": int(shape[0]),
+    }
+
+
+def open_npy_store(filename: str) -> dict:
+    arr = np.load(filename, mmap_mode="r")
+    if not arr.flags.c_contiguous:
+        raise ValueError(f"Only C-ordered arrays can be memory mapped: {filename}")
+
+    return raw_store(filename, arr.shape, arr.dtype, offset=arr.offset)
+
+
+def store_slice(store: dict, start=0, stop=None) -> dict:
+    n_rows = store["stop"] - store["start"]
+    stop = n_rows if stop is None else min(stop, n_rows)
+    start = min(start, stop)
+
+    return {
+        **store,
+        "start": store["start"] + start,
+        "stop": store["start"] + stop,
+    }
+
+
+def store_columns(store: dict, columns) -> dict:
+    columns = np.asarray(columns, dtype=np.int64)
+    current = store.get("columns")
+    if current is not None:
+        columns = np.asarray(current, dtype=np.int64)[columns]
+
+    return {**store, "columns": tuple(int(c) for c in columns)}
+
+
+def store_samples(store: dict) -> int:
+    columns = store.get("columns")
+    return store["shape"][1] if columns is None else len(columns)
+
+
+def store_sample_index(store: dict, index: int) -> int:
+    columns = store.get("columns")
+    return int(index) if columns is None else columns[index]
+
+
+def store_rows(store: dict) -> int:
+    return store["stop"] - store["start"]
+
+
+def _mapped(path, offset, shape, dtype) -> np.memmap:
+    # Long-lived workers keep their mappings: later tasks on the same file
+    # only pay for a stat() and a slice.
+    stat = os.stat(path)
+    key = (path, offset, tuple(shape), dtype.str)
+    cached = _MAPPED.get(key)
+    if cached is None or cached[0] != (stat.st_mtime_ns, stat.st_size):
+        arr = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=tuple(shape))
+        cached = ((stat.st_mtime_ns, stat.st_size), arr)
+        _MAPPED[key] = cached
+
+    return cached[1]
+
+
+@timed("mmap.load_store")
+def load_store(store: dict) -> np.ndarray:
+    dtype = np.dtype(store["dtype"])
+    row_shape = tuple(store["shape"][1:])
+    n_rows = store_rows(store)
+
+    if n_rows == 0:
+        return np.empty((0, store_samples(store)) + row_shape[1:], dtype=dtype)
+
+    columns = store.get("columns")
+    transposed = store.get("transposed")
+    if columns and transposed is not None:
+        # A sample-major copy holds each selected sample's traces in one
+        # contiguous run, instead of one scattered read per trace
+        shape = (store["shape"][1], store["shape"][0])
+        by_sample = _mapped(transposed["path"], transposed["offset"], shape, dtype)
+        rows = by_sample[list(columns), store["start"] : store["stop"]]
+        return np.ascontiguousarray(rows.T)
+
+    arr = _mapped(store["path"], store["offset"], store["shape"], dtype)
+    arr = arr[store["start"] : store["stop"]]
+
+    if columns is None:
+        return arr
+    if not columns:
+        return arr[:, :0]
+    if columns[-1] - columns[0] + 1 == len(columns) and columns == tuple(
+        range(columns[0], columns[-1] + 1)
+    ):
+        return arr[:, columns[0] : columns[-1] + 1]
+
+    return arr[:, list(columns)]
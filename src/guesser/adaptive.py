@@ -0,0 +1,141 @@
+import time
+
+import numpy as np
+
+from src.aes.leakage import leakage_table, selection_table
+from src.context.precision import compute_dtype
+from src.context.shared import load_store, store_rows, store_samples, store_slice
+from src.guesser.cpa_stream import CpaAccumulator
+from src.guesser.dpa_stream import DpaAccumulator
+from src.guesser.scores import score_summary
+from src.utils.logger import get_logger
+from src.utils.profiling import count
+
+logger = get_logger(__name__)
+
+ATTACKS = {
+    "dpa": (DpaAccumulator, selection_table, lambda acc, b: acc.diff(b).max(axis=1)),
+    "cpa": (
+        CpaAccumulator,
+        leakage_table,
+        lambda acc, b: np.abs(acc.corr(b)).max(axis=1),
+    ),
+}
+
+
+def adaptive_checkpoints(n_traces, initial=50, growth=1.5) -> list[int]:
+    if initial < 1:
+        raise ValueError(f"The first checkpoint must be at least 1, got {initial}")
+    if growth <= 1:
+        raise ValueError(f"The checkpoint growth must exceed 1, got {growth}")
+
+    checkpoints = []
+    n = float(min(initial, n_traces))
+    while n < n_traces:
+        checkpoints.append(int(n))
+        n = max(n * growth, n + 1)
+    checkpoints.append(n_traces)
+
+    return checkpoints
+
+
+def adaptive_guesser(
+    traces_store,
+    textin_store,
+    attack="cpa",
+    initial=50,
+    growth=1.5,
+    patience=3,
+    min_confidence=0.2,
+    precision="float64",
+    model=None,
+):
+    if patience < 1:
+        raise ValueError(f"patience must be at least 1, got {patience}")
+
+    textin = load_store(textin_store)
+    n_traces = store_rows(traces_store)
+    n_bytes = textin.shape[1]
+
+    dtype = compute_dtype(precision)
+    accumulator, table_fn, scores_fn = ATTACKS[attack]
+    tables = None if model is None else [table_fn(model)]
+    acc = accumulator(store_samples(traces_store), n_bytes, dtype, tables)
+
+    checkpoints = adaptive_checkpoints(n_traces, initial, growth)
+    active = list(range(n_bytes))
+    history = {b: [] for b in active}
+    guesses = [None] * n_bytes
+    byte_traces = 0
+
+    start_time = time.perf_counter()
+    prev = 0
+    for i, stop in enumerate(checkpoints):
+        acc.update(
+            load_store(store_slice(traces_store, prev, stop)),
+            textin[prev:stop],
+            active,
+        )
+        byte_traces += (stop - prev) * len(active)
+        prev = stop
+
+        for b in list(active):
+            result = score_summary(scores_fn(acc, b))
+            history[b].append(result["guess"])
+
+            # A byte is disclosed once its guess has not moved for `patience`
+            # checkpoints and clearly beats the runner-up.
+            streak = history[b][-patience:]
+            converged = (
+                len(streak) == patience
+                and len(set(streak)) == 1
+                and result["confidence"] >= min_confidence
+            )
+            if not converged and stop < n_traces:
+                continue
+
+            result["traces_to_disclosure"] = (
+                checkpoints[i - patience + 1] if converged else None
+            )
+            result["stopped_at"] = stop
+            guesses[b] = result
+            active.remove(b)
+            count(f"adaptive.{attack}.converged", int(converged))
+
+        if not active:
+            break
+
+    elapsed = time.perf_counter() - start_time
+    full_byte_traces = n_traces * n_bytes
+
+    # Per-byte cost is linear in the traces it sees: extrapolate what the
+    # skipped byte-traces would have cost.
+    report = {
+        "attack": attack,
+        "n_traces": n_traces,
+        "elapsed": elapsed,
+        "byte_traces": byte_traces,
+        "full_byte_traces": full_byte_traces,
+        "time_saved": elapsed * (full_byte_traces - byte_traces) / max(byte_traces, 1),
+    }
+
+    return guesses, report
+
+
+def print_disclosure(guesses, report):
+    logger.raw("")
+    logger.raw(f"=== {report['attack'].upper()} TRACES TO DISCLOSURE ===")
+    logger.raw("Byte | Guess | Disclosed at | Stopped at")
+    logger.raw("-----+-------+--------------+-----------")
+    for b, r in enumerate(guesses):
+        ttd = r["traces_to_disclosure"]
+        ttd = "-" if ttd is None else ttd
+        logger.raw(
+            f"{b:>4} |  0x{int(r['guess'], 16):02x} | {ttd:>12} | {r['stopped_at']:>10}"
+        )
+
+    logger.raw(
+        f"Processed {report['byte_traces']} of {report['full_byte_traces']} "
+        f"byte-traces in {report['elapsed']:.2f}s "
+        f"(~{report['time_saved']:.2f}s saved)"
+    )
@@ -1,47 +1,121 @@
 # Disable import-error due to incoherent module from python 2.7 to 3.x transition
 # pylint: disable=E0611
-from concurrent.futures import (
-    ProcessPoolExecutor,
-    as_completed,
-)
+from concurrent.futures import as_completed
 
 import os
 import numpy as np
-import matplotlib.pyplot as plt
 
-from src.guesser.dpa import dpa_compute_score
-from src.guesser.cpa import cpa_compute_score
-from src.utils.logger import get_logger, worker_init_logger
+from src.aes.leakage import leakage_hypotheses, selection_table
+from src.context.pool import worker_pool
+from src.context.precision import compute_dtype
+from src.context.shared import load_store
+from src.guesser.dpa import dpa_diff_from_sums
+from src.guesser.cpa import cpa_corr_from_sums
+from src.guesser.plots import get_pyplot
+from src.utils.logger import get_logger
+from src.utils.profiling import absorb_profile, profiled_worker, timed, timer
 
 logger = get_logger(__name__)
 
 
+def check_checkpoints(checkpoints, n_traces):
+    # Trace counts at which the scores are taken: strictly increasing, each
+    # adding traces to the previous one, and within the traces
+    checkpoints = np.asarray(checkpoints)
+    if checkpoints.size == 0:
+        raise ValueError(f"No convergence checkpoint within the {n_traces} traces")
+    if checkpoints[0] < 1 or np.any(np.diff(checkpoints) <= 0):
+        raise ValueError("Convergence checkpoints must be positive and increasing")
+    if checkpoints[-1] > n_traces:
+        raise ValueError(
+            f"Convergence checkpoint {checkpoints[-1]} is past the {n_traces} traces"
+        )
+
+
+@timed("convergence.dpa_scores")
+def dpa_convergence_scores(
+    traces, textin, byte_index, checkpoints, dtype=np.float64, model="bit0"
+):
+    check_checkpoints(checkpoints, traces.shape[0])
+    sel_all = selection_table(model)[textin[:, byte_index]]
+
+    sums1 = np.zeros((256, traces.shape[1]), dtype=dtype)
+    counts1 = np.zeros(256, dtype=dtype)
+    total = np.zeros(traces.shape[1], dtype=dtype)
+
+    all_scores = np.zeros((256, len(checkpoints)))
+
+    prev = 0
+    for i, stop in enumerate(checkpoints):
+        x = np.asarray(traces[prev:stop], dtype=dtype)
+        sel = sel_all[prev:stop].astype(dtype)
+
+        sums1 += sel.T @ x
+        counts1 += sel.sum(axis=0)
+        total += x.sum(axis=0)
+        prev = stop
+
+        diff = dpa_diff_from_sums(sums1, counts1, total, stop)
+        all_scores[:, i] = diff.max(axis=1)
+
+    return all_scores
+
+
+@timed("convergence.cpa_scores")
+def cpa_convergence_scores(
+    traces, textin, byte_index, checkpoints, dtype=np.float64, model="hw"
+):
+    check_checkpoints(checkpoints, traces.shape[0])
+    hyp_all = leakage_hypotheses(textin, byte_index, model)
+    shift = np.asarray(traces[: checkpoints[0]], dtype=dtype).mean(axis=0)
+
+    sum_x = np.zeros(traces.shape[1], dtype=dtype)
+    sum_x2 = np.zeros(traces.shape[1], dtype=dtype)
+    sum_h = np.zeros(256, dtype=dtype)
+    sum_h2 = np.zeros(256, dtype=dtype)
+    sum_hx = np.zeros((256, traces.shape[1]), dtype=dtype)
+
+    all_scores = np.zeros((256, len(checkpoints)))
+
+    prev = 0
+    for i, stop in enumerate(checkpoints):
+        x = np.asarray(traces[prev:stop], dtype=dtype) - shift
+        h = hyp_all[prev:stop].astype(dtype)
+
+        sum_x += x.sum(axis=0)
+        sum_x2 += np.sum(x**2, axis=0)
+        sum_h += h.sum(axis=0)
+        sum_h2 += np.sum(h**2, axis=0)
+        sum_hx += h.T @ x
+        prev = stop
+
+        corr = cpa_corr_from_sums(stop, sum_h, sum_h2, sum_x, sum_x2, sum_hx)
+        all_scores[:, i] = np.abs(corr).max(axis=1)
+
+    return all_scores
+
+
 def plot_convergence_all_guesses_one_byte(
-    traces, textin, byte_index, step=5, outdir="plots/dpa/convergence_all_guesses"
+    traces,
+    textin,
+    byte_index,
+    step=5,
+    outdir="plots/dpa/convergence_all_guesses",
+    dtype=np.float64,
+    model="bit0",
 ):
     os.makedirs(outdir, exist_ok=True)
+    plt = get_pyplot()
     max_n = traces.shape[0]
 
     x = np.arange(10, max_n, step)
-    n_points = len(x)
 
     plt.figure(figsize=(14, 6))
 
-    dpa_score = dpa_compute_score
-    traces_local = traces
-    textin_local = textin
-
-    all_scores = np.zeros((256, n_points), dtype=float)
-
-    traces_cache = [traces_local[:n] for n in x]
-    textin_cache = [textin_local[:n] for n in x]
+    all_scores = dpa_convergence_scores(traces, textin, byte_index, x, dtype, model)
 
     for g in range(256):
-        scores_g = all_scores[g]
-        for i, (t_n, ti_n) in enumerate(zip(traces_cache, textin_cache)):
-            scores_g[i] = dpa_score(g, t_n, ti_n, byte_index=byte_index)
-
-        plt.plot(x, scores_g, linewidth=0.6, alpha=0.6)
+        plt.plot(x, all_scores[g], linewidth=0.6, alpha=0.6)
         logger.debug("[DPA Convergence][Byte %d][Guess 0x%02x] Done", byte_index, g)
 
     last_values = all_scores[:, -1]
@@ -71,51 +145,72 @@ def plot_convergence_all_guesses_one_byte(
     plt.tight_layout()
 
     out = f"{outdir}/convergence_byte{byte_index:02d}.png"
-    plt.savefig(out, dpi=200)
+    with timer("plot.convergence"):
+        plt.savefig(out, dpi=200)
     plt.close()
     return out
 
 
-def plot_all_bytes_parallel(traces, textin, logging_settings):
-    with ProcessPoolExecutor(
-        initializer=worker_init_logger, initargs=(logging_settings,)
-    ) as ex:
+@profiled_worker("convergence.worker")
+def _convergence_worker(
+    plot_fn, traces_store, textin_store, byte_index, precision, model
+):
+    traces = load_store(traces_store)
+    textin = load_store(textin_store)
+
+    dtype = compute_dtype(precision)
+    return {"path": plot_fn(traces, textin, byte_index, dtype=dtype, model=model)}
+
+
+def plot_all_bytes_parallel(
+    traces_store,
+    textin_store,
+    logging_settings=None,
+    precision="float64",
+    executor=None,
+    model="bit0",
+):
+    with worker_pool(executor, logging_settings) as ex:
         futures = {
-            ex.submit(plot_convergence_all_guesses_one_byte, traces, textin, i): i
+            ex.submit(
+                _convergence_worker,
+                plot_convergence_all_guesses_one_byte,
+                traces_store,
+                textin_store,
+                i,
+                precision,
+                model,
+            ): i
             for i in range(16)
         }
 
         for f in as_completed(futures):
             i = futures[f]
+            absorb_profile(f.result().pop("profile", None))
             logger.info("[DPA Convergence] Done for byte %d", i)
 
 
 def plot_convergence_all_guesses_one_byte_cpa(
-    traces, textin, byte_index, step=5, outdir="plots/cpa/convergence_all_guesses"
+    traces,
+    textin,
+    byte_index,
+    step=5,
+    outdir="plots/cpa/convergence_all_guesses",
+    dtype=np.float64,
+    model="hw",
 ):
     os.makedirs(outdir, exist_ok=True)
+    plt = get_pyplot()
     max_n = traces.shape[0]
 
     x = np.arange(10, max_n, step)
-    n_points = len(x)
 
     plt.figure(figsize=(14, 6))
 
-    cpa_score = cpa_compute_score
-    traces_local = traces
-    textin_local = textin
-
-    all_scores = np.zeros((256, n_points), dtype=float)
-
-    traces_cache = [traces_local[:n] for n in x]
-    textin_cache = [textin_local[:n] for n in x]
+    all_scores = cpa_convergence_scores(traces, textin, byte_index, x, dtype, model)
 
     for g in range(256):
-        scores_g = all_scores[g]
-        for i, (t_n, ti_n) in enumerate(zip(traces_cache, textin_cache)):
-            scores_g[i] = cpa_score(g, t_n, ti_n, byte_index=byte_index)
-
-        plt.plot(x, scores_g, linewidth=0.6, alpha=0.6)
+        plt.plot(x, all_scores[g], linewidth=0.6, alpha=0.6)
         logger.debug("[CPA Convergence][Byte %d][Guess 0x%02x] Done", byte_index, g)
 
     last_values = all_scores[:, -1]
@@ -145,20 +240,35 @@ def plot_convergence_all_guesses_one_byte_cpa(
     plt.tight_layout()
 
     out = f"{outdir}/convergence_byte{byte_index:02d}.png"
-    plt.savefig(out, dpi=200)
+    with timer("plot.convergence"):
+        plt.savefig(out, dpi=200)
     plt.close()
     return out
 
 
-def plot_all_bytes_parallel_cpa(traces, textin, logging_settings):
-    with ProcessPoolExecutor(
-        initializer=worker_init_logger, initargs=(logging_settings,)
-    ) as ex:
+def plot_all_bytes_parallel_cpa(
+    traces_store,
+    textin_store,
+    logging_settings=None,
+    precision="float64",
+    executor=None,
+    model="hw",
+):
+    with worker_pool(executor, logging_settings) as ex:
         futures = {
-            ex.submit(plot_convergence_all_guesses_one_byte_cpa, traces, textin, i): i
+            ex.submit(
+                _convergence_worker,
+                plot_convergence_all_guesses_one_byte_cpa,
+                traces_store,
+                textin_store,
+                i,
+                precision,
+                model,
+            ): i
             for i in range(16)
         }
 
         for f in as_completed(futures):
             i = futures[f]
+            absorb_profile(f.result().pop("profile", None))
             logger.info("[CPA Convergence] Done for byte %d", i)
@@ -1,121 +1,174 @@
 # Disable import-error due to incoherent module from python 2.7 to 3.x transition
 # pylint: disable=E0611
-from concurrent.futures import (
-    ProcessPoolExecutor,
-    as_completed,
-)
+from concurrent.futures import as_completed
 
 import numpy as np
 
-from src.aes.functions import aes_internal
-from src.context.shared import load_array_from_mmap
+from src.aes.leakage import leakage_hypotheses, leakage_table, output_leakage
+from src.context.cache import cached_matrix
+from src.context.class_stats import load_class_stats
+from src.context.pool import worker_pool
+from src.context.renderer import plot_renderer
+from src.context.precision import compute_dtype
+from src.context.shared import load_store, store_sample_index
+from src.utils.profiling import absorb_profile, profiled_worker, timer
 from src.utils.progress import progress_bar
+from src.guesser.scores import score_summary
 from src.guesser.plots import (
     save_corr_vector_plot,
     save_cpa_score_curve_plot,
-    save_hw_plot,
+    save_leakage_plot,
 )
 
 
-HW = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+def normalise_columns(x):
+    x_c = x - x.mean(axis=0)
+    norm = np.sqrt(np.sum(x_c**2, axis=0))
+
+    return np.divide(x_c, norm, out=np.zeros_like(x_c), where=norm != 0)
 
 
-def cpa_compute_score(guess, traces, textin, byte_index=0):
-    corr = cpa_corr_vector(guess, traces, textin, byte_index)
+def cpa_corr_matrix(traces, textin, byte_index=0, dtype=np.float64, model="hw"):
+    with timer("cpa.hypotheses"):
+        hyp = leakage_hypotheses(textin, byte_index, model).astype(dtype)
 
-    return float(np.max(np.abs(corr)))
+    with timer("cpa.correlation"):
+        traces = np.asarray(traces, dtype=dtype)
+        return normalise_columns(hyp).T @ normalise_columns(traces)
 
 
-def cpa_corr_vector(guess, traces, textin, byte_index=0):
-    hyp = np.array(
-        [aes_internal(guess, t) for t in textin[:, byte_index]], dtype=np.uint8
+def cpa_corr_from_sums(n, sum_h, sum_h2, sum_x, sum_x2, sum_hx):
+    # The final normalisation is only 256 x S and suffers from cancellation,
+    # so it always runs in float64 whatever the accumulation precision.
+    sum_h, sum_h2, sum_x, sum_x2, sum_hx = (
+        np.asarray(a, dtype=np.float64) for a in (sum_h, sum_h2, sum_x, sum_x2, sum_hx)
     )
-    hyp_hw = HW[hyp].astype(np.float64)
 
-    hyp_c = hyp_hw - hyp_hw.mean()
-    traces_c = traces - traces.mean(axis=0)
+    num = n * sum_hx - np.outer(sum_h, sum_x)
+    var_h = np.maximum(n * sum_h2 - sum_h**2, 0.0)
+    var_x = np.maximum(n * sum_x2 - sum_x**2, 0.0)
+    denom = np.sqrt(np.outer(var_h, var_x))
+
+    return np.divide(num, denom, out=np.zeros_like(num), where=denom != 0)
 
-    num = np.dot(hyp_c, traces_c)
-    denom = np.sqrt(np.sum(hyp_c**2) * np.sum(traces_c**2, axis=0))
 
-    corr = np.divide(num, denom, out=np.zeros_like(num), where=denom != 0)
-    return corr
+def cpa_corr_matrix_from_stats(counts, sums, sumsq, model="hw"):
+    hyp = leakage_table(model).astype(sums.dtype)
 
+    with timer("cpa.correlation"):
+        return cpa_corr_from_sums(
+            counts.sum(),
+            hyp.T @ counts,
+            (hyp**2).T @ counts,
+            sums.sum(axis=0),
+            sumsq.sum(axis=0),
+            hyp.T @ sums,
+        )
 
+
+@profiled_worker("cpa.worker")
 def cpa_worker(
     byte_index,
-    traces_file,
-    traces_shape,
-    traces_dtype,
-    textin_file,
-    textin_shape,
-    textin_dtype,
+    traces_store,
+    textin_store,
     plotting=False,
+    return_matrix=False,
+    class_stats=None,
+    precision="float64",
+    cache=None,
+    model="hw",
 ):
 
-    traces = load_array_from_mmap(traces_file, traces_shape, traces_dtype)
-    textin = load_array_from_mmap(textin_file, textin_shape, textin_dtype)
-
-    scores = np.zeros(256)
-
-    for g in range(256):
-        scores[g] = cpa_compute_score(g, traces, textin, byte_index)
+    def compute():
+        if class_stats is not None:
+            return cpa_corr_matrix_from_stats(
+                *load_class_stats(class_stats, byte_index), model
+            )
+
+        traces = load_store(traces_store)
+        textin = load_store(textin_store)
+        dtype = compute_dtype(precision)
+        return cpa_corr_matrix(traces, textin, byte_index, dtype, model)
+
+    corr = cached_matrix(
+        cache,
+        compute,
+        "cpa",
+        traces_store,
+        textin_store,
+        byte_index,
+        precision,
+        model,
+    )
 
-    if plotting:
-        save_cpa_score_curve_plot(scores, byte_index)
+    result = cpa_result_from_corr(corr, byte_index, plotting, return_matrix)
+    result["peak"] = store_sample_index(traces_store, result["peak"])
 
-    best_guess = int(np.argmax(scores))
-    best_score = float(scores[best_guess])
+    return result
 
-    scores_copy = scores.copy()
-    scores_copy[best_guess] = -np.inf
-    second_guess = int(np.argmax(scores_copy))
-    second_score = float(scores[second_guess])
 
-    contrast = (best_score - second_score) / max(second_score, 1e-15)
-    confidence = min(max(contrast, 0.0), 1.0)
+def cpa_result_from_corr(corr, byte_index, plotting=False, return_matrix=False):
+    abs_corr = np.abs(corr)
+    scores = abs_corr.max(axis=1)
+    peaks = abs_corr.argmax(axis=1)
 
-    corr_vec = cpa_corr_vector(best_guess, traces, textin, byte_index)
+    result = score_summary(scores)
+    best_guess = int(result["guess"], 16)
+    result["peak"] = int(peaks[best_guess])
 
     if plotting:
-        save_corr_vector_plot(best_guess, corr_vec, byte_index)
+        result["plots"] = [
+            (save_cpa_score_curve_plot, (scores, byte_index)),
+            (save_corr_vector_plot, (best_guess, corr[best_guess], byte_index)),
+        ]
+
+    if return_matrix:
+        result["corr_matrix"] = corr
 
-    return {
-        "guess": hex(best_guess),
-        "confidence": confidence,
-        "best": best_score,
-        "second": second_score,
-        "second_guess": second_guess,
-    }
+    return result
 
 
 def cpa_guesser(
-    traces_file,
-    traces_shape,
-    traces_dtype,
-    textin_file,
-    textin_shape,
-    textin_dtype,
+    traces_store,
+    textin_store,
+    logging_settings=None,
     plotting=False,
+    return_matrix=False,
+    class_stats=None,
+    precision="float64",
+    executor=None,
+    profile_byte=None,
+    renderer=None,
+    cache=None,
+    model="hw",
 ) -> list[dict]:
 
-    if plotting:
-        save_hw_plot(HW)
-
     guesses = [None] * 16
+    # Unknown models and unreadable tables fail before any worker starts
+    leakage_table(model)
+
+    with (
+        worker_pool(executor, logging_settings) as executor,
+        plot_renderer(plotting, logging_settings, renderer) as renderer,
+    ):
+        if renderer is not None:
+            renderer.submit(save_leakage_plot, output_leakage(model), model)
 
-    with ProcessPoolExecutor() as executor:
         futures = {
             executor.submit(
                 cpa_worker,
                 i,
-                traces_file,
-                traces_shape,
-                traces_dtype,
-                textin_file,
-                textin_shape,
-                textin_dtype,
+                traces_store,
+                textin_store,
                 plotting=plotting,
+                return_matrix=return_matrix,
+                class_stats=class_stats,
+                precision=precision,
+                cache=cache,
+                model=model,
+                cprofile_path=(
+                    f"profile_cpa_byte{i:02d}.prof" if i == profile_byte else None
+                ),
             ): i
             for i in range(16)
         }
@@ -123,6 +176,10 @@ def cpa_guesser(
         for future in progress_bar(
             as_completed(futures), total=16, desc="Guessing bytes (CPA)"
         ):
-            guesses[futures[future]] = future.result()
+            result = future.result()
+            absorb_profile(result.pop("profile", None))
+            if renderer is not None:
+                renderer.submit_all(result.pop("plots", []))
+            guesses[futures[future]] = result
 
     return guesses
@@ -0,0 +1,247 @@
+from concurrent.futures import as_completed
+import math
+
+import numpy as np
+
+from src.aes.leakage import leakage_hypotheses, leakage_table
+from src.context.pool import worker_pool
+from src.context.precision import compute_dtype
+from src.context.shared import (
+    load_store,
+    store_rows,
+    store_sample_index,
+    store_samples,
+)
+from src.guesser.cpa import normalise_columns
+from src.guesser.scores import score_summary
+from src.utils.logger import get_logger
+from src.utils.profiling import absorb_profile, profiled_worker, timed, timer
+from src.utils.progress import progress_bar
+
+logger = get_logger(__name__)
+
+COMBINATIONS = ("product", "absdiff")
+
+
+def combine_pairs(xi, xj, combine="product", diagonal=False) -> np.ndarray:
+    # (n, bi) x (n, bj) -> (n, bi * bj), or only the pairs i < j when both
+    # blocks are the same. Product inputs must already be centred.
+    if combine == "product":
+        pairs = xi[:, :, None] * xj[:, None, :]
+    elif combine == "absdiff":
+        pairs = np.abs(xi[:, :, None] - xj[:, None, :])
+    else:
+        raise ValueError(f"Unknown sample combination: {combine}")
+
+    pairs = pairs.reshape(xi.shape[0], -1)
+    if diagonal:
+        ii, jj = np.triu_indices(xi.shape[1], 1)
+        pairs = pairs[:, ii * xj.shape[1] + jj]
+
+    return pairs
+
+
+def pair_block_size(n_traces, n_samples, itemsize, max_mb=256.0) -> int:
+    # Per worker: one byte's centred hypotheses, then per pair the combined
+    # column (twice on the diagonal, where the upper triangle is gathered),
+    # its 256 correlations with their top-k mask, its norm and its two int64
+    # sample indices (held twice). Pick the largest square tile that fits.
+    budget = max_mb * 2**20 - 256 * n_traces * itemsize
+    per_pair = (2 * n_traces + 258) * itemsize + 288
+    block = int(math.isqrt(max(int(budget // per_pair), 1)))
+
+    return max(1, min(block, n_samples))
+
+
+def _merge_top(top, scores, guesses, pairs, top_k):
+    # Best top_k (score, guess, pair) entries of the kept ones and the new
+    scores = np.concatenate([top[0], scores])
+    guesses = np.concatenate([top[1], guesses])
+    pairs = np.concatenate([top[2], pairs])
+    order = np.argsort(-scores, kind="stable")[:top_k]
+
+    return scores[order], guesses[order], pairs[order]
+
+
+@profiled_worker("cpa2.worker")
+def cpa2_worker(
+    traces_store,
+    textin_store,
+    row_block,
+    blocks,
+    combine="product",
+    precision="float64",
+    model="hw",
+    top_k=10,
+):
+    traces = load_store(traces_store)
+    textin = load_store(textin_store)
+    dtype = compute_dtype(precision)
+    n_bytes = textin.shape[1]
+
+    def load_block(block):
+        x = np.asarray(traces[:, block[0] : block[1]], dtype=dtype)
+        return x - x.mean(axis=0) if combine == "product" else x
+
+    scores = np.zeros((n_bytes, 256))
+    peaks = np.zeros((n_bytes, 256, 2), dtype=np.int64)
+    empty = (np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros((0, 2), np.int64))
+    top = [empty] * n_bytes
+
+    xi = load_block(row_block)
+    for col_block in blocks:
+        diagonal = col_block == row_block
+        xj = xi if diagonal else load_block(col_block)
+
+        if diagonal:
+            ii, jj = np.triu_indices(xi.shape[1], 1)
+        else:
+            ii, jj = np.divmod(np.arange(xi.shape[1] * xj.shape[1]), xj.shape[1])
+        if ii.size == 0:
+            continue
+        pair_samples = np.stack([ii + row_block[0], jj + col_block[0]], axis=1)
+
+        with timer("cpa2.combine"):
+            pairs = combine_pairs(xi, xj, combine, diagonal)
+            # Hypotheses are centred: only the norm of the pairs is needed
+            norm = np.sqrt(
+                np.maximum(
+                    np.einsum("ij,ij->j", pairs, pairs)
+                    - pairs.sum(axis=0) ** 2 / pairs.shape[0],
+                    0.0,
+                )
+            )
+            inv_norm = np.divide(1.0, norm, out=np.zeros_like(norm), where=norm > 0)
+
+        for b in range(n_bytes):
+            # Rebuilt per tile: cheap next to the product, and only one byte's
+            # hypotheses count against the memory cap.
+            with timer("cpa2.hypotheses"):
+                hyp = leakage_hypotheses(textin, b, model).astype(dtype)
+                hyp = normalise_columns(hyp)
+
+            with timer("cpa2.correlation"):
+                corr = hyp.T @ pairs
+                np.abs(corr, out=corr)
+                corr *= inv_norm
+
+            best = corr.argmax(axis=1)
+            best_corr = corr[np.arange(256), best]
+            better = best_corr > scores[b]
+            scores[b, better] = best_corr[better]
+            peaks[b, better] = pair_samples[best[better]]
+
+            # The k best row maxima are k distinct entries: no entry below
+            # the k-th of them, or below the k-th kept one, can be in the
+            # top-k, so only a few entries are gathered per tile.
+            floor = np.partition(best_corr, -top_k)[-top_k]
+            if top[b][0].size == top_k:
+                floor = max(floor, top[b][0][-1])
+            g, p = np.nonzero(corr >= floor)
+            top[b] = _merge_top(top[b], corr[g, p], g, pair_samples[p], top_k)
+
+    return {"scores": scores, "peaks": peaks, "top": top}
+
+
+@timed("cpa2.guesser")
+def cpa2_guesser(
+    traces_store,
+    textin_store,
+    logging_settings=None,
+    combine="product",
+    top_k=10,
+    max_mb=256.0,
+    precision="float64",
+    executor=None,
+    model="hw",
+) -> list[dict]:
+    if combine not in COMBINATIONS:
+        raise ValueError(f"Unknown sample combination: {combine}")
+    if not 1 <= top_k <= 256:
+        raise ValueError(f"top_k must be between 1 and 256, got {top_k}")
+    leakage_table(model)
+
+    n_traces = store_rows(traces_store)
+    n_samples = store_samples(traces_store)
+    dtype = compute_dtype(precision)
+    n_bytes = load_store(textin_store).shape[1]
+
+    # Tile the upper triangle of the S x S pair space into square blocks
+    # sized by the memory cap. One task is a block row: its first sample block
+    # is read once and combined with every block to its right.
+    size = pair_block_size(n_traces, n_samples, dtype.itemsize, max_mb)
+    blocks = [(s, min(s + size, n_samples)) for s in range(0, n_samples, size)]
+    n_pairs = n_samples * (n_samples - 1) // 2
+    logger.info(
+        "Second-order CPA (%s): %d pairs in %d x %d sample blocks",
+        combine,
+        n_pairs,
+        size,
+        size,
+    )
+
+    scores = np.zeros((n_bytes, 256))
+    peaks = np.zeros((n_bytes, 256, 2), dtype=np.int64)
+    empty = (np.zeros(0), np.zeros(0, dtype=np.int64), np.zeros((0, 2), np.int64))
+    top = [empty] * n_bytes
+
+    with worker_pool(executor, logging_settings) as executor:
+        futures = [
+            executor.submit(
+                cpa2_worker,
+                traces_store,
+                textin_store,
+                row_block,
+                blocks[i:],
+                combine=combine,
+                precision=precision,
+                model=model,
+                top_k=top_k,
+            )
+            for i, row_block in enumerate(blocks)
+        ]
+
+        for future in progress_bar(
+            as_completed(futures), total=len(futures), desc="Second-order CPA"
+        ):
+            result = future.result()
+            absorb_profile(result.pop("profile", None))
+
+            better = result["scores"] > scores
+            scores[better] = result["scores"][better]
+            peaks[better] = result["peaks"][better]
+            top = [
+                _merge_top(kept, *new, top_k) for kept, new in zip(top, result["top"])
+            ]
+
+    guesses = []
+    for b in range(n_bytes):
+        result = score_summary(scores[b])
+        best_guess = int(result["guess"], 16)
+        result["peak"] = tuple(
+            store_sample_index(traces_store, s) for s in peaks[b, best_guess]
+        )
+        # The best (pair, guess) entries over every tile: a strong guess can
+        # appear with several pairs
+        result["top"] = [
+            (
+                float(corr),
+                int(guess),
+                tuple(store_sample_index(traces_store, s) for s in pair),
+            )
+            for corr, guess, pair in zip(*top[b])
+        ]
+        guesses.append(result)
+
+    return guesses
+
+
+def print_top_pairs(guesses, limit=3):
+    logger.raw("")
+    logger.raw("=== SECOND-ORDER TOP (PAIR, GUESS) ENTRIES ===")
+    for b, result in enumerate(guesses):
+        entries = ", ".join(
+            f"0x{guess:02x} @ ({i}, {j}) {corr:.4f}"
+            for corr, guess, (i, j) in result["top"][:limit]
+        )
+        logger.raw(f"{b:>4} | {entries}")
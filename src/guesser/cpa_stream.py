@@ -0,0 +1,210 @@
+import time
+
+import numpy as np
+
+from src.aes.leakage import leakage_table, output_leakage
+from src.aes.tables import HW_SBOX_OUT
+from src.context.cache import cache_load, cache_save, score_key
+from src.context.precision import compute_dtype
+from src.context.renderer import plot_renderer
+from src.context.shared import (
+    load_store,
+    store_rows,
+    store_sample_index,
+    store_samples,
+    store_slice,
+)
+from src.guesser.cpa import cpa_corr_from_sums, cpa_result_from_corr
+from src.guesser.plots import save_leakage_plot
+from src.utils.logger import get_logger
+from src.utils.profiling import timed
+from src.utils.progress import progress_bar
+
+logger = get_logger(__name__)
+
+
+class CpaAccumulator:
+    def __init__(self, n_samples, n_bytes=16, dtype=np.float64, tables=None):
+        self.n = 0
+        self.shift = None
+        self.dtype = np.dtype(dtype)
+
+        # Leakage models side by side: the trace sums are shared and every
+        # model is scored by the same (n x M*256)^T @ (n x S) product.
+        tables = [HW_SBOX_OUT] if tables is None else tables
+        self.stack = np.concatenate(tables, axis=1)
+        width = self.stack.shape[1]
+
+        self.sum_x = np.zeros(n_samples, dtype=dtype)
+        self.sum_x2 = np.zeros(n_samples, dtype=dtype)
+        self.sum_h = np.zeros((n_bytes, width), dtype=dtype)
+        self.sum_h2 = np.zeros((n_bytes, width), dtype=dtype)
+        self.sum_hx = np.zeros((n_bytes, width, n_samples), dtype=dtype)
+
+    @timed("cpa_stream.update")
+    def update(self, traces, textin, byte_indices=None):
+        x = np.asarray(traces, dtype=self.dtype)
+        if x.shape[0] == 0:
+            return
+
+        # Correlation is shift-invariant: accumulating around the first chunk
+        # mean keeps the running sums of squares well conditioned.
+        if self.shift is None:
+            self.shift = x.mean(axis=0)
+        x = x - self.shift
+
+        self.n += x.shape[0]
+        self.sum_x += x.sum(axis=0)
+        self.sum_x2 += np.sum(x**2, axis=0)
+
+        if byte_indices is None:
+            byte_indices = range(self.sum_h.shape[0])
+
+        for b in byte_indices:
+            h = self.stack[textin[:, b]].astype(self.dtype)
+            self.sum_h[b] += h.sum(axis=0)
+            self.sum_h2[b] += np.sum(h**2, axis=0)
+            self.sum_hx[b] += h.T @ x
+
+    def corr(self, byte_index, model=0):
+        guesses = slice(256 * model, 256 * (model + 1))
+        return cpa_corr_from_sums(
+            self.n,
+            self.sum_h[byte_index, guesses],
+            self.sum_h2[byte_index, guesses],
+            self.sum_x,
+            self.sum_x2,
+            self.sum_hx[byte_index, guesses],
+        )
+
+
+def _stream_accumulate(traces_store, textin, chunk_size, dtype, tables=None):
+    n_traces = store_rows(traces_store)
+    acc = CpaAccumulator(store_samples(traces_store), textin.shape[1], dtype, tables)
+
+    start_time = time.perf_counter()
+    starts = range(0, n_traces, chunk_size)
+    for start in progress_bar(starts, total=len(starts), desc="Streaming CPA"):
+        stop = min(start + chunk_size, n_traces)
+        acc.update(
+            load_store(store_slice(traces_store, start, stop)), textin[start:stop]
+        )
+
+    elapsed = time.perf_counter() - start_time
+    logger.info(
+        "Streamed %d traces in %.2fs (%.0f traces/s, chunk size %d)",
+        acc.n,
+        elapsed,
+        acc.n / max(elapsed, 1e-9),
+        chunk_size,
+    )
+
+    return acc
+
+
+def _cached_corrs(cache, traces_store, textin_store, n_bytes, precision, model):
+    if cache is None:
+        return [None] * n_bytes, None
+
+    keys = [
+        score_key("cpa", traces_store, textin_store, b, precision, model)
+        for b in range(n_bytes)
+    ]
+    return [cache_load(cache, key) for key in keys], keys
+
+
+def _stream_results(traces_store, corrs, plotting=False):
+    results = [cpa_result_from_corr(corr, b, plotting) for b, corr in enumerate(corrs)]
+    for result in results:
+        result["peak"] = store_sample_index(traces_store, result["peak"])
+
+    return results
+
+
+def _render_plots(results, model, plotting, renderer):
+    with plot_renderer(plotting, renderer=renderer) as renderer:
+        if renderer is not None:
+            renderer.submit(save_leakage_plot, output_leakage(model), model)
+            for result in results:
+                renderer.submit_all(result.pop("plots", []))
+
+
+def cpa_stream_guesser(
+    traces_store,
+    textin_store,
+    chunk_size=1024,
+    plotting=False,
+    precision="float64",
+    renderer=None,
+    cache=None,
+    model="hw",
+) -> list[dict]:
+
+    textin = load_store(textin_store)
+    n_bytes = textin.shape[1]
+    table = leakage_table(model)
+
+    corrs, keys = _cached_corrs(
+        cache, traces_store, textin_store, n_bytes, precision, model
+    )
+    if any(corr is None for corr in corrs):
+        dtype = compute_dtype(precision)
+        acc = _stream_accumulate(traces_store, textin, chunk_size, dtype, [table])
+
+        for b in range(n_bytes):
+            if corrs[b] is None:
+                corrs[b] = acc.corr(b)
+                if cache is not None:
+                    cache_save(cache, keys[b], corrs[b])
+
+    results = _stream_results(traces_store, corrs, plotting)
+    _render_plots(results, model, plotting, renderer)
+
+    return results
+
+
+@timed("cpa_stream.models")
+def cpa_models_guesser(
+    traces_store,
+    textin_store,
+    models=("hw",),
+    chunk_size=1024,
+    precision="float64",
+    plotting=False,
+    renderer=None,
+    cache=None,
+) -> dict:
+    if not models:
+        raise ValueError("At least one leakage model is needed")
+    duplicates = sorted({model for model in models if list(models).count(model) > 1})
+    if duplicates:
+        raise ValueError(
+            f"Leakage models listed more than once: {', '.join(duplicates)}"
+        )
+
+    # One pass over the traces for every model; only the first one is plotted
+    textin = load_store(textin_store)
+    n_bytes = textin.shape[1]
+    tables = [leakage_table(model) for model in models]
+
+    cached = [
+        _cached_corrs(cache, traces_store, textin_store, n_bytes, precision, model)
+        for model in models
+    ]
+    if any(corr is None for corrs, _ in cached for corr in corrs):
+        dtype = compute_dtype(precision)
+        acc = _stream_accumulate(traces_store, textin, chunk_size, dtype, tables)
+
+        for m, (corrs, keys) in enumerate(cached):
+            for b in range(n_bytes):
+                if corrs[b] is None:
+                    corrs[b] = acc.corr(b, m)
+                    if cache is not None:
+                        cache_save(cache, keys[b], corrs[b])
+
+    results = {}
+    for m, (model, (corrs, _)) in enumerate(zip(models, cached)):
+        results[model] = _stream_results(traces_store, corrs, plotting and m == 0)
+    _render_plots(results[models[0]], models[0], plotting, renderer)
+
+    return results
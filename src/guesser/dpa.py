@@ -1,113 +1,142 @@
 # Disable import-error due to incoherent module from python 2.7 to 3.x transition
 # pylint: disable=E0611
-from concurrent.futures import (
-    ProcessPoolExecutor,
-    as_completed,
-)
+from concurrent.futures import as_completed
 
 import numpy as np
 
-from src.aes.functions import aes_internal
-from src.context.shared import load_array_from_mmap
+from src.aes.leakage import selection_table
+from src.context.cache import cached_matrix
+from src.context.class_stats import load_class_stats
+from src.context.pool import worker_pool
+from src.context.renderer import plot_renderer
+from src.context.precision import compute_dtype
+from src.context.shared import load_store
 from src.utils.progress import progress_bar
 from src.guesser.plots import save_diff_vector_plot, save_score_curve_plot
-from src.utils.logger import get_logger, worker_init_logger
+from src.guesser.scores import score_summary
+from src.utils.logger import get_logger
+from src.utils.profiling import absorb_profile, profiled_worker, timer
 
 logger = get_logger(__name__)
 
 
-def dpa_compute_score(guess, traces, textin, byte_index=0):
-    diff_vec = dpa_diff_vector(guess, traces, textin, byte_index)
-    return float(np.max(diff_vec))
+def dpa_diff_from_sums(sums1, counts1, total, n):
+    counts1 = counts1.astype(sums1.dtype, copy=False)[:, None]
+    total = total.astype(sums1.dtype, copy=False)
+    sums0 = total - sums1
+    counts0 = n - counts1
 
+    valid = (counts1 > 0) & (counts0 > 0)
+    mean1 = np.divide(sums1, counts1, out=np.zeros_like(sums1), where=valid)
+    mean0 = np.divide(sums0, counts0, out=np.zeros_like(sums0), where=valid)
 
-def dpa_diff_vector(guess, traces, textin, byte_index=0):
-    hyp = np.array([aes_internal(guess, t) for t in textin[:, byte_index]])
-    mask = hyp & 1
+    return np.abs(mean1 - mean0)
 
-    sel1 = traces[mask == 1]
-    sel0 = traces[mask == 0]
 
-    if sel1.size == 0 or sel0.size == 0:
-        return np.zeros(traces.shape[1])
+def _diff_of_means(sel, sums, counts):
+    return dpa_diff_from_sums(
+        sel.T @ sums, sel.T @ counts, sums.sum(axis=0), counts.sum()
+    )
 
-    return abs(sel1.mean(0) - sel0.mean(0))
 
+def dpa_diff_matrix(traces, textin, byte_index=0, dtype=np.float64, model="bit0"):
+    with timer("dpa.hypotheses"):
+        sel = selection_table(model)[textin[:, byte_index]].astype(dtype)
 
-def dpa_worker(
-    byte_index,
-    traces_file,
-    traces_shape,
-    traces_dtype,
-    textin_file,
-    textin_shape,
-    textin_dtype,
-    plotting=False,
-):
-
-    traces = load_array_from_mmap(traces_file, traces_shape, traces_dtype)
-    textin = load_array_from_mmap(textin_file, textin_shape, textin_dtype)
+    with timer("dpa.diff_of_means"):
+        traces = np.asarray(traces, dtype=dtype)
+        return _diff_of_means(sel, traces, np.ones(traces.shape[0], dtype=dtype))
 
-    scores = np.zeros(256)
-    for g in range(256):
-        scores[g] = dpa_compute_score(g, traces, textin, byte_index)
 
-    if plotting:
-        save_score_curve_plot(scores, byte_index)
+def dpa_diff_matrix_from_stats(counts, sums, model="bit0"):
+    sel = selection_table(model).astype(sums.dtype)
 
-    scores = np.array(scores)
+    with timer("dpa.diff_of_means"):
+        return _diff_of_means(sel, sums, counts)
 
-    best_guess = int(np.argmax(scores))
-    best_score = float(scores[best_guess])
 
-    scores_copy = scores.copy()
-    scores_copy[best_guess] = -np.inf
-    second_guess = int(np.argmax(scores_copy))
-    second_score = float(scores[second_guess])
+@profiled_worker("dpa.worker")
+def dpa_worker(
+    byte_index,
+    traces_store,
+    textin_store,
+    plotting=False,
+    class_stats=None,
+    precision="float64",
+    cache=None,
+    model="bit0",
+):
 
-    contrast = (best_score - second_score) / max(second_score, 1e-15)
-    confidence = min(max(contrast, 0.0), 1.0)
+    def compute():
+        if class_stats is not None:
+            counts, sums, _ = load_class_stats(class_stats, byte_index)
+            return dpa_diff_matrix_from_stats(counts, sums, model)
+
+        traces = load_store(traces_store)
+        textin = load_store(textin_store)
+        dtype = compute_dtype(precision)
+        return dpa_diff_matrix(traces, textin, byte_index, dtype, model)
+
+    diff = cached_matrix(
+        cache,
+        compute,
+        "dpa",
+        traces_store,
+        textin_store,
+        byte_index,
+        precision,
+        model,
+    )
+    scores = diff.max(axis=1)
+
+    result = score_summary(scores)
+    best_guess = int(result["guess"], 16)
 
-    diff_vec = dpa_diff_vector(best_guess, traces, textin, byte_index)
     if plotting:
-        save_diff_vector_plot(best_guess, diff_vec, byte_index)
+        result["plots"] = [
+            (save_score_curve_plot, (scores, byte_index)),
+            (save_diff_vector_plot, (best_guess, diff[best_guess], byte_index)),
+        ]
 
-    return {
-        "guess": hex(best_guess),
-        "confidence": confidence,
-        "best": best_score,
-        "second": second_score,
-        "second_guess": second_guess,
-    }
+    return result
 
 
 def dpa_guesser(
-    traces_file,
-    traces_shape,
-    traces_dtype,
-    textin_file,
-    textin_shape,
-    textin_dtype,
+    traces_store,
+    textin_store,
     logging_settings=None,
     plotting=False,
+    class_stats=None,
+    precision="float64",
+    executor=None,
+    profile_byte=None,
+    renderer=None,
+    cache=None,
+    model="bit0",
 ) -> list[dict]:
 
     guesses = [None] * 16
+    # Models that are not 0/1 selections fail before any worker starts
+    selection_table(model)
 
-    with ProcessPoolExecutor(
-        initializer=worker_init_logger, initargs=(logging_settings,)
-    ) as executor:
+    with (
+        worker_pool(executor, logging_settings) as executor,
+        plot_renderer(plotting, logging_settings, renderer) as renderer,
+    ):
         futures = {
             executor.submit(
                 dpa_worker,
                 i,
-                traces_file,
-                traces_shape,
-                traces_dtype,
-                textin_file,
-                textin_shape,
-                textin_dtype,
+                traces_store,
+                textin_store,
                 plotting=plotting,
+                class_stats=class_stats,
+                precision=precision,
+                cache=cache,
+                model=model,
+                cprofile_path=(
+                    f"profile_dpa_byte{i:02d}.prof" if i == profile_byte else None
+                ),
             ): i
             for i in range(16)
         }
@@ -115,6 +144,10 @@ def dpa_guesser(
         for future in progress_bar(
             as_completed(futures), total=16, desc="Guessing bytes"
         ):
-            guesses[futures[future]] = future.result()
+            result = future.result()
+            absorb_profile(result.pop("profile", None))
+            if renderer is not None:
+                renderer.submit_all(result.pop("plots", []))
+            guesses[futures[future]] = result
 
     return guesses
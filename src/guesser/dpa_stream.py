@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.aes.tables import BITS_SBOX_OUT
+from src.guesser.dpa import dpa_diff_from_sums
+from src.utils.profiling import timed
+
+
+class DpaAccumulator:
+    def __init__(self, n_samples, n_bytes=16, dtype=np.float64, tables=None):
+        self.n = 0
+        self.dtype = np.dtype(dtype)
+
+        # Selection functions side by side, as in CpaAccumulator
+        tables = [BITS_SBOX_OUT[0]] if tables is None else tables
+        self.stack = np.concatenate(tables, axis=1)
+        width = self.stack.shape[1]
+
+        self.total = np.zeros(n_samples, dtype=dtype)
+        self.counts1 = np.zeros((n_bytes, width), dtype=dtype)
+        self.sums1 = np.zeros((n_bytes, width, n_samples), dtype=dtype)
+
+    @timed("dpa_stream.update")
+    def update(self, traces, textin, byte_indices=None):
+        x = np.asarray(traces, dtype=self.dtype)
+        if x.shape[0] == 0:
+            return
+
+        self.n += x.shape[0]
+        self.total += x.sum(axis=0)
+
+        if byte_indices is None:
+            byte_indices = range(self.sums1.shape[0])
+
+        for b in byte_indices:
+            sel = self.stack[textin[:, b]].astype(self.dtype)
+            self.counts1[b] += sel.sum(axis=0)
+            self.sums1[b] += sel.T @ x
+
+    def diff(self, byte_index, model=0):
+        guesses = slice(256 * model, 256 * (model + 1))
+        return dpa_diff_from_sums(
+            self.sums1[byte_index, guesses],
+            self.counts1[byte_index, guesses],
+            self.total,
+            self.n,
+        )
@@ -0,0 +1,251 @@
+import math
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from src.aes.cipher import matching_keys
+from src.utils.logger import get_logger
+from src.utils.profiling import count, timed
+
+logger = get_logger(__name__)
+
+
+def scores_to_log_probs(score_tables) -> np.ndarray:
+    # Each byte's scores are normalised into a distribution over its 256
+    # guesses; a key's log-likelihood is the sum over its bytes.
+    scores = np.maximum(np.asarray(score_tables, dtype=np.float64), 0.0)
+    totals = scores.sum(axis=1, keepdims=True)
+    probs = np.divide(
+        scores, totals, out=np.full_like(scores, 1 / 256), where=totals > 0
+    )
+
+    return np.log(np.maximum(probs, 1e-300))
+
+
+def _histograms(log_probs, nbins):
+    lo, hi = log_probs.min(), log_probs.max()
+    width = (hi - lo) / (nbins - 1) if hi > lo else 1.0
+
+    # Higher bin index = more likely guess
+    bins = np.rint((log_probs - lo) / width).astype(np.int64)
+    hists = [np.bincount(b, minlength=nbins).astype(np.float64) for b in bins]
+
+    partial = [hists[0]]
+    for h in hists[1:]:
+        partial.append(np.convolve(partial[-1], h))
+
+    return bins, hists, partial
+
+
+@timed("enumeration.rank")
+def estimate_key_rank(log_probs, key, nbins=2048) -> dict:
+    bins, _, partial = _histograms(log_probs, nbins)
+    total = partial[-1]
+    key_bin = int(sum(bins[b, k] for b, k in enumerate(key)))
+
+    # Rounding moves every byte by at most half a bin: keys more than one bin
+    # per byte away are ordered for sure.
+    margin = len(key)
+    rank = total[key_bin + 1 :].sum() + 1
+    lower = total[key_bin + margin + 1 :].sum() + 1
+    upper = total[max(key_bin - margin, 0) :].sum()
+
+    return {
+        "rank": float(rank),
+        "lower": float(lower),
+        "upper": float(upper),
+        "log2_rank": math.log2(rank),
+        "log2_lower": math.log2(lower),
+        "log2_upper": math.log2(max(upper, 1)),
+    }
+
+
+def _bin_combinations(hists, partial, t, chunk=4096):
+    # Every way of splitting the total bin t between the digits, as arrays of
+    # bin combinations (one row each). Digits are expanded from the last one
+    # down, a chunk of partial combinations at a time, keeping only the bins
+    # whose remainder is reachable by the digits below.
+    n_digits = len(hists)
+    stack = [(n_digits - 1, np.empty((1, 0), dtype=np.int64), np.array([t]))]
+    while stack:
+        k, chosen, rest = stack.pop()
+        if k == 0:
+            ok = (rest < len(hists[0])) & (
+                hists[0][np.minimum(rest, len(hists[0]) - 1)] > 0
+            )
+            if ok.any():
+                yield np.column_stack([rest[ok], chosen[ok]])
+            continue
+
+        b = np.nonzero(hists[k])[0]
+        r = rest[:, None] - b[None, :]
+        valid = (r >= 0) & (r < len(partial[k - 1]))
+        valid[valid] = partial[k - 1][r[valid]] > 0
+        rows, cols = np.nonzero(valid)
+        chosen = np.column_stack([b[cols], chosen[rows]])
+        rest = rest[rows] - b[cols]
+
+        # Pushed last-first so the combinations come out chunk by chunk in order
+        for start in range((len(rest) - 1) // chunk * chunk, -1, -chunk):
+            stack.append(
+                (k - 1, chosen[start : start + chunk], rest[start : start + chunk])
+            )
+
+
+def _pair_log_probs(log_probs):
+    # Bytes 2i and 2i + 1 merged into one 65536-candidate "digit": half as
+    # many levels to walk, and far more keys per bin combination.
+    n_pairs = log_probs.shape[0] // 2
+    return (log_probs[0::2, :, None] + log_probs[1::2, None, :]).reshape(n_pairs, -1)
+
+
+def _pairs_to_keys(pairs):
+    return (
+        np.stack([pairs >> 8, pairs & 0xFF], axis=-1)
+        .astype(np.uint8)
+        .reshape(pairs.shape[0], -1)
+    )
+
+
+def _expand(combos, sizes, counts, offsets, orders, start, stop):
+    # Keys start..stop of the concatenated cartesian products of the combos'
+    # bins, as mixed-radix numbers over the bin sizes
+    ends = np.cumsum(counts)
+    index = np.arange(start, stop, dtype=np.int64)
+    c = np.searchsorted(ends, index, side="right")
+    local = index - (ends[c] - counts[c])
+
+    pairs = np.empty((index.size, combos.shape[1]), dtype=np.uint16)
+    for k in range(combos.shape[1] - 1, -1, -1):
+        digit = local % sizes[c, k]
+        local //= sizes[c, k]
+        pairs[:, k] = orders[k][offsets[k][combos[c, k]] + digit]
+
+    return pairs
+
+
+def histogram_enumerate(log_probs, max_candidates=1 << 24, nbins=256, batch=1 << 16):
+    # Histogram enumeration: walk the convolved histogram from its most likely
+    # bin down, and expand each bin into the cartesian products of candidates
+    # that land there. Batches come out in decreasing likelihood up to the
+    # bin width.
+    pair_probs = _pair_log_probs(log_probs)
+    bins, hists, partial = _histograms(pair_probs, nbins)
+    n_pairs = len(hists)
+
+    # Candidates of each digit sorted by bin, and where each bin starts
+    orders = [np.argsort(b, kind="stable").astype(np.uint16) for b in bins]
+    sizes_by_bin = [h.astype(np.int64) for h in hists]
+    offsets = [np.cumsum(h) - h for h in sizes_by_bin]
+
+    # Bin combinations are expanded many at a time, so the cost per key stays
+    # vectorised however few keys each combination holds. Batches start small
+    # and double, so a well-ranked key is tested right away.
+    pending, n_pending, emitted = [], 0, 0
+    target = min(256, batch)
+    for t in np.nonzero(partial[-1])[0][::-1]:
+        for combos in _bin_combinations(hists, partial, int(t)):
+            sizes = np.stack(
+                [sizes_by_bin[k][combos[:, k]] for k in range(n_pairs)], axis=1
+            )
+
+            # Products can overflow int64: only the keys within the budget
+            # are counted exactly
+            budget = max_candidates - emitted - n_pending
+            products = np.prod(sizes.astype(np.float64), axis=1)
+            starts = np.concatenate([[0.0], np.cumsum(products)[:-1]])
+            keep = starts < budget
+            combos, sizes = combos[keep], sizes[keep]
+            counts = np.minimum(products[keep], budget - starts[keep]).astype(np.int64)
+
+            total = int(counts.sum())
+            done = 0
+            while done < total:
+                stop = min(done + target - n_pending, total)
+                pending.append(
+                    _expand(combos, sizes, counts, offsets, orders, done, stop)
+                )
+                n_pending += stop - done
+                done = stop
+                if n_pending < target and emitted + n_pending < max_candidates:
+                    continue
+
+                pairs = np.concatenate(pending)
+                pending, n_pending = [], 0
+                target = min(2 * target, batch)
+                emitted += pairs.shape[0]
+                yield _pairs_to_keys(pairs)
+                if emitted >= max_candidates:
+                    return
+
+    if pending:
+        yield _pairs_to_keys(np.concatenate(pending))
+
+
+def _test_batch(keys, plaintext, ciphertext):
+    return matching_keys(keys, plaintext, ciphertext)
+
+
+@timed("enumeration.search")
+def search_key(
+    log_probs,
+    plaintext,
+    ciphertext,
+    max_candidates=1 << 24,
+    nbins=256,
+    batch=1 << 16,
+    executor=None,
+) -> dict:
+    start_time = time.perf_counter()
+    batches = histogram_enumerate(log_probs, max_candidates, nbins, batch)
+    tested = 0
+    found = None
+
+    # Batches are checked in enumeration order: with a pool, a bounded window
+    # of them is in flight at once.
+    window = deque()
+    depth = 1 if executor is None else 2 * (os.cpu_count() or 1)
+    for keys in batches:
+        if executor is None:
+            window.append((keys, _test_batch(keys, plaintext, ciphertext)))
+        else:
+            window.append(
+                (keys, executor.submit(_test_batch, keys, plaintext, ciphertext))
+            )
+        if len(window) < depth:
+            continue
+
+        found, tested = _drain(window, tested, until=depth - 1)
+        if found is not None:
+            break
+
+    if found is None:
+        found, tested = _drain(window, tested, until=0)
+
+    for _, hits in window:
+        if not isinstance(hits, np.ndarray):
+            hits.cancel()
+
+    elapsed = time.perf_counter() - start_time
+    count("enumeration.tested", tested)
+
+    return {
+        "key": found,
+        "tested": tested,
+        "elapsed": elapsed,
+        "keys_per_s": tested / max(elapsed, 1e-9),
+    }
+
+
+def _drain(window, tested, until):
+    while len(window) > until:
+        keys, hits = window.popleft()
+        if not isinstance(hits, np.ndarray):
+            hits = hits.result()
+        if hits.size:
+            return keys[hits[0]].tobytes(), tested + int(hits[0]) + 1
+        tested += keys.shape[0]
+
+    return None, tested
@@ -0,0 +1,271 @@
+from concurrent.futures import as_completed
+import os
+
+import numpy as np
+
+from src.aes.tables import bit_hypotheses, hw_hypotheses
+from src.context.pool import worker_pool
+from src.context.precision import compute_dtype
+from src.context.shared import load_store, store_rows
+from src.guesser.dpa import dpa_diff_from_sums
+from src.guesser.enumeration import estimate_key_rank, scores_to_log_probs
+from src.guesser.plots import save_evaluation_plot
+from src.utils.logger import get_logger
+from src.utils.profiling import absorb_profile, profiled_worker, timed
+from src.utils.progress import progress_bar
+
+logger = get_logger(__name__)
+
+HYPOTHESES = {"dpa": bit_hypotheses, "cpa": hw_hypotheses}
+
+# Per-worker per-sample trace mean: the traces themselves stay in the shared
+# memory map, and every resample only gathers its rows from it.
+_SHIFTS = {}
+
+
+def _trace_shift(attack, traces_store, traces, dtype):
+    if attack != "cpa":
+        return None
+
+    # Correlation is shift-invariant: centring every gathered subset on the
+    # dataset mean keeps the resamples' sums of squares well conditioned.
+    key = (repr(traces_store), dtype.str)
+    if key not in _SHIFTS:
+        _SHIFTS.clear()
+        shift = np.zeros(traces.shape[1])
+        for start in range(0, traces.shape[0], 1024):
+            shift += np.asarray(traces[start : start + 1024]).sum(axis=0)
+        _SHIFTS[key] = (shift / traces.shape[0]).astype(dtype)
+
+    return _SHIFTS[key]
+
+
+def _hypotheses(attack, textin):
+    # All bytes side by side: one (n x 16*256)^T @ (n x S) product per step
+    return np.concatenate(
+        [HYPOTHESES[attack](textin, b) for b in range(textin.shape[1])], axis=1
+    )
+
+
+def _cpa_peaks(n, sum_h, sum_h2, sum_x, sum_x2, sum_hx):
+    # max_s |corr[k, s]| without building the correlation matrix: the
+    # hypothesis variance factors out of the max over samples.
+    sum_h, sum_h2, sum_x, sum_x2 = (
+        np.asarray(a, dtype=np.float64) for a in (sum_h, sum_h2, sum_x, sum_x2)
+    )
+    var_h = np.maximum(n * sum_h2 - sum_h**2, 0.0)
+    var_x = np.maximum(n * sum_x2 - sum_x**2, 0.0)
+    inv_h = np.divide(1.0, np.sqrt(var_h), out=np.zeros_like(var_h), where=var_h > 0)
+    inv_x = np.divide(1.0, np.sqrt(var_x), out=np.zeros_like(var_x), where=var_x > 0)
+
+    num = sum_hx * (n * inv_x)
+    num -= np.outer(sum_h, sum_x * inv_x)
+    return np.abs(num, out=num).max(axis=1) * inv_h
+
+
+def _experiment_scores(attack, traces, textin, shift, order, checkpoints, dtype):
+    # The subsets of one experiment are nested prefixes of a permutation, so
+    # each trace count only adds its new rows to the previous statistics.
+    width = 256 * textin.shape[1]
+    sum_hx = np.zeros((width, traces.shape[1]), dtype=dtype)
+    sum_h = np.zeros(width, dtype=dtype)
+    sum_h2 = np.zeros(width, dtype=dtype)
+    sum_x = np.zeros(traces.shape[1], dtype=dtype)
+    sum_x2 = np.zeros(traces.shape[1], dtype=dtype)
+
+    prev = 0
+    for stop in checkpoints:
+        # Sorted gathers read the memory map front to back; the statistics
+        # are sums, so the row order within a step does not matter
+        rows = np.sort(order[prev:stop])
+        xs = np.asarray(traces[rows], dtype=dtype)
+        if shift is not None:
+            xs -= shift
+        hs = _hypotheses(attack, textin[rows]).astype(dtype)
+        prev = stop
+
+        sum_hx += hs.T @ xs
+        sum_h += hs.sum(axis=0)
+        sum_x += xs.sum(axis=0)
+
+        if attack == "cpa":
+            sum_h2 += np.sum(hs**2, axis=0)
+            sum_x2 += np.sum(xs**2, axis=0)
+            scores = _cpa_peaks(stop, sum_h, sum_h2, sum_x, sum_x2, sum_hx)
+        else:
+            scores = dpa_diff_from_sums(sum_hx, sum_h, sum_x, stop).max(axis=1)
+
+        yield scores.reshape(-1, 256)
+
+
+@profiled_worker("evaluation.worker")
+def evaluation_worker(
+    attack,
+    traces_store,
+    textin_store,
+    experiments,
+    checkpoints,
+    key,
+    seed=0,
+    precision="float64",
+    rank_bins=256,
+):
+    traces = load_store(traces_store)
+    textin = load_store(textin_store)
+    dtype = compute_dtype(precision)
+    shift = _trace_shift(attack, traces_store, traces, dtype)
+    key = np.frombuffer(bytes(key), dtype=np.uint8)
+    n_bytes = len(key)
+
+    byte_ranks = np.zeros((len(experiments), len(checkpoints), n_bytes), np.uint16)
+    log2_key_ranks = np.zeros((len(experiments), len(checkpoints)), np.float32)
+
+    for e, experiment in enumerate(experiments):
+        rng = np.random.default_rng([seed, experiment])
+        order = rng.permutation(traces.shape[0])[: checkpoints[-1]]
+
+        for c, scores in enumerate(
+            _experiment_scores(attack, traces, textin, shift, order, checkpoints, dtype)
+        ):
+            # Ties count in the key's favour, as in key_rank()
+            correct = scores[np.arange(n_bytes), key][:, None]
+            ranks = np.sum(scores > correct, axis=1) + 1
+            byte_ranks[e, c] = ranks
+
+            # Every byte ranked first: the key is the most likely one
+            if np.any(ranks > 1):
+                log2_key_ranks[e, c] = estimate_key_rank(
+                    scores_to_log_probs(scores), key, rank_bins
+                )["log2_rank"]
+
+    return {
+        "experiments": list(experiments),
+        "byte_ranks": byte_ranks,
+        "log2_key_ranks": log2_key_ranks,
+    }
+
+
+def summarise_ranks(checkpoints, byte_ranks, log2_key_ranks) -> dict:
+    # Guessing entropies are means of log2 ranks, in bits
+    return {
+        "checkpoints": np.asarray(checkpoints, dtype=np.int64),
+        "byte_ranks": byte_ranks,
+        "log2_key_ranks": log2_key_ranks,
+        "success_rate": np.mean(byte_ranks == 1, axis=0),
+        "key_success_rate": np.mean(np.all(byte_ranks == 1, axis=2), axis=0),
+        "guessing_entropy": np.mean(np.log2(byte_ranks), axis=0),
+        "key_guessing_entropy": np.mean(log2_key_ranks, axis=0),
+    }
+
+
+@timed("evaluation.attack")
+def evaluate_attack(
+    traces_store,
+    textin_store,
+    checkpoints,
+    key,
+    attack="cpa",
+    n_experiments=200,
+    seed=0,
+    precision="float64",
+    rank_bins=256,
+    logging_settings=None,
+    executor=None,
+) -> dict:
+    if checkpoints[-1] > store_rows(traces_store):
+        raise ValueError(
+            f"Cannot draw {checkpoints[-1]} traces out of "
+            f"{store_rows(traces_store)}"
+        )
+
+    n_bytes = len(key)
+    byte_ranks = np.zeros((n_experiments, len(checkpoints), n_bytes), np.uint16)
+    log2_key_ranks = np.zeros((n_experiments, len(checkpoints)), np.float32)
+
+    # A few tasks per worker balance the load; every worker maps the same
+    # trace file and only keeps the per-sample mean.
+    n_tasks = min(n_experiments, 4 * (os.cpu_count() or 1))
+    with worker_pool(executor, logging_settings) as executor:
+        futures = [
+            executor.submit(
+                evaluation_worker,
+                attack,
+                traces_store,
+                textin_store,
+                experiments,
+                checkpoints,
+                key,
+                seed=seed,
+                precision=precision,
+                rank_bins=rank_bins,
+            )
+            for experiments in np.array_split(np.arange(n_experiments), n_tasks)
+        ]
+
+        for future in progress_bar(
+            as_completed(futures),
+            total=len(futures),
+            desc=f"Evaluating {attack.upper()}",
+        ):
+            result = future.result()
+            absorb_profile(result.pop("profile", None))
+            byte_ranks[result["experiments"]] = result["byte_ranks"]
+            log2_key_ranks[result["experiments"]] = result["log2_key_ranks"]
+
+    return summarise_ranks(checkpoints, byte_ranks, log2_key_ranks)
+
+
+def save_evaluation(path: str, attack: str, summary: dict, **metadata):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, attack=attack, **summary, **metadata)
+
+
+def load_evaluation(path: str) -> dict:
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def plot_evaluation(attack: str, summary: dict, outdir="plots/evaluation"):
+    checkpoints = summary["checkpoints"]
+
+    return [
+        save_evaluation_plot(
+            checkpoints,
+            summary["success_rate"],
+            summary["key_success_rate"],
+            f"{attack.upper()} success rate",
+            "Success rate",
+            f"{outdir}/{attack}_success_rate.png",
+        ),
+        save_evaluation_plot(
+            checkpoints,
+            summary["guessing_entropy"],
+            summary["key_guessing_entropy"],
+            f"{attack.upper()} guessing entropy",
+            "log2 rank of the correct key",
+            f"{outdir}/{attack}_guessing_entropy.png",
+        ),
+    ]
+
+
+def print_evaluation(attack: str, summary: dict, target=0.9):
+    logger.raw("")
+    logger.raw(f"=== {attack.upper()} EVALUATION ===")
+    logger.raw("Traces | Key SR | Mean byte SR | Byte GE (bits) | Key rank (log2)")
+    logger.raw("-------+--------+--------------+----------------+----------------")
+    for i, n in enumerate(summary["checkpoints"]):
+        logger.raw(
+            f"{n:>6} | {summary['key_success_rate'][i]:>6.2f} "
+            f"| {summary['success_rate'][i].mean():>12.2f} "
+            f"| {summary['guessing_entropy'][i].mean():>14.2f} "
+            f"| {summary['key_guessing_entropy'][i]:>15.1f}"
+        )
+
+    reached = np.nonzero(summary["key_success_rate"] >= target)[0]
+    if reached.size:
+        logger.raw(
+            f"Full key recovered in {target:.0%} of the experiments from "
+            f"{summary['checkpoints'][reached[0]]} traces"
+        )
+    else:
+        logger.raw(f"Full key success rate stays below {target:.0%}")
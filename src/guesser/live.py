@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+
+from src.context.framing import open_source, read_records, read_stream_header
+from src.context.precision import compute_dtype
+from src.guesser.cpa_stream import CpaAccumulator
+from src.guesser.dpa_stream import DpaAccumulator
+from src.guesser.scores import key_rank, score_summary
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _live_results(scores_fn, n_bytes, key=None) -> list[dict]:
+    results = []
+    for b in range(n_bytes):
+        scores = scores_fn(b)
+        result = score_summary(scores)
+        result["rank"] = None if key is None else key_rank(scores, key[b])
+        results.append(result)
+
+    return results
+
+
+def _print_live_report(n_traces, rate, dpa, cpa):
+    def cell(r):
+        rank = "-" if r["rank"] is None else r["rank"]
+        return (
+            f"0x{int(r['guess'], 16):02x} | {r['confidence'] * 100:6.2f}% | {rank:>4}"
+        )
+
+    logger.raw("")
+    logger.raw(f"=== LIVE: {n_traces} traces ({rate:.0f} traces/s) ===")
+    logger.raw("Byte | DPA  |  Conf   | Rank | CPA  |  Conf   | Rank")
+    logger.raw("-----+------+---------+------+------+---------+-----")
+    for b, (d, c) in enumerate(zip(dpa, cpa)):
+        logger.raw(f"{b:>4} | {cell(d)} | {cell(c)}")
+
+
+def live_attack(
+    source, interval=1000, max_batch=1024, precision="float64", key=None
+) -> dict:
+    if interval < 1:
+        raise ValueError(f"The report interval must be at least 1, got {interval}")
+
+    logger.info("Waiting for traces on %s", source)
+    f = open_source(source)
+    header = read_stream_header(f)
+    logger.info(
+        "Receiving %d-sample %s traces with %d-byte plaintexts",
+        header["n_samples"],
+        header["dtype"],
+        header["text_bytes"],
+    )
+
+    n_bytes = header["text_bytes"]
+    dtype = compute_dtype(precision)
+    dpa = DpaAccumulator(header["n_samples"], n_bytes, dtype)
+    cpa = CpaAccumulator(header["n_samples"], n_bytes, dtype)
+
+    start_time = time.perf_counter()
+    next_report = interval
+    report = None
+
+    def snapshot():
+        rate = dpa.n / max(time.perf_counter() - start_time, 1e-9)
+        result = {
+            "n_traces": dpa.n,
+            "dpa": _live_results(lambda b: dpa.diff(b).max(axis=1), n_bytes, key),
+            "cpa": _live_results(
+                lambda b: np.abs(cpa.corr(b)).max(axis=1), n_bytes, key
+            ),
+        }
+        _print_live_report(dpa.n, rate, result["dpa"], result["cpa"])
+        return result
+
+    try:
+        batch = max(1, min(max_batch, interval))
+        for traces, textin in read_records(f, header, batch):
+            dpa.update(traces, textin)
+            cpa.update(traces, textin)
+
+            if dpa.n >= next_report:
+                report = snapshot()
+                next_report = (dpa.n // interval + 1) * interval
+    finally:
+        f.close()
+
+    logger.info("Stream closed after %d traces", dpa.n)
+    if dpa.n == 0:
+        return report
+    if report is None or report["n_traces"] != dpa.n:
+        report = snapshot()
+
+    return report
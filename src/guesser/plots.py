@@ -1,12 +1,24 @@
 import os
 import numpy as np
-import matplotlib.pyplot as plt
 
+from src.utils.profiling import timed
 
+
+def get_pyplot():
+    # matplotlib costs more to import than the whole attack on small sets:
+    # only load it once a figure is actually drawn.
+    # pylint: disable=C0415
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+@timed("plot.diff_vector")
 def save_diff_vector_plot(
     best_guess, diff_vec, byte_index, outdir="plots/dpa/diff_vectors"
 ):
     os.makedirs(outdir, exist_ok=True)
+    plt = get_pyplot()
 
     x = np.arange(len(diff_vec))
     max_idx = int(np.argmax(diff_vec))
@@ -56,8 +68,10 @@ def save_diff_vector_plot(
     plt.close()
 
 
+@timed("plot.score_curve")
 def save_score_curve_plot(scores, byte_index=0, outdir="plots/dpa/score_curves"):
     os.makedirs(outdir, exist_ok=True)
+    plt = get_pyplot()
 
     best_guess = int(np.argmax(scores))
     best_score = scores[best_guess]
@@ -108,10 +122,12 @@ def save_score_curve_plot(scores, byte_index=0, outdir="plots/dpa/score_curves")
     plt.close()
 
 
+@timed("plot.corr_vector")
 def save_corr_vector_plot(
     best_guess, corr_vec, byte_index, outdir="plots/cpa/corr_vectors"
 ):
     os.makedirs(outdir, exist_ok=True)
+    plt = get_pyplot()
 
     x = np.arange(len(corr_vec))
     max_idx = int(np.argmax(np.abs(corr_vec)))
@@ -165,8 +181,10 @@ def save_corr_vector_plot(
     plt.close()
 
 
+@timed("plot.cpa_score_curve")
 def save_cpa_score_curve_plot(scores, byte_index=0, outdir="plots/cpa/score_curves"):
     os.makedirs(outdir, exist_ok=True)
+    plt = get_pyplot()
 
     best_guess = int(np.argmax(np.abs(scores)))
     best_score = float(scores[best_guess])
@@ -217,15 +235,17 @@ def save_cpa_score_curve_plot(scores, byte_index=0, outdir="plots/cpa/score_curv
     plt.close()
 
 
-def save_hw_plot(hw, outdir="plots/cpa/hamming_weight"):
+@timed("plot.leakage")
+def save_leakage_plot(leakage, model="hw", outdir="plots/cpa/leakage_model"):
     os.makedirs(outdir, exist_ok=True)
+    plt = get_pyplot()
 
     plt.figure(figsize=(10, 4))
-    plt.bar(range(256), hw, color="blue", alpha=0.7)
+    plt.bar(range(256), leakage, color="blue", alpha=0.7)
 
-    plt.title("Hamming Weight of Byte Values")
-    plt.xlabel("Byte Value (0x00 to 0xFF)")
-    plt.ylabel("Hamming Weight")
+    plt.title(f"Leakage model {model} of the S-box output")
+    plt.xlabel("S-box output value (0x00 to 0xFF)")
+    plt.ylabel("Leakage")
     plt.xticks(
         ticks=range(0, 256, 16),
         labels=[f"{i:#04x}" for i in range(0, 256, 16)],
@@ -234,15 +254,18 @@ def save_hw_plot(hw, outdir="plots/cpa/hamming_weight"):
     plt.grid(axis="y", alpha=0.3)
     plt.tight_layout()
 
-    filename = f"{outdir}/hamming_weight_plot.png"
+    name = os.path.splitext(os.path.basename(model))[0] if ":" in model else model
+    filename = f"{outdir}/{name}_plot.png"
     plt.savefig(filename, dpi=150)
     plt.close()
 
 
+@timed("plot.traces")
 def save_trace_plot(
     traces, trace_indices=None, zoom_range=(450, 800), outdir="plots/traces"
 ):
     os.makedirs(outdir, exist_ok=True)
+    plt = get_pyplot()
 
     if trace_indices is None:
         trace_indices = range(min(5, len(traces)))
@@ -295,3 +318,32 @@ def save_trace_plot(
     plt.tight_layout()
     plt.savefig(f"{outdir}/traces_plot.png", dpi=200)
     plt.close()
+
+
+@timed("plot.evaluation")
+def save_evaluation_plot(checkpoints, per_byte, full_key, title, ylabel, filename):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    plt = get_pyplot()
+
+    plt.figure(figsize=(12, 5))
+    for b in range(per_byte.shape[1]):
+        plt.plot(checkpoints, per_byte[:, b], linewidth=0.7, alpha=0.5)
+    plt.plot(
+        checkpoints,
+        per_byte.mean(axis=1),
+        color="black",
+        linewidth=1.5,
+        label="Mean byte",
+    )
+    plt.plot(checkpoints, full_key, color="red", linewidth=2.0, label="Full key")
+
+    plt.title(title)
+    plt.xlabel("Number of measurements")
+    plt.ylabel(ylabel)
+    plt.grid(True, alpha=0.3)
+    plt.legend()
+    plt.tight_layout()
+
+    plt.savefig(filename, dpi=150)
+    plt.close()
+    return filename
@@ -0,0 +1,48 @@
+import numpy as np
+
+from src.context.class_stats import compute_class_stats
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def nicv_from_class_stats(counts, sums, sumsq):
+    n = counts.sum()
+    mean = sums.sum(axis=0) / n
+    var = sumsq.sum(axis=0) / n - mean**2
+
+    present = counts > 0
+    class_means = sums[present] / counts[present, None]
+    between = counts[present] @ (class_means - mean) ** 2 / n
+
+    return np.divide(between, var, out=np.zeros_like(between), where=var > 0)
+
+
+def compute_nicv(traces, textin):
+    counts, sums, sumsq = compute_class_stats(traces, textin)
+
+    return np.array(
+        [
+            nicv_from_class_stats(counts[b], sums[b], sumsq[b])
+            for b in range(counts.shape[0])
+        ]
+    )
+
+
+def select_poi(nicv, top_k=None, threshold=None):
+    selected = np.zeros(nicv.shape[1], dtype=bool)
+
+    if top_k is not None:
+        top_k = min(top_k, nicv.shape[1])
+        top = np.argpartition(nicv, -top_k, axis=1)[:, -top_k:]
+        selected[top.ravel()] = True
+
+    if threshold is not None:
+        selected |= (nicv >= threshold).any(axis=0)
+
+    poi = np.flatnonzero(selected)
+    logger.info(
+        "Selected %d points of interest out of %d samples", poi.size, nicv.shape[1]
+    )
+
+    return poi
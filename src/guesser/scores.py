@@ -0,0 +1,28 @@
+import numpy as np
+
+
+def score_summary(scores) -> dict:
+    best_guess = int(np.argmax(scores))
+    best_score = float(scores[best_guess])
+
+    scores_copy = scores.copy()
+    scores_copy[best_guess] = -np.inf
+    second_guess = int(np.argmax(scores_copy))
+    second_score = float(scores[second_guess])
+
+    contrast = (best_score - second_score) / max(second_score, 1e-15)
+    confidence = min(max(contrast, 0.0), 1.0)
+
+    return {
+        "guess": hex(best_guess),
+        "confidence": confidence,
+        "best": best_score,
+        "second": second_score,
+        "second_guess": second_guess,
+        "scores": np.asarray(scores, dtype=np.float64),
+    }
+
+
+def key_rank(scores, key_byte) -> int:
+    # 1 when the correct key byte scores highest; ties count in its favour
+    return int(np.sum(scores > scores[key_byte])) + 1
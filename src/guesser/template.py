@@ -0,0 +1,253 @@
+import os
+import time
+
+import numpy as np
+
+from src.aes.leakage import leakage_table
+from src.context.shared import (
+    load_store,
+    store_rows,
+    store_sample_index,
+    store_samples,
+    store_slice,
+)
+from src.guesser.adaptive import adaptive_checkpoints
+from src.guesser.poi import compute_nicv
+from src.guesser.scores import key_rank, score_summary
+from src.utils.logger import get_logger
+from src.utils.profiling import timed
+
+logger = get_logger(__name__)
+
+
+def template_table(model="hw") -> np.ndarray:
+    # Class of the intermediate value, indexed as [plaintext_byte, key_guess]
+    table = leakage_table(model)
+    if not np.issubdtype(table.dtype, np.integer):
+        raise ValueError(f"Template classes need an integer leakage model, not {model}")
+
+    return table
+
+
+def select_template_poi(traces, textin, n_poi=10) -> np.ndarray:
+    # For a fixed key the intermediate value is a bijection of the plaintext
+    # byte: the plaintext-class NICV ranks the samples each template needs.
+    nicv = compute_nicv(traces, textin)
+    n_poi = min(n_poi, nicv.shape[1])
+    top = np.argpartition(nicv, -n_poi, axis=1)[:, -n_poi:]
+
+    return np.sort(top, axis=1)
+
+
+@timed("template.profile")
+def build_templates(
+    traces, textin, key, model="hw", n_poi=10, chunk_size=1024, ridge=1e-6
+) -> dict:
+    table = template_table(model)
+    n_classes = int(table.max()) + 1
+    n_bytes = textin.shape[1]
+
+    poi = select_template_poi(traces, textin, n_poi)
+    n_poi = poi.shape[1]
+
+    counts = np.zeros((n_bytes, n_classes))
+    sums = np.zeros((n_bytes, n_classes, n_poi))
+    scatter = np.zeros((n_bytes, n_poi, n_poi))
+    shift = None
+
+    classes = np.arange(n_classes)
+    for start in range(0, traces.shape[0], chunk_size):
+        chunk = np.asarray(traces[start : start + chunk_size], dtype=np.float64)
+        x = chunk[:, poi]  # (n, bytes, poi)
+
+        # Accumulating around the first chunk mean keeps the scatter sums
+        # well conditioned; the shift is added back to the means.
+        if shift is None:
+            shift = x.mean(axis=0)
+        x = x - shift
+
+        for b in range(n_bytes):
+            labels = table[textin[start : start + chunk_size, b], key[b]]
+            onehot = (labels[:, None] == classes).astype(np.float64)
+            counts[b] += onehot.sum(axis=0)
+            sums[b] += onehot.T @ x[:, b]
+            scatter[b] += x[:, b].T @ x[:, b]
+
+    missing = np.count_nonzero(counts == 0)
+    if missing:
+        logger.warning(
+            "%d (byte, class) pairs have no profiling trace: their templates "
+            "fall back to the byte mean",
+            missing,
+        )
+
+    n_traces = traces.shape[0]
+    means = np.divide(
+        sums, counts[:, :, None], out=np.zeros_like(sums), where=counts[:, :, None] > 0
+    )
+    means[counts == 0] = (sums.sum(axis=1) / n_traces)[np.nonzero(counts == 0)[0]]
+
+    # Pooled within-class covariance: one matrix shared by all classes, so
+    # that few traces per class still give a well-conditioned estimate.
+    between = np.einsum("bc,bci,bcj->bij", counts, means, means)
+    dof = np.maximum(n_traces - np.count_nonzero(counts, axis=1), 1)
+    cov = (scatter - between) / dof[:, None, None]
+    cov += (
+        ridge * np.trace(cov, axis1=1, axis2=2)[:, None, None] / n_poi * np.eye(n_poi)
+    )
+
+    logger.info(
+        "Templates (%s, %d classes) profiled on %d traces, %d POIs per byte",
+        model,
+        n_classes,
+        n_traces,
+        n_poi,
+    )
+
+    return {
+        "model": model,
+        "poi": poi,
+        "means": means + shift[:, None, :],
+        "inv_cov": np.linalg.inv(cov),
+        "counts": counts,
+        "n_traces": n_traces,
+    }
+
+
+def template_provenance(traces_store) -> dict:
+    # The POIs index the columns of the profiled store: record which trace
+    # samples these columns were, out of how many
+    columns = range(store_samples(traces_store))
+    return {
+        "samples": np.array([store_sample_index(traces_store, s) for s in columns]),
+        "trace_samples": traces_store["shape"][1],
+    }
+
+
+def check_provenance(templates: dict, traces_store):
+    expected = template_provenance(traces_store)
+    if "samples" not in templates:
+        raise ValueError("The templates do not record their samples: profile again")
+    if templates["trace_samples"] != expected["trace_samples"] or not np.array_equal(
+        templates["samples"], expected["samples"]
+    ):
+        raise ValueError(
+            f"The templates were profiled on samples {_describe(templates)}, the "
+            f"traces select {_describe(expected)}: use the same sample range, POI "
+            "and preprocessing options"
+        )
+
+
+def _describe(provenance):
+    samples = provenance["samples"]
+    return (
+        f"{samples.min()}..{samples.max()} ({samples.size} of "
+        f"{provenance['trace_samples']})"
+    )
+
+
+def save_templates(path: str, templates: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, **templates)
+
+
+def load_templates(path: str) -> dict:
+    with np.load(path) as data:
+        templates = {name: data[name] for name in data.files}
+
+    templates["model"] = str(templates["model"])
+    templates["n_traces"] = int(templates["n_traces"])
+    if "trace_samples" in templates:
+        templates["trace_samples"] = int(templates["trace_samples"])
+    return templates
+
+
+class TemplateAccumulator:
+    def __init__(self, templates):
+        self.n = 0
+        self.poi = templates["poi"]
+        self.table = template_table(templates["model"])
+
+        # Gaussian log-likelihood with the pooled covariance, up to a term in
+        # x alone that is the same for every guess:
+        #   x^T C^-1 mu_c - mu_c^T C^-1 mu_c / 2
+        means = templates["means"]
+        self.weights = np.einsum("bcj,bij->bci", means, templates["inv_cov"])
+        self.bias = -0.5 * np.einsum("bci,bci->bc", self.weights, means)
+        self.log_lik = np.zeros((self.poi.shape[0], 256))
+
+    @timed("template.update")
+    def update(self, traces, textin):
+        x = np.asarray(traces, dtype=np.float64)[:, self.poi]
+        self.n += x.shape[0]
+
+        for b in range(self.poi.shape[0]):
+            # (n x poi) @ (poi x classes): every trace against every class,
+            # then each guess picks its class per trace.
+            class_ll = x[:, b] @ self.weights[b].T + self.bias[b]
+            guess_ll = np.take_along_axis(class_ll, self.table[textin[:, b]], axis=1)
+            self.log_lik[b] += guess_ll.sum(axis=0)
+
+    def posteriors(self, byte_index):
+        ll = self.log_lik[byte_index] - self.log_lik[byte_index].max()
+        probs = np.exp(ll)
+        return probs / probs.sum()
+
+
+@timed("template.guesser")
+def template_guesser(
+    traces_store, textin_store, templates, key=None, initial=1, growth=1.25
+):
+    textin = load_store(textin_store)
+    n_traces = store_rows(traces_store)
+    if n_traces == 0:
+        raise ValueError("No trace left to match the templates against")
+    n_bytes = templates["poi"].shape[0]
+
+    acc = TemplateAccumulator(templates)
+    checkpoints = adaptive_checkpoints(n_traces, initial, growth)
+    ranked_first = np.zeros((len(checkpoints), n_bytes), dtype=bool)
+
+    start_time = time.perf_counter()
+    prev = 0
+    for i, stop in enumerate(checkpoints):
+        acc.update(load_store(store_slice(traces_store, prev, stop)), textin[prev:stop])
+        prev = stop
+
+        if key is not None:
+            for b in range(n_bytes):
+                ranked_first[i, b] = key_rank(acc.log_lik[b], key[b]) == 1
+    elapsed = time.perf_counter() - start_time
+
+    guesses = []
+    for b in range(n_bytes):
+        result = score_summary(acc.posteriors(b))
+        result["log_likelihood"] = acc.log_lik[b].copy()
+        result["poi"] = [store_sample_index(traces_store, s) for s in acc.poi[b]]
+        result["traces_to_disclosure"] = None
+        if key is not None:
+            # First trace count from which the key byte stays ranked first
+            lost = np.nonzero(~ranked_first[:, b])[0]
+            first = 0 if lost.size == 0 else lost[-1] + 1
+            if first < len(checkpoints):
+                result["traces_to_disclosure"] = checkpoints[first]
+        guesses.append(result)
+
+    return guesses, {"n_traces": n_traces, "elapsed": elapsed}
+
+
+def print_template_disclosure(guesses, report):
+    logger.raw("")
+    logger.raw("=== TEMPLATE TRACES TO DISCLOSURE ===")
+    logger.raw("Byte | Guess | Disclosed at | POI")
+    logger.raw("-----+-------+--------------+-----")
+    for b, r in enumerate(guesses):
+        ttd = r["traces_to_disclosure"]
+        ttd = "-" if ttd is None else ttd
+        poi = ", ".join(str(s) for s in r["poi"])
+        logger.raw(f"{b:>4} |  0x{int(r['guess'], 16):02x} | {ttd:>12} | {poi}")
+
+    logger.raw(
+        f"Matched {report['n_traces']} traces in {report['elapsed']:.3f}s "
+        f"({report['n_traces'] / max(report['elapsed'], 1e-9):.0f} traces/s)"
+    )
@@ -1,11 +1,15 @@
 import os
 import numpy as np
 
+from src.context.container import container_stores, is_container
+from src.context.shared import load_store, open_npy_store
 from src.utils.logger import get_logger
+from src.utils.profiling import timed
 
 logger = get_logger(__name__)
 
 
+@timed("load.np_load")
 def _load_numpy(file_path: str) -> np.ndarray:
     if not os.path.exists(file_path):
         logger.critical("File not found: %s", file_path)
@@ -19,8 +23,55 @@ def _load_numpy(file_path: str) -> np.ndarray:
 
 
 def load_traces(file_path: str) -> np.ndarray:
+    if is_container(file_path):
+        return np.array(load_store(open_traces_store(file_path)))
     return _load_numpy(file_path)
 
 
 def load_textin(file_path: str) -> np.ndarray:
+    if is_container(file_path):
+        return np.array(load_store(open_textin_store(file_path)))
     return _load_numpy(file_path)
+
+
+@timed("load.open_store")
+def _open_numpy_store(file_path: str) -> dict:
+    if not os.path.exists(file_path):
+        logger.critical("File not found: %s", file_path)
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    try:
+        return open_npy_store(file_path)
+    except Exception:
+        logger.exception("Failed to map numpy file: %s", file_path)
+        raise
+
+
+@timed("load.open_store")
+def _open_container_store(file_path: str, stream: str) -> dict:
+    try:
+        store = container_stores(file_path)[stream]
+    except Exception:
+        logger.exception("Failed to open trace container: %s", file_path)
+        raise
+
+    if store is None:
+        raise ValueError(f"Container has no {stream} stream: {file_path}")
+
+    return store
+
+
+def open_traces_store(file_path: str) -> dict:
+    if is_container(file_path):
+        return _open_container_store(file_path, "traces")
+    return _open_numpy_store(file_path)
+
+
+def open_textin_store(file_path: str) -> dict:
+    if is_container(file_path):
+        return _open_container_store(file_path, "textin")
+    return _open_numpy_store(file_path)
+
+
+def open_textout_store(file_path: str) -> dict:
+    return _open_container_store(file_path, "textout")
@@ -2,9 +2,6 @@ from __future__ import annotations
 
 import logging
 from typing import Optional
-from colorama import Fore, Style, init
-
-init(autoreset=True)
 
 logging.getLogger("matplotlib").setLevel(logging.ERROR)
 logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
@@ -12,19 +9,29 @@ logging.getLogger("matplotlib.font_manager").setLevel(logging.ERROR)
 DEFAULT_FORMAT = "[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s"
 DEFAULT_DATEFMT = "%Y-%m-%dT%H:%M:%SZ"
 
-LOG_COLORS = {
-    logging.DEBUG: Fore.BLUE,
-    logging.INFO: Fore.GREEN,
-    logging.WARNING: Fore.YELLOW,
-    logging.ERROR: Fore.RED,
-    logging.CRITICAL: Fore.MAGENTA + Style.BRIGHT,
-}
-
 
 class ColoredFormatter(logging.Formatter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # colorama is only needed once a handler is installed
+        # pylint: disable=C0415
+        from colorama import Fore, Style, init
+
+        init(autoreset=True)
+
+        self.log_colors = {
+            logging.DEBUG: Fore.BLUE,
+            logging.INFO: Fore.GREEN,
+            logging.WARNING: Fore.YELLOW,
+            logging.ERROR: Fore.RED,
+            logging.CRITICAL: Fore.MAGENTA + Style.BRIGHT,
+        }
+        self.reset = Style.RESET_ALL
+
     def format(self, record: logging.LogRecord) -> str:
-        log_color = LOG_COLORS.get(record.levelno, "")
-        record.levelname = f"{log_color}{record.levelname}{Style.RESET_ALL}"
+        log_color = self.log_colors.get(record.levelno, "")
+        record.levelname = f"{log_color}{record.levelname}{self.reset}"
         return super().format(record)
 
 
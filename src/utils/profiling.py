@@ -0,0 +1,115 @@
+import cProfile
+import json
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+_TIMINGS = {}
+_COUNTERS = {}
+
+
+@contextmanager
+def timer(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds, calls = _TIMINGS.get(stage, (0.0, 0))
+        _TIMINGS[stage] = (seconds + time.perf_counter() - start, calls + 1)
+
+
+def timed(stage: str):
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name: str, value=1):
+    _COUNTERS[name] = _COUNTERS.get(name, 0) + value
+
+
+def drain_profile() -> dict:
+    profile = {
+        "timings": {
+            stage: {"seconds": seconds, "calls": calls}
+            for stage, (seconds, calls) in _TIMINGS.items()
+        },
+        "counters": dict(_COUNTERS),
+    }
+    _TIMINGS.clear()
+    _COUNTERS.clear()
+
+    return profile
+
+
+def absorb_profile(profile):
+    if not profile:
+        return
+
+    for stage, t in profile["timings"].items():
+        seconds, calls = _TIMINGS.get(stage, (0.0, 0))
+        _TIMINGS[stage] = (seconds + t["seconds"], calls + t["calls"])
+
+    for name, value in profile["counters"].items():
+        count(name, value)
+
+
+@contextmanager
+def cprofiled(path=None):
+    if path is None:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def profiled_worker(stage: str):
+    # Worker timings live in the worker process: ship them back with the result
+    # so the parent can absorb them into its own report.
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, cprofile_path=None, **kwargs):
+            with cprofiled(cprofile_path), timer(stage):
+                result = fn(*args, **kwargs)
+
+            result["profile"] = drain_profile()
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def format_profile(profile) -> list[str]:
+    lines = [
+        "Stage                              |    Seconds |   Calls",
+        "-----------------------------------+------------+--------",
+    ]
+
+    timings = sorted(
+        profile["timings"].items(), key=lambda kv: kv[1]["seconds"], reverse=True
+    )
+    for stage, t in timings:
+        lines.append(f"{stage:<34} | {t['seconds']:>10.3f} | {t['calls']:>7}")
+
+    for name, value in sorted(profile["counters"].items()):
+        lines.append(f"{name:<34} | {value:>10} |")
+
+    return lines
+
+
+def write_profile(profile, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
@@ -1,5 +1,5 @@
-from tqdm import tqdm
-
-
 def progress_bar(iterable, total=None, desc="Processing"):
+    # pylint: disable=C0415
+    from tqdm import tqdm
+
     return tqdm(iterable, total=total, desc=desc, ncols=100, leave=False)
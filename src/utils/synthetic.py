@@ -0,0 +1,91 @@
+import numpy as np
+
+from src.aes.contants import KEY
+from src.aes.tables import HW, SBOX_OUT
+
+LEAKAGE_MODELS = ("hw", "hd", "masked")
+
+
+def leak_spacing(n_samples, model="hw"):
+    # Masked leakage needs room for the mask between two bytes' leaks
+    return max(2 if model == "masked" else 1, n_samples // 100)
+
+
+def leak_positions(n_samples, n_bytes=16, model="hw"):
+    start = n_samples // 10
+    spacing = leak_spacing(n_samples, model)
+
+    return np.minimum(start + spacing * np.arange(n_bytes), n_samples - 1)
+
+
+def generate_synthetic_traces(
+    n_traces,
+    n_samples,
+    key=KEY,
+    model="hw",
+    noise=2.0,
+    amplitude=1.0,
+    jitter=0,
+    dtype=np.float32,
+    rng=None,
+    seed=0,
+):
+    if model not in LEAKAGE_MODELS:
+        raise ValueError(f"Unknown leakage model: {model}")
+
+    rng = np.random.default_rng(seed) if rng is None else rng
+
+    textin = rng.integers(0, 256, size=(n_traces, len(key)), dtype=np.uint8)
+    traces = rng.normal(0.0, noise, size=(n_traces, n_samples)).astype(dtype)
+
+    shifts = np.zeros(n_traces, dtype=np.int64)
+    if jitter:
+        shifts = rng.integers(-jitter, jitter + 1, size=n_traces)
+
+    rows = np.arange(n_traces)
+    # The mask leaks halfway to the next byte's leak: at least one sample
+    # away from the masked value and before the next byte.
+    offset = leak_spacing(n_samples, model) // 2
+    for b, pos in enumerate(leak_positions(n_samples, len(key), model)):
+        value = SBOX_OUT[textin[:, b], key[b]]
+        if model == "hd":
+            value = value ^ textin[:, b]
+        elif model == "masked":
+            # Boolean masking: the mask and the masked S-box output leak at two
+            # different samples, neither of them correlated with the key alone.
+            mask = rng.integers(0, 256, size=n_traces, dtype=np.uint8)
+            value = value ^ mask
+            cols = np.clip(pos + offset + shifts, 0, n_samples - 1)
+            traces[rows, cols] += (amplitude * HW[mask]).astype(dtype)
+
+        cols = np.clip(pos + shifts, 0, n_samples - 1)
+        traces[rows, cols] += (amplitude * HW[value]).astype(dtype)
+
+    return traces, textin
+
+
+def write_synthetic_dataset(
+    traces_path, textin_path, n_traces, n_samples, chunk_size=10000, seed=0, **kwargs
+):
+    rng = np.random.default_rng(seed)
+    dtype = kwargs.pop("dtype", np.float32)
+    n_bytes = len(kwargs.get("key", KEY))
+
+    traces = np.lib.format.open_memmap(
+        traces_path, mode="w+", dtype=dtype, shape=(n_traces, n_samples)
+    )
+    textin = np.lib.format.open_memmap(
+        textin_path, mode="w+", dtype=np.uint8, shape=(n_traces, n_bytes)
+    )
+
+    for start in range(0, n_traces, chunk_size):
+        stop = min(start + chunk_size, n_traces)
+        traces[start:stop], textin[start:stop] = generate_synthetic_traces(
+            stop - start, n_samples, dtype=dtype, rng=rng, **kwargs
+        )
+
+    traces.flush()
+    textin.flush()
+    del traces, textin
+
+    return traces_path, textin_path
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.aes.contants import KEY
+from src.context.shared import open_npy_store
+from src.guesser.adaptive import adaptive_checkpoints, adaptive_guesser
+from src.guesser.cpa_stream import CpaAccumulator
+from src.guesser.dpa_stream import DpaAccumulator
+from src.utils.synthetic import write_synthetic_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("adaptive")
+    traces_path, textin_path = write_synthetic_dataset(
+        str(workdir / "traces.npy"), str(workdir / "textin.npy"), 1000, 100, noise=1.0
+    )
+    return open_npy_store(traces_path), open_npy_store(textin_path)
+
+
+def test_checkpoints():
+    assert adaptive_checkpoints(100, 10, 2) == [10, 20, 40, 80, 100]
+    assert adaptive_checkpoints(5, 10, 2) == [5]
+    # Each step adds at least one trace
+    assert adaptive_checkpoints(4, 1, 1.1) == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("initial, growth", [(0, 1.5), (-3, 1.5), (10, 1), (10, 0.5)])
+def test_checkpoints_reject_bad_schedules(initial, growth):
+    with pytest.raises(ValueError):
+        adaptive_checkpoints(100, initial, growth)
+
+
+@pytest.mark.parametrize("attack", ["dpa", "cpa"])
+def test_stops_early_on_the_key(dataset, attack):
+    traces_store, textin_store = dataset
+    guesses, report = adaptive_guesser(
+        traces_store, textin_store, attack, initial=50, growth=1.5, patience=2
+    )
+
+    assert [int(r["guess"], 16) for r in guesses] == list(KEY)
+    assert report["byte_traces"] < report["full_byte_traces"]
+    for r in guesses:
+        assert r["traces_to_disclosure"] <= r["stopped_at"]
+
+
+def test_rejects_zero_patience(dataset):
+    traces_store, textin_store = dataset
+    with pytest.raises(ValueError):
+        adaptive_guesser(traces_store, textin_store, patience=0)
+
+
+def test_accumulators_skip_empty_chunks():
+    for accumulator in (CpaAccumulator, DpaAccumulator):
+        acc = accumulator(100)
+        acc.update(np.zeros((0, 100)), np.zeros((0, 16), dtype=np.uint8))
+        assert acc.n == 0
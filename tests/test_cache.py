@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+
+from src.context.cache import cache_load, cache_save, score_cache, score_key
+from src.context.shared import save_array_to_mmap
+
+
+def _entry(cache, key):
+    return os.path.join(cache["dir"], f"{key}.npy")
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    matrix = np.zeros((256, 64))
+    size = matrix.nbytes + 128
+    cache = score_cache(str(tmp_path), max_mb=3.5 * size / 2**20)
+
+    for age, key in enumerate(["a", "b", "c"]):
+        cache_save(cache, key, matrix)
+        os.utime(_entry(cache, key), (1000 + age, 1000 + age))
+
+    # Reading "a" makes it the most recently used entry
+    assert cache_load(cache, "a") is not None
+    cache_save(cache, "d", matrix)
+
+    assert sorted(os.listdir(tmp_path)) == ["a.npy", "c.npy", "d.npy"]
+    assert cache_load(cache, "b") is None
+
+    cache_save(cache, "e", matrix)
+    assert sorted(os.listdir(tmp_path)) == ["a.npy", "d.npy", "e.npy"]
+
+
+def test_score_key_follows_the_store_files(tmp_path):
+    traces_store = save_array_to_mmap(np.zeros((10, 4)), str(tmp_path / "traces.dat"))
+    textin_store = save_array_to_mmap(
+        np.zeros((10, 16), dtype=np.uint8), str(tmp_path / "textin.dat")
+    )
+    key = score_key("cpa", traces_store, textin_store, 0, "float64")
+    assert score_key("cpa", traces_store, textin_store, 0, "float64") == key
+
+    # New content under the same path changes the fingerprint
+    save_array_to_mmap(np.ones((12, 4)), str(tmp_path / "traces.dat"))
+    assert score_key("cpa", traces_store, textin_store, 0, "float64") != key
+
+    assert score_key("cpa", traces_store, textin_store, 1, "float64") != key
+    assert score_key("dpa", traces_store, textin_store, 0, "float64") != key
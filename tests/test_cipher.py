@@ -0,0 +1,30 @@
+import numpy as np
+
+from src.aes.cipher import aes128_encrypt, expand_keys, matching_keys
+
+# FIPS-197 appendix B
+PLAINTEXT = np.frombuffer(bytes.fromhex("3243f6a8885a308d313198a2e0370734"), np.uint8)
+KEY = np.frombuffer(bytes.fromhex("2b7e151628aed2a6abf7158809cf4f3c"), np.uint8)
+CIPHERTEXT = np.frombuffer(bytes.fromhex("3925841d02dc09fbdc118597196a0b32"), np.uint8)
+
+
+def test_fips197_vector():
+    assert aes128_encrypt(PLAINTEXT, KEY).tobytes() == CIPHERTEXT.tobytes()
+
+
+def test_fips197_last_round_key():
+    # FIPS-197 appendix A.1: w[40..43]
+    assert expand_keys(KEY)[10, :, 0].tolist() == [
+        0xD014F9A8,
+        0xC9EE2589,
+        0xE13F0CC8,
+        0xB6630CA6,
+    ]
+
+
+def test_matching_keys_finds_the_key_in_a_batch():
+    rng = np.random.default_rng(0)
+    keys = rng.integers(0, 256, size=(100, 16), dtype=np.uint8)
+    keys[42] = KEY
+
+    assert matching_keys(keys, PLAINTEXT, CIPHERTEXT).tolist() == [42]
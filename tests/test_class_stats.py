@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+
+from src.context.class_stats import build_class_stats, load_class_stats
+from src.context.shared import open_npy_store, store_slice
+
+
+def _stores(tmp_path):
+    rng = np.random.default_rng(0)
+    np.save(tmp_path / "traces.npy", rng.normal(size=(50, 8)).astype(np.float32))
+    np.save(tmp_path / "textin.npy", rng.integers(0, 256, (50, 16), dtype=np.uint8))
+    return (
+        open_npy_store(str(tmp_path / "traces.npy")),
+        open_npy_store(str(tmp_path / "textin.npy")),
+    )
+
+
+def test_statistics_are_reused_per_source(tmp_path):
+    traces_store, textin_store = _stores(tmp_path)
+    directory = str(tmp_path / "stats")
+
+    first = build_class_stats(traces_store, textin_store, directory)
+    mtime = os.stat(first["sums"]["path"]).st_mtime_ns
+    again = build_class_stats(traces_store, textin_store, directory)
+    assert again == first
+    assert os.stat(again["sums"]["path"]).st_mtime_ns == mtime
+
+    # Another trace range gets its own files
+    half = build_class_stats(
+        store_slice(traces_store, 0, 25), store_slice(textin_store, 0, 25), directory
+    )
+    assert half["sums"]["path"] != first["sums"]["path"]
+    counts, _, _ = load_class_stats(half, 3)
+    assert counts.sum() == 25
+    assert len(os.listdir(directory)) == 2
@@ -0,0 +1,42 @@
+import numpy as np
+
+from src.context.container import append_traces, container_stores, convert_npy_pair
+from src.context.shared import load_store, store_columns, store_slice
+
+
+def _container(tmp_path, sample_major):
+    traces = np.arange(60, dtype=np.float32).reshape(6, 10)
+    textin = np.zeros((6, 16), dtype=np.uint8)
+    np.save(tmp_path / "traces.npy", traces)
+    np.save(tmp_path / "textin.npy", textin)
+
+    path = str(tmp_path / "capture")
+    convert_npy_pair(
+        str(tmp_path / "traces.npy"),
+        str(tmp_path / "textin.npy"),
+        path,
+        sample_major=sample_major,
+    )
+    return traces, textin, path
+
+
+def test_column_selections_read_the_sample_major_copy(tmp_path):
+    traces, _, path = _container(tmp_path, sample_major=True)
+    store = container_stores(path)["traces"]
+    assert store["transposed"]["path"].endswith("traces_sample_major.bin")
+
+    picked = store_slice(store_columns(store, [7, 2, 3]), 1, 5)
+    assert np.array_equal(load_store(picked), traces[1:5][:, [7, 2, 3]])
+    assert np.array_equal(load_store(store), traces)
+
+
+def test_appending_drops_the_sample_major_copy(tmp_path):
+    traces, textin, path = _container(tmp_path, sample_major=True)
+    append_traces(path, traces[:2], textin[:2])
+
+    store = container_stores(path)["traces"]
+    assert "transposed" not in store
+    assert np.array_equal(
+        load_store(store_columns(store, [1, 4])),
+        np.concatenate([traces, traces[:2]])[:, [1, 4]],
+    )
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from src.guesser.convergence import cpa_convergence_scores, dpa_convergence_scores
+
+
+@pytest.mark.parametrize("scores_fn", [dpa_convergence_scores, cpa_convergence_scores])
+@pytest.mark.parametrize("checkpoints", [[], [0, 10], [10, 10], [20, 10], [10, 41]])
+def test_invalid_checkpoints(scores_fn, checkpoints):
+    traces = np.zeros((40, 8))
+    textin = np.zeros((40, 16), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        scores_fn(traces, textin, 0, checkpoints)
+
+
+@pytest.mark.parametrize("scores_fn", [dpa_convergence_scores, cpa_convergence_scores])
+def test_last_checkpoint_matches_all_traces(scores_fn):
+    rng = np.random.default_rng(0)
+    traces = rng.normal(size=(40, 8))
+    textin = rng.integers(0, 256, size=(40, 16), dtype=np.uint8)
+
+    scores = scores_fn(traces, textin, 3, [10, 25, 40])
+    assert np.allclose(scores[:, -1], scores_fn(traces, textin, 3, [40])[:, 0])
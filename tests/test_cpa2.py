@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from src.aes.contants import KEY
+from src.aes.leakage import leakage_hypotheses
+from src.context.shared import open_npy_store, save_array_to_mmap
+from src.guesser.cpa import normalise_columns
+from src.guesser.cpa2 import combine_pairs, cpa2_guesser, pair_block_size
+from src.utils.synthetic import leak_positions, write_synthetic_dataset
+
+
+@pytest.fixture(scope="module")
+def masked(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("cpa2")
+    traces_path, textin_path = write_synthetic_dataset(
+        str(workdir / "traces.npy"),
+        str(workdir / "textin.npy"),
+        3000,
+        60,
+        model="masked",
+        noise=0.5,
+    )
+    return open_npy_store(traces_path), open_npy_store(textin_path)
+
+
+def test_combine_pairs_diagonal():
+    x = np.arange(6, dtype=np.float64).reshape(2, 3)
+    pairs = combine_pairs(x, x, "product", diagonal=True)
+
+    assert np.array_equal(pairs, [[0, 0, 2], [12, 15, 20]])
+
+
+def test_block_size_fits_the_budget():
+    n_traces, itemsize, max_mb = 5000, 8, 64
+    block = pair_block_size(n_traces, 5000, itemsize, max_mb)
+    per_pair = (2 * n_traces + 258) * itemsize + 288
+
+    assert 256 * n_traces * itemsize + block**2 * per_pair <= max_mb * 2**20
+
+
+def test_masked_key_and_top_guesses(masked):
+    traces_store, textin_store = masked
+    guesses = cpa2_guesser(traces_store, textin_store, top_k=3, max_mb=16)
+    positions = leak_positions(60, model="masked")
+
+    assert [int(r["guess"], 16) for r in guesses] == list(KEY)
+    for b, result in enumerate(guesses):
+        corr, guess, pair = result["top"][0]
+        assert guess == KEY[b] and corr == pytest.approx(result["best"])
+        assert positions[b] in pair
+        assert len(result["top"]) == 3
+
+
+def test_top_k_must_be_in_range(masked):
+    with pytest.raises(ValueError):
+        cpa2_guesser(*masked, top_k=0)
+    with pytest.raises(ValueError):
+        cpa2_guesser(*masked, top_k=257)
+
+
+def test_top_entries_match_brute_force(tmp_path):
+    rng = np.random.default_rng(3)
+    traces = rng.normal(size=(200, 8))
+    textin = rng.integers(0, 256, size=(200, 1), dtype=np.uint8)
+    traces_store = save_array_to_mmap(traces, str(tmp_path / "traces.dat"))
+    textin_store = save_array_to_mmap(textin, str(tmp_path / "textin.dat"))
+
+    # A tiny budget forces one-sample tiles, so the top-k spans many tiles
+    result = cpa2_guesser(traces_store, textin_store, top_k=20, max_mb=0.4)[0]
+
+    x = traces - traces.mean(axis=0)
+    ii, jj = np.triu_indices(8, 1)
+    pairs = normalise_columns(x[:, ii] * x[:, jj])
+    hyp = normalise_columns(leakage_hypotheses(textin, 0, "hw").astype(np.float64))
+    corr = np.abs(hyp.T @ pairs)
+    order = np.argsort(-corr, axis=None, kind="stable")[:20]
+    guesses, cols = np.unravel_index(order, corr.shape)
+
+    assert [c for c, _, _ in result["top"]] == pytest.approx(corr.flat[order])
+    assert [(g, p) for _, g, p in result["top"]] == [
+        (int(g), (int(ii[c]), int(jj[c]))) for g, c in zip(guesses, cols)
+    ]
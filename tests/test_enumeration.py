@@ -0,0 +1,56 @@
+import itertools
+
+import numpy as np
+
+from src.guesser.enumeration import (
+    _histograms,
+    _pair_log_probs,
+    estimate_key_rank,
+    histogram_enumerate,
+)
+
+
+def _log_probs(n_bytes, seed=0):
+    rng = np.random.default_rng(seed)
+    scores = rng.gamma(0.5, size=(n_bytes, 256))
+    return np.log(scores / scores.sum(axis=1, keepdims=True))
+
+
+def test_key_rank_matches_brute_force():
+    log_probs = _log_probs(2)
+    key = (0x12, 0x34)
+    key_lp = log_probs[0, key[0]] + log_probs[1, key[1]]
+    all_lp = log_probs[0][:, None] + log_probs[1][None, :]
+    true_rank = int(np.count_nonzero(all_lp > key_lp)) + 1
+
+    rank = estimate_key_rank(log_probs, key, nbins=4096)
+    assert rank["lower"] <= true_rank <= rank["upper"]
+    assert abs(np.log2(rank["rank"]) - np.log2(true_rank)) < 0.5
+
+
+def test_enumeration_order():
+    log_probs = _log_probs(4)
+    keys = np.concatenate(list(histogram_enumerate(log_probs, 300_000, batch=4096)))
+    assert keys.shape == (300_000, 4)
+    assert len({k.tobytes() for k in keys}) == keys.shape[0]
+
+    # Keys come out bin by bin of the convolved histogram: their bin totals
+    # never increase, so their log-probabilities only rise by rounding
+    bins, _, _ = _histograms(_pair_log_probs(log_probs), 256)
+    pairs = keys[:, 0::2].astype(np.int64) << 8 | keys[:, 1::2]
+    totals = bins[np.arange(2), pairs].sum(axis=1)
+    assert np.all(np.diff(totals) <= 0)
+
+    key_lp = log_probs[np.arange(4), keys].sum(axis=1)
+    assert key_lp[0] == log_probs.max(axis=1).sum()
+    width = (_pair_log_probs(log_probs).max() - _pair_log_probs(log_probs).min()) / 255
+    assert np.all(np.diff(key_lp) <= 2 * width)
+
+
+def test_enumeration_covers_every_key():
+    log_probs = _log_probs(2)
+    keys = np.concatenate(list(histogram_enumerate(log_probs, 1 << 20)))
+    assert keys.shape[0] == 65536
+    assert {k.tobytes() for k in keys} == {
+        bytes(k) for k in itertools.product(range(256), repeat=2)
+    }
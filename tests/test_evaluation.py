@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from src.aes.contants import KEY
+from src.context.pool import create_worker_pool
+from src.context.shared import load_store, open_npy_store
+from src.guesser.cpa import cpa_corr_matrix
+from src.guesser.dpa import dpa_diff_matrix
+from src.guesser.evaluation import evaluate_attack
+from src.utils.synthetic import write_synthetic_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("evaluation")
+    traces_path, textin_path = write_synthetic_dataset(
+        str(workdir / "traces.npy"), str(workdir / "textin.npy"), 300, 40, noise=4.0
+    )
+    return open_npy_store(traces_path), open_npy_store(textin_path)
+
+
+def _direct_ranks(attack, traces, textin, experiments, checkpoints, seed):
+    # Every resampled subset attacked from scratch
+    ranks = np.zeros((experiments, len(checkpoints), 16))
+    for e in range(experiments):
+        order = np.random.default_rng([seed, e]).permutation(traces.shape[0])
+        for c, stop in enumerate(checkpoints):
+            rows = order[:stop]
+            for b in range(16):
+                if attack == "cpa":
+                    matrix = np.abs(cpa_corr_matrix(traces[rows], textin[rows], b))
+                else:
+                    matrix = dpa_diff_matrix(traces[rows], textin[rows], b)
+                scores = matrix.max(axis=1)
+                ranks[e, c, b] = np.sum(scores > scores[KEY[b]]) + 1
+
+    return ranks
+
+
+@pytest.mark.parametrize("attack", ["cpa", "dpa"])
+def test_matches_direct_attacks(dataset, attack):
+    traces_store, textin_store = dataset
+    checkpoints = [20, 60, 150]
+
+    with create_worker_pool() as pool:
+        summary = evaluate_attack(
+            traces_store,
+            textin_store,
+            checkpoints,
+            KEY,
+            attack=attack,
+            n_experiments=4,
+            seed=3,
+            executor=pool,
+        )
+
+    ranks = _direct_ranks(
+        attack,
+        np.asarray(load_store(traces_store), dtype=np.float64),
+        load_store(textin_store),
+        4,
+        checkpoints,
+        seed=3,
+    )
+    assert np.array_equal(summary["byte_ranks"], ranks)
+    assert np.allclose(summary["success_rate"], np.mean(ranks == 1, axis=0))
+    assert np.allclose(summary["guessing_entropy"], np.mean(np.log2(ranks), axis=0))
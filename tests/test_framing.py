@@ -0,0 +1,60 @@
+import io
+
+import numpy as np
+import pytest
+
+from src.context.framing import (
+    open_sink,
+    open_source,
+    pack_records,
+    pack_stream_header,
+    read_records,
+    read_stream_header,
+)
+
+
+def _stream(n_traces=10, n_samples=7, dtype=np.int16):
+    rng = np.random.default_rng(0)
+    traces = rng.integers(-1000, 1000, size=(n_traces, n_samples)).astype(dtype)
+    textin = rng.integers(0, 256, size=(n_traces, 16), dtype=np.uint8)
+    data = pack_stream_header(n_samples, dtype) + pack_records(traces, textin, dtype)
+    return data, traces, textin
+
+
+def test_header_and_records_round_trip(tmp_path):
+    data, traces, textin = _stream()
+    path = str(tmp_path / "stream.bin")
+    with open_sink(path) as f:
+        f.write(data)
+
+    with open_source(path) as f:
+        header = read_stream_header(f)
+        batches = list(read_records(f, header, max_records=4))
+
+    assert (header["n_samples"], header["text_bytes"]) == (7, 16)
+    assert header["dtype"] == np.int16
+    assert [t.shape[0] for t, _ in batches] == [4, 4, 2]
+    assert np.array_equal(np.concatenate([t for t, _ in batches]), traces)
+    assert np.array_equal(np.concatenate([p for _, p in batches]), textin)
+
+
+def test_rejects_other_streams():
+    data, _, _ = _stream()
+    with pytest.raises(ValueError, match="magic"):
+        read_stream_header(io.BytesIO(b"NOPE" + data[4:]))
+
+    version = (2).to_bytes(2, "little")
+    with pytest.raises(ValueError, match="version"):
+        read_stream_header(io.BytesIO(data[:4] + version + data[6:]))
+
+    with pytest.raises(EOFError):
+        read_stream_header(io.BytesIO(data[:6]))
+
+
+def test_truncated_record_raises():
+    data, _, _ = _stream()
+    f = io.BytesIO(data[:-3])
+    header = read_stream_header(f)
+
+    with pytest.raises(EOFError, match="inside a record"):
+        list(read_records(f, header))
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from src.aes.leakage import LEAKAGE_TABLES, leakage_hypotheses, leakage_table
+from src.aes.tables import HW, SBOX_OUT
+
+
+def test_hd_table():
+    assert np.array_equal(LEAKAGE_TABLES["hd"][0x00], HW[SBOX_OUT[0x00]])
+    for v in range(256):
+        assert LEAKAGE_TABLES["hd"][v, 0x5A] == bin(SBOX_OUT[v, 0x5A] ^ v).count("1")
+
+
+def test_custom_table(tmp_path):
+    values = np.arange(256, dtype=np.float64)[::-1]
+    np.save(tmp_path / "table.npy", values)
+    (tmp_path / "table.txt").write_text(",".join(str(v) for v in values))
+
+    for name in ("table.npy", "table.txt"):
+        table = leakage_table(f"table:{tmp_path / name}")
+        assert np.array_equal(table, values[SBOX_OUT])
+
+
+def test_invalid_tables(tmp_path):
+    np.save(tmp_path / "short.npy", np.zeros(10))
+
+    with pytest.raises(ValueError):
+        leakage_table("table:" + str(tmp_path / "short.npy"))
+    with pytest.raises(FileNotFoundError):
+        leakage_table("table:" + str(tmp_path / "missing.npy"))
+    with pytest.raises(ValueError):
+        leakage_table("hw2")
+
+
+def test_hypotheses():
+    textin = np.array([[0x12, 0x34]], dtype=np.uint8)
+    assert np.array_equal(
+        leakage_hypotheses(textin, 1, "bit3"), LEAKAGE_TABLES["bit3"][[0x34]]
+    )
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.aes.contants import KEY
+from src.context.framing import pack_records, pack_stream_header
+from src.context.shared import load_store, open_npy_store
+from src.guesser import live
+from src.guesser.cpa import cpa_corr_matrix
+from src.guesser.dpa import dpa_diff_matrix
+from src.guesser.scores import key_rank, score_summary
+from src.utils.synthetic import write_synthetic_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("live")
+    traces_path, textin_path = write_synthetic_dataset(
+        str(workdir / "traces.npy"), str(workdir / "textin.npy"), 300, 40, noise=2.0
+    )
+    traces = load_store(open_npy_store(traces_path))
+    textin = load_store(open_npy_store(textin_path))
+    stream = workdir / "stream.bin"
+    stream.write_bytes(
+        pack_stream_header(40, traces.dtype)
+        + pack_records(traces, textin, traces.dtype)
+    )
+    return str(stream), np.asarray(traces), np.asarray(textin)
+
+
+def _batch(traces, textin):
+    # Every byte attacked at once on the same traces
+    results = {"dpa": [], "cpa": []}
+    for b in range(16):
+        for attack, scores in (
+            ("dpa", dpa_diff_matrix(traces, textin, b).max(axis=1)),
+            ("cpa", np.abs(cpa_corr_matrix(traces, textin, b)).max(axis=1)),
+        ):
+            result = score_summary(scores)
+            result["rank"] = key_rank(scores, KEY[b])
+            results[attack].append(result)
+
+    return results
+
+
+def test_periodic_reports_match_a_batch_attack(dataset, monkeypatch):
+    stream, traces, textin = dataset
+    reports = []
+    monkeypatch.setattr(
+        live,
+        "_print_live_report",
+        lambda n_traces, rate, dpa, cpa: reports.append((n_traces, dpa, cpa)),
+    )
+
+    final = live.live_attack(stream, interval=200, max_batch=50, key=KEY)
+
+    assert [n for n, _, _ in reports] == [200, 300]
+    assert final["n_traces"] == 300
+    for n, dpa, cpa in reports:
+        expected = _batch(traces[:n], textin[:n])
+        for attack, results in (("dpa", dpa), ("cpa", cpa)):
+            for result, batch in zip(results, expected[attack]):
+                assert result["guess"] == batch["guess"]
+                assert result["rank"] == batch["rank"]
+                assert result["confidence"] == pytest.approx(batch["confidence"])
@@ -0,0 +1,58 @@
+import sys
+
+import pytest
+
+from src.config.cli import parse_cli_args
+from src.config.loader import merge_config
+
+
+def _settings(monkeypatch, *argv, cfg_file=None):
+    monkeypatch.setattr(sys, "argv", ["main.py", *argv])
+    return merge_config(parse_cli_args(), cfg_file or {})
+
+
+def test_defaults(monkeypatch):
+    settings = _settings(monkeypatch)
+    assert settings.chunk_size == 1024
+    assert settings.cache is True
+
+
+def test_no_cache_overrides_the_config_file(monkeypatch):
+    assert _settings(monkeypatch, "--no-cache").cache is False
+    settings = _settings(monkeypatch, "--cache", cfg_file={"cache": {"enabled": False}})
+    assert settings.cache is True
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--chunk-size", "0"],
+        ["--chunk-size", "-5"],
+        ["--live-interval", "0"],
+        ["--poi-top-k", "0"],
+        ["--second-order-top-k", "0"],
+        ["--cache-max-mb", "0"],
+    ],
+)
+def test_rejects_non_positive_values(monkeypatch, argv):
+    with pytest.raises(ValueError):
+        _settings(monkeypatch, *argv)
+
+
+def test_rejects_non_positive_chunk_size_from_file(monkeypatch):
+    with pytest.raises(ValueError):
+        _settings(monkeypatch, cfg_file={"compute": {"chunk_size": 0}})
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--adaptive-initial", "0"],
+        ["--adaptive-patience", "0"],
+        ["--adaptive-growth", "1"],
+        ["--adaptive-growth", "0.5"],
+    ],
+)
+def test_rejects_bad_adaptive_schedules(monkeypatch, argv):
+    with pytest.raises(ValueError):
+        _settings(monkeypatch, *argv)
@@ -0,0 +1,65 @@
+import pytest
+
+from src.aes.contants import KEY
+from src.context.cache import score_key
+from src.context.pool import create_worker_pool
+from src.context.shared import open_npy_store
+from src.guesser.cpa import cpa_guesser
+from src.guesser.cpa_stream import cpa_models_guesser, cpa_stream_guesser
+from src.guesser.dpa import dpa_guesser
+from src.utils.synthetic import write_synthetic_dataset
+
+
+@pytest.fixture(scope="module")
+def hd_dataset(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("models")
+    traces_path, textin_path = write_synthetic_dataset(
+        str(workdir / "traces.npy"),
+        str(workdir / "textin.npy"),
+        1500,
+        100,
+        model="hd",
+        noise=1.0,
+    )
+    return open_npy_store(traces_path), open_npy_store(textin_path)
+
+
+def _key():
+    return [hex(k) for k in KEY]
+
+
+def test_cpa_uses_the_leakage_model(hd_dataset):
+    traces_store, textin_store = hd_dataset
+
+    with create_worker_pool() as pool:
+        guesses = cpa_guesser(traces_store, textin_store, executor=pool, model="hd")
+    assert [r["guess"] for r in guesses] == _key()
+
+    guesses = cpa_stream_guesser(traces_store, textin_store, model="hd")
+    assert [r["guess"] for r in guesses] == _key()
+
+
+def test_compared_models_share_one_pass(hd_dataset):
+    traces_store, textin_store = hd_dataset
+    results = cpa_models_guesser(traces_store, textin_store, ["hd", "hw"])
+
+    assert list(results) == ["hd", "hw"]
+    assert [r["guess"] for r in results["hd"]] == _key()
+
+    with pytest.raises(ValueError):
+        cpa_models_guesser(traces_store, textin_store, ["hd", "hw", "hd"])
+
+
+def test_score_key_depends_on_the_model(hd_dataset):
+    traces_store, textin_store = hd_dataset
+    keys = {
+        score_key("cpa", traces_store, textin_store, 0, "float64", model)
+        for model in ("hw", "hd", "id")
+    }
+    assert len(keys) == 3
+
+
+def test_dpa_rejects_non_binary_models(hd_dataset):
+    traces_store, textin_store = hd_dataset
+    with pytest.raises(ValueError):
+        dpa_guesser(traces_store, textin_store, model="hw")
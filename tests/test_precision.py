@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from src.aes.contants import KEY
+from src.context.class_stats import build_class_stats
+from src.context.pool import create_worker_pool
+from src.context.precision import compute_dtype
+from src.context.shared import open_npy_store
+from src.guesser.cpa import cpa_guesser
+from src.guesser.cpa_stream import cpa_stream_guesser
+from src.guesser.dpa import dpa_guesser
+from src.utils.synthetic import write_synthetic_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("precision")
+    traces_path, textin_path = write_synthetic_dataset(
+        str(workdir / "traces.npy"),
+        str(workdir / "textin.npy"),
+        2000,
+        200,
+        noise=1.0,
+        dtype=np.int16,
+    )
+    return workdir, open_npy_store(traces_path), open_npy_store(textin_path)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with create_worker_pool() as executor:
+        yield executor
+
+
+def _guesses(results):
+    return [r["guess"] for r in results]
+
+
+def _key():
+    return [hex(k) for k in KEY]
+
+
+def test_compute_dtype_follows_the_precision():
+    assert compute_dtype("float32") == np.float32
+    with pytest.raises(ValueError):
+        compute_dtype("int")
+
+
+@pytest.mark.parametrize("attack", [cpa_guesser, dpa_guesser])
+def test_float32_recovers_the_float64_key(dataset, pool, attack):
+    _, traces_store, textin_store = dataset
+    guesses = {
+        precision: _guesses(
+            attack(traces_store, textin_store, precision=precision, executor=pool)
+        )
+        for precision in ("float64", "float32")
+    }
+
+    assert guesses["float32"] == guesses["float64"] == _key()
+
+
+def test_float32_class_stats_recover_the_float64_key(dataset, pool):
+    workdir, traces_store, textin_store = dataset
+    guesses = {}
+    for precision in ("float64", "float32"):
+        class_stats = build_class_stats(
+            traces_store, textin_store, str(workdir / precision), precision
+        )
+        guesses[precision] = _guesses(
+            cpa_guesser(
+                traces_store, textin_store, class_stats=class_stats, executor=pool
+            )
+        )
+
+    assert guesses["float32"] == guesses["float64"] == _key()
+
+
+def test_float32_stream_recovers_the_float64_key(dataset):
+    _, traces_store, textin_store = dataset
+    guesses = {
+        precision: _guesses(
+            cpa_stream_guesser(
+                traces_store, textin_store, chunk_size=256, precision=precision
+            )
+        )
+        for precision in ("float64", "float32")
+    }
+
+    assert guesses["float32"] == guesses["float64"] == _key()
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from src.context.preprocess import parse_pipeline, prepare_pipeline
+
+
+def test_parse_pipeline():
+    assert parse_pipeline("crop:10:20,decimate:2") == [
+        {"name": "crop", "start": 10, "end": 20},
+        {"name": "decimate", "factor": 2},
+    ]
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        "decimate:0",
+        "movavg:0",
+        "movavg:4:0",
+        "crop:20:10",
+        "crop:10:10",
+        "align:-5:10",
+        "align:10:5",
+        "align:0:10:-1",
+        "lowpass:0",
+        "bandpass:0.5:0.2",
+    ],
+)
+def test_parse_pipeline_rejects_empty_stages(spec):
+    with pytest.raises(ValueError):
+        parse_pipeline(spec)
+
+
+def test_alignment_window_past_the_traces():
+    with pytest.raises(ValueError):
+        prepare_pipeline(parse_pipeline("align:50:60"), np.zeros((4, 40)))
@@ -0,0 +1,34 @@
+import numpy as np
+
+from src.context.shared import (
+    load_store,
+    open_npy_store,
+    store_columns,
+    store_samples,
+    store_slice,
+)
+
+
+def _store(tmp_path):
+    arr = np.arange(60, dtype=np.float32).reshape(6, 10)
+    np.save(tmp_path / "traces.npy", arr)
+    return arr, open_npy_store(str(tmp_path / "traces.npy"))
+
+
+def test_columns_and_slices(tmp_path):
+    arr, store = _store(tmp_path)
+
+    window = store_columns(store, range(2, 6))
+    assert np.array_equal(load_store(window), arr[:, 2:6])
+
+    # Column selections compose with the previous one
+    picked = store_columns(window, [0, 3])
+    assert np.array_equal(load_store(store_slice(picked, 1, 4)), arr[1:4][:, [2, 5]])
+    assert store_samples(picked) == 2
+
+
+def test_empty_selections(tmp_path):
+    _, store = _store(tmp_path)
+
+    assert load_store(store_columns(store, [])).shape == (6, 0)
+    assert load_store(store_slice(store_columns(store, [1, 2]), 3, 3)).shape == (0, 2)
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from src.aes.contants import KEY
+from src.aes.tables import HW_SBOX_OUT
+
+from src.utils.synthetic import generate_synthetic_traces, leak_positions
+
+
+@pytest.mark.parametrize("n_samples", [40, 120, 400])
+def test_masked_leaks_stay_apart(n_samples):
+    positions = leak_positions(n_samples, model="masked")
+    offset = (positions[1] - positions[0]) // 2
+
+    # The mask leaks between two bytes' leaks, never on one of them
+    assert offset >= 1
+    assert set(positions + offset).isdisjoint(positions)
+
+
+def test_masked_leakage_is_second_order():
+    traces, textin = generate_synthetic_traces(
+        3000, 120, model="masked", noise=0.5, seed=1
+    )
+    positions = leak_positions(120, model="masked")
+    offset = (positions[1] - positions[0]) // 2
+
+    for b in range(4):
+        h = HW_SBOX_OUT[textin[:, b], KEY[b]].astype(np.float64)
+        value = traces[:, positions[b]].astype(np.float64)
+        mask = traces[:, positions[b] + offset].astype(np.float64)
+        product = (value - value.mean()) * (mask - mask.mean())
+
+        assert abs(np.corrcoef(h, value)[0, 1]) < 0.1
+        assert abs(np.corrcoef(h, mask)[0, 1]) < 0.1
+        assert abs(np.corrcoef(h, product)[0, 1]) > 0.2
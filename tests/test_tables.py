@@ -0,0 +1,36 @@
+import numpy as np
+
+from src.aes.functions import aes_internal
+from src.aes.tables import (
+    BITS_SBOX_OUT,
+    HW_SBOX_OUT,
+    SBOX_OUT,
+    bit_hypotheses,
+    hw_hypotheses,
+    sbox_out_hypotheses,
+)
+
+
+def test_sbox_out_known_values():
+    assert SBOX_OUT[0xAB, 0xEF] == aes_internal(0xAB, 0xEF) == 0x1B
+    assert SBOX_OUT[0x22, 0x01] == aes_internal(0x22, 0x01) == 0x26
+
+
+def test_tables_match_aes_internal():
+    for v in range(256):
+        assert SBOX_OUT[v, v ^ 0x5A] == aes_internal(v, v ^ 0x5A)
+        assert HW_SBOX_OUT[0x5A, v] == bin(aes_internal(0x5A, v)).count("1")
+        assert BITS_SBOX_OUT[v % 8, v, 0x5A] == (aes_internal(v, 0x5A) >> (v % 8)) & 1
+
+
+def test_hypotheses_gather_table_rows():
+    textin = np.array([[0x00, 0x10], [0xFF, 0x22]], dtype=np.uint8)
+
+    assert np.array_equal(sbox_out_hypotheses(textin, 1), SBOX_OUT[[0x10, 0x22]])
+    assert np.array_equal(hw_hypotheses(textin, 0), HW_SBOX_OUT[[0x00, 0xFF]])
+    assert np.array_equal(bit_hypotheses(textin, 1, 3), BITS_SBOX_OUT[3][[0x10, 0x22]])
+
+
+def test_tables_are_read_only():
+    assert not SBOX_OUT.flags.writeable
+    assert not HW_SBOX_OUT.flags.writeable
@@ -0,0 +1,57 @@
+import pytest
+
+from src.aes.contants import KEY
+from src.context.shared import load_store, open_npy_store, store_columns, store_slice
+from src.guesser.template import (
+    build_templates,
+    check_provenance,
+    load_templates,
+    save_templates,
+    template_guesser,
+    template_provenance,
+)
+from src.utils.synthetic import write_synthetic_dataset
+
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp("template")
+    traces_path, textin_path = write_synthetic_dataset(
+        str(workdir / "traces.npy"), str(workdir / "textin.npy"), 400, 100
+    )
+    return workdir, open_npy_store(traces_path), open_npy_store(textin_path)
+
+
+def test_provenance_round_trip(dataset):
+    workdir, traces_store, textin_store = dataset
+    traces_store = store_columns(traces_store, range(10, 60))
+
+    templates = build_templates(
+        load_store(traces_store), load_store(textin_store), KEY, n_poi=2
+    )
+    templates.update(template_provenance(traces_store))
+    save_templates(str(workdir / "templates.npz"), templates)
+    templates = load_templates(str(workdir / "templates.npz"))
+
+    check_provenance(templates, traces_store)
+    for other in (
+        store_columns(dataset[1], range(0, 50)),
+        store_columns(dataset[1], range(10, 61)),
+        dataset[1],
+    ):
+        with pytest.raises(ValueError):
+            check_provenance(templates, other)
+
+
+def test_template_guesser_needs_traces(dataset):
+    _, traces_store, textin_store = dataset
+    templates = build_templates(
+        load_store(traces_store), load_store(textin_store), KEY, n_poi=2
+    )
+
+    with pytest.raises(ValueError):
+        template_guesser(
+            store_slice(traces_store, 400, 400),
+            store_slice(textin_store, 400, 400),
+            templates,
+        )